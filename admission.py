@@ -0,0 +1,307 @@
+"""
+Admission Control
+Per-route concurrency limits with priority queueing and token-bucket rate
+limits for the expensive diagnostics routes; overload is rejected fast with
+503 (queue full or queue wait expired) or 429 (rate exceeded)
+"""
+
+import os
+import json
+import math
+import heapq
+import time
+import asyncio
+import itertools
+import threading
+
+from flask import g, request
+
+# Request header naming the priority class, and the classes it may name
+PRIORITY_HEADER = 'X-Priority'
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+DEFAULT_PRIORITY = 'normal'
+
+
+class RouteLimits:
+    """
+    Admission settings of one route
+
+    Args:
+        concurrency: Requests executing at once
+        max_queue: Requests waiting for a slot before new ones are rejected
+        queue_timeout: Seconds a request may wait for a slot
+        rate: Sustained requests per second (None: no rate limit)
+        burst: Requests allowed at once above the rate (defaults to rate)
+    """
+
+    def __init__(self, concurrency, max_queue=0, queue_timeout=1.0, rate=None, burst=None):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+# /api/v1/connectivity forks a shell and ping per request; /util/crypto is
+# CPU-bound. Everything else is cheap and never waits here.
+DEFAULT_LIMITS = {
+    '/api/v1/connectivity': RouteLimits(concurrency=8, max_queue=32, queue_timeout=5.0, rate=10, burst=30),
+    '/util/crypto': RouteLimits(concurrency=16, max_queue=64, queue_timeout=1.0, rate=50, burst=100),
+}
+
+
+def load_limits(path=None):
+    """
+    Route limits from a JSON file (ADMISSION_LIMITS), or the defaults
+
+    The file maps routes to RouteLimits arguments, e.g.
+    {"/api/v1/connectivity": {"concurrency": 4, "max_queue": 8, "rate": 5}}
+    """
+    path = path or os.environ.get('ADMISSION_LIMITS')
+    if not path:
+        return dict(DEFAULT_LIMITS)
+    with open(path, 'r', encoding='utf-8') as f:
+        return {route: RouteLimits.from_dict(settings) for route, settings in json.load(f).items()}
+
+
+class TokenBucket:
+    """Allows rate requests per second on average and burst at once"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def retry_after(self):
+        """Seconds until the next token"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'event', 'granted', 'rejected', 'on_wake')
+
+    def __init__(self, priority, seq, on_wake=None):
+        self.priority = priority
+        self.seq = seq
+        self.event = threading.Event()
+        self.granted = False
+        self.rejected = False
+        self.on_wake = on_wake
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        self.event.set()
+        if self.on_wake is not None:
+            self.on_wake()
+
+
+class ConcurrencyGate:
+    """
+    Counting semaphore with a bounded priority queue
+
+    A freed slot is handed directly to the best waiter (lowest priority
+    value, then arrival order). When the queue is full, an arrival that
+    outranks the worst waiter takes that waiter's place and the displaced
+    request is rejected; otherwise the arrival itself is rejected.
+    """
+
+    def __init__(self, limit, max_queue=0, queue_timeout=1.0):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def _enter(self, priority, on_wake=None):
+        """Take a free slot (True), get rejected (False) or join the queue (the waiter)"""
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return True
+            waiter = _Waiter(priority, next(self._seq), on_wake)
+            if len(self._waiters) >= self.max_queue:
+                worst = max(self._waiters, default=None)
+                if worst is None or not waiter < worst:
+                    self.rejected += 1
+                    return False
+                self._waiters.remove(worst)
+                heapq.heapify(self._waiters)
+                worst.rejected = True
+                worst.wake()
+                self.rejected += 1
+            heapq.heappush(self._waiters, waiter)
+            return waiter
+
+    def acquire(self, priority=PRIORITIES[DEFAULT_PRIORITY]):
+        """Take a slot, waiting in the queue if needed; False means rejected"""
+        waiter = self._enter(priority)
+        if not isinstance(waiter, _Waiter):
+            return waiter
+        waiter.event.wait(self.queue_timeout)
+        return self._leave(waiter)
+
+    async def acquire_async(self, priority=PRIORITIES[DEFAULT_PRIORITY]):
+        """acquire() for coroutines: waits in the same queue without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        waiter = self._enter(priority, on_wake=lambda: loop.call_soon_threadsafe(woken.set))
+        if not isinstance(waiter, _Waiter):
+            return waiter
+        try:
+            await asyncio.wait_for(woken.wait(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The client went away; hand on a slot granted in the meantime
+            if self._leave(waiter):
+                self.release()
+            raise
+        return self._leave(waiter)
+
+    def _leave(self, waiter):
+        """Outcome of a queued waiter once woken or timed out"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            if not waiter.rejected:
+                # Timed out while still queued
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self.rejected += 1
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # The slot passes straight to the next request; in_flight is unchanged
+                waiter = heapq.heappop(self._waiters)
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self.in_flight -= 1
+
+
+def _rejection(status, message, retry_after):
+    body = (f'<html><body style="background:#f8fafc;color:#1e293b;padding:40px;">{message} '
+            f'<a href="/" style="color:#2563eb;">Back</a></body></html>')
+    return body, status, {'Retry-After': str(max(1, math.ceil(retry_after)))}
+
+
+class AdmissionController:
+    """
+    Flask extension applying RouteLimits in before_request/teardown_request
+
+    Requests to routes without limits pass straight through, so cheap pages
+    stay fast while the expensive routes are saturated.
+    """
+
+    def __init__(self, app=None, limits=None, priorities=None, priority_header=PRIORITY_HEADER,
+                 clock=time.monotonic):
+        self.limits = load_limits() if limits is None else limits
+        self.priorities = priorities or PRIORITIES
+        self.priority_header = priority_header
+        self.gates = {route: ConcurrencyGate(l.concurrency, l.max_queue, l.queue_timeout)
+                      for route, l in self.limits.items()}
+        self.buckets = {route: TokenBucket(l.rate, l.burst, clock=clock)
+                        for route, l in self.limits.items() if l.rate}
+        self.rate_limited = {route: 0 for route in self.limits}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+        app.extensions['admission'] = self
+
+    def priority(self, name=None):
+        """Priority value of a class name (default: the one the request header names)"""
+        if name is None:
+            name = request.headers.get(self.priority_header, DEFAULT_PRIORITY)
+        return self.priorities.get(name.strip().lower(), self.priorities[DEFAULT_PRIORITY])
+
+    def _rate_limit(self, path):
+        bucket = self.buckets.get(path)
+        if bucket is not None and not bucket.try_acquire():
+            self.rate_limited[path] += 1
+            return _rejection(429, 'Too many requests', bucket.retry_after())
+        return None
+
+    def _admit(self):
+        gate = self.gates.get(request.path)
+        if gate is None:
+            return None
+
+        rejection = self._rate_limit(request.path)
+        if rejection is not None:
+            return rejection
+
+        if not gate.acquire(self.priority()):
+            return _rejection(503, 'Service busy, try again shortly', gate.queue_timeout)
+        g.admission_gate = gate
+        return None
+
+    async def admit_async(self, path, priority_name=DEFAULT_PRIORITY):
+        """
+        Admission for requests served outside Flask (server_async's fast path)
+
+        Returns (rejection, gate): rejection is a (body, status, headers)
+        response or None, and a returned gate must be released once the
+        request is done.
+        """
+        gate = self.gates.get(path)
+        if gate is None:
+            return None, None
+        rejection = self._rate_limit(path)
+        if rejection is not None:
+            return rejection, None
+        if not await gate.acquire_async(self.priority(priority_name)):
+            return _rejection(503, 'Service busy, try again shortly', gate.queue_timeout), None
+        return None, gate
+
+    def _release(self, exc=None):
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            gate.release()
+
+    def stats(self):
+        """In-flight, queued and rejected requests per limited route"""
+        return {
+            route: {
+                'in_flight': gate.in_flight,
+                'queued': gate.queued,
+                'rejected': gate.rejected,
+                'rate_limited': self.rate_limited[route],
+            }
+            for route, gate in self.gates.items()
+        }
@@ -0,0 +1,115 @@
+"""
+Findings Baseline
+Accepted (known) finding fingerprints filtered out of SAST/DAST results
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from report_parser import iter_bandit_findings, iter_zap_findings, with_fingerprints
+
+
+def default_baseline_path():
+    """Location of the baseline file (SECURITY_BASELINE overrides it)"""
+    return os.environ.get(
+        'SECURITY_BASELINE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.security-baseline')
+    )
+
+
+class Baseline:
+    """
+    Set of accepted finding fingerprints
+
+    The file holds one fingerprint per line; anything after the first
+    whitespace is a human-readable note and '#' lines are comments.
+    """
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints = set(fingerprints)
+        self.suppressed = 0
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a baseline file; a missing file means nothing is suppressed"""
+        path = path or default_baseline_path()
+        baseline = cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        baseline.fingerprints.add(line.split(None, 1)[0])
+        except FileNotFoundError:
+            pass
+        return baseline
+
+    def __contains__(self, finding):
+        return finding['fingerprint'] in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def filter(self, findings):
+        """Yield only findings that are not baselined, counting the rest"""
+        accepted = self.fingerprints
+        for finding in findings:
+            if finding['fingerprint'] in accepted:
+                self.suppressed += 1
+            else:
+                yield finding
+
+
+def write_baseline(path, findings):
+    """Write every finding of a stream to a baseline file; returns the count"""
+    seen = set()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# Accepted security findings: fingerprint  tool rule location\n')
+        for finding in findings:
+            if finding['fingerprint'] in seen:
+                continue
+            seen.add(finding['fingerprint'])
+            location = finding.get('file', '')
+            if finding.get('line'):
+                location += f":{finding['line']}"
+            f.write(f"{finding['fingerprint']}  {finding.get('tool', '')} "
+                    f"{finding.get('rule_id', '')} {location}\n")
+    return len(seen)
+
+
+def main():
+    """Accept the findings of the latest reports as the new baseline"""
+    import argparse
+    import itertools
+
+    base = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Security Findings Baseline')
+    parser.add_argument('--reports-dir', default=os.path.join(base, 'reports'),
+                        help='Directory holding bandit_report.json / zap_report.json')
+    parser.add_argument('--output', default=default_baseline_path(),
+                        help='Baseline file to write')
+    parser.add_argument('--source-root', default=base,
+                        help='Root the Bandit file paths are made relative to')
+
+    args = parser.parse_args()
+
+    streams = []
+    bandit_json = os.path.join(args.reports_dir, 'bandit_report.json')
+    zap_json = os.path.join(args.reports_dir, 'zap_report.json')
+    if os.path.exists(bandit_json):
+        streams.append(with_fingerprints(iter_bandit_findings(bandit_json), base_dir=args.source_root))
+    if os.path.exists(zap_json):
+        streams.append(with_fingerprints(iter_zap_findings(zap_json)))
+
+    if not streams:
+        print(f"❌ No reports found in {args.reports_dir}")
+        sys.exit(1)
+
+    count = write_baseline(args.output, itertools.chain(*streams))
+    print(f"✅ Baseline with {count} accepted findings saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Connectivity History
+Per-host ring buffers of recent probe results in compact arrays, with
+1-minute and 1-hour latency rollups persisted to SQLite for percentile
+queries over longer windows
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+# Raw samples kept per host, and hosts tracked before the least recently
+# probed one is dropped; together they bound memory (~17 bytes a sample)
+SAMPLES_PER_HOST = 4096
+MAX_HOSTS = 256
+
+# Rollup resolutions in seconds, and how long each is kept
+RESOLUTIONS = {'1m': 60, '1h': 3600}
+RETENTION = {'1m': 7 * 86400, '1h': 90 * 86400}
+
+# Seconds between writes of the open rollup buckets
+FLUSH_INTERVAL = 10
+
+# Latency histogram bins (ms): bin i holds RTTs up to BIN_EDGES[i], growing
+# by 25% per bin from 0.1 ms, so percentiles from rollups are within 25%
+BIN_EDGES = tuple(0.1 * 1.25 ** i for i in range(52))
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Only plausible host names and addresses are recorded; anything else
+# (typos, injected shell) would only fill the buffers
+HOST_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.:-]{0,252}$')
+
+# "time=12.3 ms", "time=12ms" and "time<1ms" in Linux and Windows ping output
+RTT_PATTERN = re.compile(r'time\s*([=<])\s*([0-9.]+)\s*ms', re.IGNORECASE)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS connectivity_rollups (
+        host TEXT NOT NULL,
+        resolution TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        failures INTEGER NOT NULL,
+        rtt_min REAL,
+        rtt_max REAL,
+        rtt_sum REAL NOT NULL,
+        histogram BLOB NOT NULL,
+        PRIMARY KEY (host, resolution, bucket_start)
+    )
+'''
+
+
+def default_db_path():
+    """Rollup database (CONNECTIVITY_HISTORY_DB); in memory when unset"""
+    return os.environ.get('CONNECTIVITY_HISTORY_DB', ':memory:')
+
+
+def parse_rtt(output):
+    """Round-trip time in ms from ping output, or None if no reply was seen"""
+    match = RTT_PATTERN.search(output)
+    if match is None:
+        return None
+    rtt = float(match.group(2))
+    # "time<1ms": count as half the bound rather than the bound itself
+    return rtt / 2 if match.group(1) == '<' else rtt
+
+
+def _bin(rtt):
+    for index, edge in enumerate(BIN_EDGES):
+        if rtt <= edge:
+            return index
+    return len(BIN_EDGES) - 1
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, rtt, ok) samples in parallel arrays; failures have a NaN rtt"""
+
+    def __init__(self, capacity=SAMPLES_PER_HOST):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.rtts = array('f', bytes(4 * capacity))
+        self.ok = array('b', bytes(capacity))
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, rtt, ok):
+        self.timestamps[self._next] = timestamp
+        self.rtts[self._next] = rtt if ok else math.nan
+        self.ok[self._next] = 1 if ok else 0
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def oldest(self):
+        if not self.count:
+            return None
+        return self.timestamps[self._next if self.count == self.capacity else 0]
+
+    def since(self, start):
+        """(timestamp, rtt, ok) samples at or after start, oldest first"""
+        first = self._next if self.count == self.capacity else 0
+        samples = []
+        for offset in range(self.count):
+            index = (first + offset) % self.capacity
+            if self.timestamps[index] >= start:
+                samples.append((self.timestamps[index], self.rtts[index], bool(self.ok[index])))
+        return samples
+
+
+class _Bucket:
+    """Counts accumulated for one rollup bucket since it was last written"""
+
+    __slots__ = ('start', 'samples', 'failures', 'rtt_min', 'rtt_max', 'rtt_sum', 'histogram')
+
+    def __init__(self, start):
+        self.start = start
+        self.samples = 0
+        self.failures = 0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_sum = 0.0
+        self.histogram = array('I', bytes(4 * len(BIN_EDGES)))
+
+    def add(self, rtt, ok):
+        self.samples += 1
+        if not ok:
+            self.failures += 1
+            return
+        self.rtt_min = rtt if self.rtt_min is None else min(self.rtt_min, rtt)
+        self.rtt_max = rtt if self.rtt_max is None else max(self.rtt_max, rtt)
+        self.rtt_sum += rtt
+        self.histogram[_bin(rtt)] += 1
+
+    def merge(self, other):
+        self.samples += other.samples
+        self.failures += other.failures
+        self.rtt_sum += other.rtt_sum
+        if other.rtt_min is not None:
+            self.rtt_min = other.rtt_min if self.rtt_min is None else min(self.rtt_min, other.rtt_min)
+            self.rtt_max = other.rtt_max if self.rtt_max is None else max(self.rtt_max, other.rtt_max)
+        for index, count in enumerate(other.histogram):
+            self.histogram[index] += count
+
+    @classmethod
+    def from_row(cls, start, row):
+        samples, failures, rtt_min, rtt_max, rtt_sum, histogram = row
+        bucket = cls(start)
+        bucket.samples = samples
+        bucket.failures = failures
+        bucket.rtt_min = rtt_min
+        bucket.rtt_max = rtt_max
+        bucket.rtt_sum = rtt_sum
+        bucket.histogram = array('I', histogram)
+        return bucket
+
+
+def _summary(samples, failures, rtt_min, rtt_max, rtt_sum, percentile_of, percentiles):
+    replies = samples - failures
+    return {
+        'samples': samples,
+        'failures': failures,
+        'loss': round(failures / samples, 4) if samples else None,
+        'min': rtt_min,
+        'max': rtt_max,
+        'mean': round(rtt_sum / replies, 3) if replies else None,
+        'percentiles': {f'p{p}': percentile_of(p) if replies else None for p in percentiles},
+    }
+
+
+class ConnectivityHistory:
+    """
+    Probe results per host: raw samples in a RingBuffer and rollup buckets
+    written to SQLite every FLUSH_INTERVAL seconds or when a bucket closes
+
+    Buckets hold counts since their last write, and writes merge them into
+    the stored row, so restarts and several processes sharing the database
+    add up instead of overwriting each other.
+    """
+
+    def __init__(self, db_path=None, capacity=SAMPLES_PER_HOST, max_hosts=MAX_HOSTS, clock=time.time):
+        self.db_path = db_path or default_db_path()
+        self.capacity = capacity
+        self.max_hosts = max_hosts
+        self._clock = clock
+        self._buffers = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._started = self._last_flush = clock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(SCHEMA)
+        return self._conn
+
+    def record(self, host, rtt, ok, timestamp=None):
+        """Add one probe result; returns False if host is not recordable"""
+        if not HOST_PATTERN.match(host):
+            return False
+        timestamp = self._clock() if timestamp is None else timestamp
+        with self._lock:
+            buffer = self._buffers.pop(host, None)
+            if buffer is None:
+                buffer = RingBuffer(self.capacity)
+                if len(self._buffers) >= self.max_hosts:
+                    evicted, _ = self._buffers.popitem(last=False)
+                    self._evict(evicted)
+            self._buffers[host] = buffer
+            buffer.append(timestamp, rtt, ok)
+
+            closed = False
+            for name, seconds in RESOLUTIONS.items():
+                start = int(timestamp // seconds * seconds)
+                bucket = self._buckets.get((host, name))
+                if bucket is not None and bucket.start != start:
+                    self._write([(host, name, bucket)])
+                    bucket = None
+                    closed = True
+                if bucket is None:
+                    bucket = self._buckets[(host, name)] = _Bucket(start)
+                bucket.add(rtt, ok)
+
+            if not closed and self._clock() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush_all()
+        return True
+
+    def record_output(self, host, output, timestamp=None):
+        """Record a probe from its ping output"""
+        rtt = parse_rtt(output)
+        return self.record(host, rtt if rtt is not None else math.nan, rtt is not None, timestamp)
+
+    def _evict(self, host):
+        pending = []
+        for name in RESOLUTIONS:
+            bucket = self._buckets.pop((host, name), None)
+            if bucket is not None and bucket.samples:
+                pending.append((host, name, bucket))
+        self._write(pending)
+
+    def _flush_all(self):
+        pending = [(host, name, bucket) for (host, name), bucket in self._buckets.items() if bucket.samples]
+        self._write(pending)
+        for host, name, bucket in pending:
+            self._buckets[(host, name)] = _Bucket(bucket.start)
+        self._prune()
+        self._last_flush = self._clock()
+
+    def flush(self):
+        """Write every open bucket now"""
+        with self._lock:
+            self._flush_all()
+
+    def _write(self, pending):
+        if not pending:
+            return
+        conn = self._db()
+        with conn:
+            for host, name, bucket in pending:
+                row = conn.execute(
+                    'SELECT samples, failures, rtt_min, rtt_max, rtt_sum, histogram FROM connectivity_rollups '
+                    'WHERE host = ? AND resolution = ? AND bucket_start = ?', (host, name, bucket.start)
+                ).fetchone()
+                merged = _Bucket(bucket.start)
+                merged.merge(bucket)
+                if row is not None:
+                    merged.merge(_Bucket.from_row(bucket.start, row))
+                conn.execute(
+                    'INSERT OR REPLACE INTO connectivity_rollups (host, resolution, bucket_start, samples, '
+                    'failures, rtt_min, rtt_max, rtt_sum, histogram) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (host, name, merged.start, merged.samples, merged.failures, merged.rtt_min,
+                     merged.rtt_max, merged.rtt_sum, merged.histogram.tobytes())
+                )
+
+    def _prune(self):
+        if self._conn is None:
+            return
+        now = self._clock()
+        with self._conn:
+            for name, keep in RETENTION.items():
+                self._conn.execute(
+                    'DELETE FROM connectivity_rollups WHERE resolution = ? AND bucket_start < ?', (name, now - keep)
+                )
+
+    def hosts(self):
+        with self._lock:
+            return list(self._buffers)
+
+    def query(self, host, window, percentiles=PERCENTILES, now=None):
+        """
+        Latency percentiles and loss for host over the last window seconds
+
+        Exact from raw samples when the ring buffer holds every sample of
+        the window (it reaches back to the window's start, or has not
+        wrapped since this process started inside the window); otherwise
+        merged from the 1m rollups (windows up to a day) or the 1h rollups.
+        """
+        now = self._clock() if now is None else now
+        start = now - window
+        with self._lock:
+            buffer = self._buffers.get(host)
+            if buffer is not None and buffer.count and (
+                    buffer.oldest() <= start or (buffer.count < buffer.capacity and start >= self._started)):
+                samples = buffer.since(start)
+                rtts = sorted(rtt for _, rtt, ok in samples if ok)
+
+                def raw_percentile(p):
+                    return round(rtts[max(0, math.ceil(p / 100 * len(rtts)) - 1)], 3)
+
+                result = _summary(len(samples), len(samples) - len(rtts), round(rtts[0], 3) if rtts else None,
+                                  round(rtts[-1], 3) if rtts else None, sum(rtts), raw_percentile, percentiles)
+                result.update(host=host, window=window, source='raw')
+                return result
+
+            self._flush_all()
+            name = '1m' if window <= 86400 else '1h'
+            merged = _Bucket(0)
+            for row in self._db().execute(
+                'SELECT bucket_start, samples, failures, rtt_min, rtt_max, rtt_sum, histogram '
+                'FROM connectivity_rollups WHERE host = ? AND resolution = ? AND bucket_start + ? > ?',
+                (host, name, RESOLUTIONS[name], start)
+            ):
+                merged.merge(_Bucket.from_row(row[0], row[1:]))
+
+        def histogram_percentile(p):
+            rank = math.ceil(p / 100 * (merged.samples - merged.failures))
+            seen = 0
+            for index, count in enumerate(merged.histogram):
+                seen += count
+                if count and seen >= rank:
+                    # The bin's upper edge, clamped to the values actually seen
+                    return round(min(max(BIN_EDGES[index], merged.rtt_min), merged.rtt_max), 3)
+            return merged.rtt_max
+
+        result = _summary(merged.samples, merged.failures, merged.rtt_min, merged.rtt_max, merged.rtt_sum,
+                          histogram_percentile, percentiles)
+        result.update(host=host, window=window, source=name)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._flush_all()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
@@ -0,0 +1,471 @@
+"""
+Lightweight DAST Probe Engine
+Native asyncio scanner that fires a targeted payload corpus at known routes,
+for fast pre-merge checks without Docker or ZAP
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import asyncio
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from run_dast import summarize_dast_report
+from findings_store import default_store_path
+
+# Concurrent requests allowed per target host
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 10
+
+# Database error messages that leak through to responses
+SQL_ERRORS = re.compile(
+    r'(unrecognized token|syntax error|no such column|sqlite3?\.\w*Error|'
+    r'OperationalError|unterminated quoted string|SQL syntax)', re.IGNORECASE
+)
+
+# Secrets and configuration that should never appear in a response
+SENSITIVE_PATTERNS = [
+    ('API key', re.compile(r'\bsk-[A-Za-z0-9]{12,}')),
+    ('Credential disclosure', re.compile(
+        r'(?<![?&\w])(password|secret[ _]key|api[ _]key)\s*[:=]\s*[^\s<]{4,}', re.IGNORECASE)),
+    ('Environment variables', re.compile(r'\b(PATH|HOME|PWD)\s*[:=]\s*/')),
+]
+
+
+class Probe:
+    """One payload and the rule that decides whether it worked"""
+
+    def __init__(self, category, template):
+        self.category = category
+        self.template = template
+
+    def payload(self, token):
+        return self.template.format(token=token)
+
+    def detect(self, token, body, baseline_body):
+        """Return the evidence string if the response proves the issue"""
+        if self.category == 'sqli':
+            match = SQL_ERRORS.search(body)
+            if match and not SQL_ERRORS.search(baseline_body):
+                return match.group()
+        elif self.category == 'xss':
+            reflected = self.payload(token)
+            if reflected in body:
+                return reflected
+        elif self.category == 'ssti':
+            # {{a*b}} is rendered as the product only if the template engine ran it
+            product = str(SSTI_FACTORS[0] * SSTI_FACTORS[1])
+            if product in body and product not in baseline_body:
+                return product
+        elif self.category == 'cmdi':
+            # $((6*7)) is only expanded to 42 if a shell ran the payload
+            marker = f'{token}42'
+            if marker in body:
+                return marker
+        return None
+
+
+SSTI_FACTORS = (7919, 7907)
+
+PROBES = [
+    Probe('sqli', "'"),
+    Probe('sqli', '1"'),
+    Probe('sqli', "1'--"),
+    Probe('xss', '<script>alert("{token}")</script>'),
+    Probe('xss', '"><img src=x onerror=alert("{token}")>'),
+    Probe('ssti', '{{{{%d*%d}}}}' % SSTI_FACTORS),
+    Probe('cmdi', ';echo {token}$((6*7))'),
+    Probe('cmdi', '| echo {token}$((6*7))'),
+    Probe('cmdi', '&& echo {token}$((6*7))'),
+]
+
+# ZAP-compatible alert metadata so probe reports flow through the same parser
+ALERTS = {
+    'sqli': ('PROBE-SQLI', 'SQL Injection', '3', '2',
+             'https://owasp.org/www-community/attacks/SQL_Injection'),
+    'xss': ('PROBE-XSS', 'Cross Site Scripting (Reflected)', '3', '3',
+            'https://owasp.org/www-community/attacks/xss/'),
+    'ssti': ('PROBE-SSTI', 'Server Side Template Injection', '3', '3',
+             'https://owasp.org/www-project-web-security-testing-guide/'),
+    'cmdi': ('PROBE-CMDI', 'Remote OS Command Injection', '3', '3',
+             'https://owasp.org/www-community/attacks/Command_Injection'),
+    'sensitive': ('PROBE-SENSITIVE', 'Sensitive Data Exposure', '2', '2',
+                  'https://owasp.org/Top10/A02_2021-Cryptographic_Failures/'),
+}
+
+
+def default_route_cache_path(reports_dir=None):
+    """
+    Location of the per-route result cache (PROBE_ROUTE_CACHE overrides it)
+
+    The cache sits next to the findings database, so without reports_dir
+    it is the one every run shares, isolated runs included.
+    """
+    if os.environ.get('PROBE_ROUTE_CACHE'):
+        return os.environ['PROBE_ROUTE_CACHE']
+    return os.path.join(os.path.dirname(default_store_path(reports_dir)), 'probe_routes.json')
+
+
+def corpus_digest():
+    """Hash of the payloads and detection patterns; a change invalidates every route"""
+    corpus = [(p.category, p.template) for p in PROBES]
+    corpus += [(name, pattern.pattern) for name, pattern in SENSITIVE_PATTERNS]
+    corpus.append(SQL_ERRORS.pattern)
+    return hashlib.sha256(json.dumps(corpus).encode()).hexdigest()
+
+
+class RouteResultCache:
+    """
+    Probe results of the last scan, per route and handler fingerprint
+
+    Stored as {rule: {'fingerprint', 'alerts': {category: [instance]}}};
+    instances omit the host so results survive a change of port.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.corpus = corpus_digest()
+        self.routes = {}
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('corpus') == self.corpus:
+                self.routes = data['routes']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, route):
+        """Cached alerts for the route, or None if its handler changed"""
+        entry = self.routes.get(route['rule'])
+        if entry and route.get('fingerprint') and entry['fingerprint'] == route['fingerprint']:
+            return entry['alerts']
+        return None
+
+    def put(self, route, alerts):
+        if route.get('fingerprint'):
+            self.routes[route['rule']] = {'fingerprint': route['fingerprint'], 'alerts': alerts}
+
+    def save(self, routes):
+        """Write the cache, dropping routes that no longer exist"""
+        current = {route['rule'] for route in routes}
+        self.routes = {rule: entry for rule, entry in self.routes.items() if rule in current}
+        # Concurrent isolated runs share the cache; each writes its own temp file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'corpus': self.corpus, 'routes': self.routes}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class HostPool:
+    """
+    Keep-alive HTTP/1.1 connections to one host
+
+    A semaphore caps in-flight requests; finished connections go back to
+    the idle list so later requests skip the TCP handshake.
+    """
+
+    def __init__(self, host, port, limit=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = []
+        self.opened = 0
+
+    async def request(self, method, target):
+        """Send one request and return (status, body text)"""
+        async with self.semaphore:
+            # A reused connection may have been closed by the server; retry once
+            for attempt in range(2):
+                reused = bool(self.idle)
+                if reused:
+                    reader, writer = self.idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                    self.opened += 1
+                try:
+                    writer.write((
+                        f'{method} {target} HTTP/1.1\r\n'
+                        f'Host: {self.host}:{self.port}\r\n'
+                        'User-Agent: security-pipeline-probe\r\n'
+                        'Connection: keep-alive\r\n\r\n'
+                    ).encode('latin-1'))
+                    await writer.drain()
+                    status, keep_alive, body = await asyncio.wait_for(
+                        _read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self.idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, body.decode('utf-8', errors='replace')
+
+    async def close(self):
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+
+async def _read_response(reader):
+    """Parse status, headers and body; returns (status, keep_alive, body bytes)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed before response")
+    version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = (version == 'HTTP/1.1' and connection != 'close') or connection == 'keep-alive'
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    return int(status), keep_alive, body
+
+
+def _default_params(route):
+    return {p['name']: p['default'] if p['default'] not in (None, '') else 'test'
+            for p in route['query_params']}
+
+
+def _target(route, params):
+    return route['rule'] + ('?' + urlencode(params) if params else '')
+
+
+class ProbeEngine:
+    """Runs the payload corpus against a set of routes"""
+
+    def __init__(self, target_url, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, probes=None):
+        parts = urlsplit(target_url)
+        self.base_url = f'{parts.scheme}://{parts.netloc}'
+        self.pool = HostPool(parts.hostname, parts.port or 80, limit=concurrency, timeout=timeout)
+        self.probes = probes or PROBES
+        self.alerts = {}
+        self.requests = 0
+        self.errors = 0
+        self.failed_routes = set()
+
+    def _record(self, category, route, method, param, evidence, attack=''):
+        alert = self.alerts.setdefault(category, [])
+        key = (route['rule'], param)
+        if any((i['_rule'], i['param']) == key for i in alert):
+            return
+        alert.append({
+            '_rule': route['rule'],
+            'uri': self.base_url + route['rule'],
+            'method': method,
+            'param': param,
+            'attack': attack,
+            'evidence': evidence,
+        })
+
+    def restore(self, route, alerts):
+        """Re-add alerts cached for an unchanged route"""
+        for category, instances in alerts.items():
+            for instance in instances:
+                self._record(category, route, instance['method'], instance['param'],
+                             instance['evidence'], instance['attack'])
+
+    def route_alerts(self, route):
+        """Alerts of one route, without host-specific fields, for the route cache"""
+        return {
+            category: [{k: v for k, v in i.items() if k not in ('_rule', 'uri')}
+                       for i in instances if i['_rule'] == route['rule']]
+            for category, instances in self.alerts.items()
+            if any(i['_rule'] == route['rule'] for i in instances)
+        }
+
+    async def _fetch(self, route, target):
+        self.requests += 1
+        try:
+            return await self.pool.request('GET', target)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            self.errors += 1
+            self.failed_routes.add(route['rule'])
+            return None, ''
+
+    def _check_sensitive(self, route, body, param=''):
+        for name, pattern in SENSITIVE_PATTERNS:
+            match = pattern.search(body)
+            if match:
+                self._record('sensitive', route, 'GET', param, f'{name}: {match.group()[:60]}')
+
+    async def _probe(self, route, param, probe, baseline_body):
+        token = 'p' + uuid.uuid4().hex[:10]
+        params = _default_params(route)
+        params[param] = probe.payload(token)
+        _, body = await self._fetch(route, _target(route, params))
+        evidence = probe.detect(token, body, baseline_body)
+        if evidence:
+            self._record(probe.category, route, 'GET', param, evidence, params[param])
+
+    async def _scan_route(self, route):
+        if 'GET' not in route['methods'] or route['path_params']:
+            return
+        _, baseline_body = await self._fetch(route, _target(route, _default_params(route)))
+        self._check_sensitive(route, baseline_body)
+        await asyncio.gather(*(
+            self._probe(route, param['name'], probe, baseline_body)
+            for param in route['query_params']
+            for probe in self.probes
+        ))
+
+    async def scan(self, routes):
+        try:
+            await asyncio.gather(*(self._scan_route(route) for route in routes))
+        finally:
+            await self.pool.close()
+        return self.alerts
+
+    def to_zap_report(self):
+        """Alerts in ZAP's JSON report layout"""
+        alerts = []
+        for category, instances in sorted(self.alerts.items()):
+            plugin_id, name, risk, confidence, reference = ALERTS[category]
+            alerts.append({
+                'pluginid': plugin_id,
+                'alert': name,
+                'name': name,
+                'riskcode': risk,
+                'confidence': confidence,
+                'count': str(len(instances)),
+                'reference': reference,
+                'instances': [{k: v for k, v in i.items() if not k.startswith('_')} for i in instances],
+            })
+        return {
+            '@version': 'probe-1',
+            '@generated': datetime.now().isoformat(timespec='seconds'),
+            'site': [{'@name': self.base_url, 'alerts': alerts}],
+        }
+
+
+def run_probe_scan(target_url="http://localhost:5000", routes=None, reports_dir=None,
+                   concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, incremental=False,
+                   time_limit=None, route_cache=None):
+    """
+    Execute the in-process DAST probe scan
+
+    Returns the same result shape as run_zap_baseline_scan, so it can be
+    used as a drop-in DAST backend. With incremental=True only routes whose
+    handler fingerprint changed since the last scan are probed; the cached
+    alerts of the other routes are reused. Full scans refresh the cache.
+    time_limit cancels the whole scan after that many seconds. route_cache
+    is the route result cache file (default: next to the findings database
+    of reports_dir).
+    """
+    print("=" * 60)
+    print("⚡ DAST SCAN - In-process Probe Engine")
+    print("=" * 60)
+
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    json_report = os.path.join(reports_dir, 'probe_report.json')
+
+    print(f"\n🎯 Target URL: {target_url}")
+
+    try:
+        if routes is None:
+            from route_map import collect_routes, load_app
+            routes = collect_routes(load_app())
+        engine = ProbeEngine(target_url, concurrency=concurrency, timeout=timeout)
+        cache = RouteResultCache(route_cache or default_route_cache_path(reports_dir))
+        to_scan = routes
+        if incremental:
+            to_scan = []
+            for route in routes:
+                cached = cache.get(route)
+                if cached is None:
+                    to_scan.append(route)
+                else:
+                    engine.restore(route, cached)
+            print(f"♻️ Reusing results of {len(routes) - len(to_scan)} unchanged routes")
+        print(f"🗺️ Probing {len(to_scan)} routes with {len(PROBES)} payloads per parameter")
+
+        start = time.perf_counter()
+        try:
+            asyncio.run(asyncio.wait_for(engine.scan(to_scan), time_limit))
+        except asyncio.TimeoutError:
+            print(f"❌ Probe scan cancelled after {time_limit:.0f} seconds")
+            return {'success': False, 'error': 'Timeout'}
+        duration = time.perf_counter() - start
+
+        print(f"\n⏱️ {engine.requests} requests in {duration:.2f}s "
+              f"over {engine.pool.opened} connections ({engine.errors} errors)")
+
+        # An unreachable target leaves no report and no run in the findings history
+        if engine.requests and engine.errors == engine.requests:
+            return {'success': False, 'error': 'Target not reachable'}
+
+        for route in to_scan:
+            if route['rule'] not in engine.failed_routes:
+                cache.put(route, engine.route_alerts(route))
+        cache.save(routes)
+
+        with open(json_report, 'w') as f:
+            json.dump(engine.to_zap_report(), f, indent=2)
+
+        alerts, delta, suppressed = summarize_dast_report(json_report, reports_dir, tool='probe')
+
+        return {
+            'success': True,
+            'engine': 'probe',
+            'return_code': 2 if alerts['high'] or alerts['medium'] else 0,
+            'duration': round(duration, 3),
+            'requests': engine.requests,
+            'routes_scanned': len(to_scan),
+            'routes_reused': len(routes) - len(to_scan),
+            'alerts': alerts,
+            'delta': delta,
+            'suppressed': suppressed,
+            'reports': {'html': None, 'json': json_report},
+        }
+    except Exception as e:
+        print(f"❌ Error during probe scan: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000'
+    result = run_probe_scan(target)
+
+    if result['success']:
+        print(f"\n✅ Probe scan completed in {result['duration']}s")
+    else:
+        print(f"\n❌ Probe scan failed: {result.get('error', 'Unknown error')}")
@@ -0,0 +1,467 @@
+"""
+Diagnostic Jobs
+Background job queue for long-running diagnostics: submission returns a job
+id at once, a bounded pool of worker threads runs the work outside the
+request, and results are kept for a TTL to be polled or streamed
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from collections import deque
+
+from flask import Response, jsonify, request, stream_with_context
+
+# Worker threads per queue
+JOB_WORKERS = 4
+# Jobs waiting to run before submissions are refused
+MAX_PENDING = 100
+# Seconds a finished job (result and output) is kept
+JOB_TTL = 15 * 60
+# Seconds between expiry sweeps
+PURGE_INTERVAL = 30
+# Seconds an idle worker waits before checking the store again (the
+# SQLite store may be fed by another process)
+POLL_INTERVAL = 1.0
+# Seconds between output checks while streaming a job
+STREAM_INTERVAL = 0.2
+# Seconds a claimed job stays owned by its process without a heartbeat;
+# workers renew their leases every LEASE_SECONDS / 3
+LEASE_SECONDS = 30
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class QueueFull(Exception):
+    """Raised when a submission would exceed MAX_PENDING"""
+
+
+def _new_job(kind, params):
+    return {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'params': params,
+        'status': QUEUED,
+        'result': None,
+        'error': None,
+        'created_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'expires_at': None,
+    }
+
+
+class MemoryJobStore:
+    """Jobs held in process memory; lost on restart"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._output = {}
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    def add(self, kind, params, max_pending=None):
+        with self._lock:
+            if max_pending is not None and len(self._queue) >= max_pending:
+                raise QueueFull(f"{len(self._queue)} jobs already pending")
+            job = _new_job(kind, params)
+            self._jobs[job['id']] = job
+            self._output[job['id']] = []
+            self._queue.append(job['id'])
+            return dict(job)
+
+    def claim(self, lease=LEASE_SECONDS):
+        """Mark the oldest queued job running and return it, or None"""
+        with self._lock:
+            while self._queue:
+                job = self._jobs.get(self._queue.popleft())
+                if job is not None and job['status'] == QUEUED:
+                    job['status'] = RUNNING
+                    job['started_at'] = time.time()
+                    return dict(job)
+            return None
+
+    def append_output(self, job_id, text):
+        with self._lock:
+            if job_id in self._output:
+                self._output[job_id].append(text)
+
+    def finish(self, job_id, status, result=None, error=None, ttl=JOB_TTL):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                now = time.time()
+                job.update(status=status, result=result, error=error, finished_at=now, expires_at=now + ttl)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def read_output(self, job_id, offset=0):
+        """Output chunks from position offset on"""
+        with self._lock:
+            return list(self._output.get(job_id, [])[offset:])
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['expires_at'] is not None and job['expires_at'] <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._output[job_id]
+            return len(expired)
+
+    def renew(self, lease=LEASE_SECONDS):
+        return 0
+
+    def recover(self, now=None):
+        return 0
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """
+    Jobs persisted in SQLite so queued work and finished results survive a
+    restart
+
+    A claimed job records its owner (this store) and a lease its workers
+    keep renewing. recover() queues again only jobs whose lease expired, so
+    processes sharing the database never take over each other's running
+    jobs, while the jobs of a crashed process are picked up once its
+    leases run out.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA busy_timeout=5000')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    expires_at REAL,
+                    owner TEXT,
+                    lease_expires REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, created_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_expiry ON jobs (expires_at);
+                CREATE TABLE IF NOT EXISTS job_output (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    chunk TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                );
+            ''')
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            for column, kind in (('owner', 'TEXT'), ('lease_expires', 'REAL')):
+                if column not in columns:
+                    self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def add(self, kind, params, max_pending=None):
+        job = _new_job(kind, params)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if max_pending is not None:
+                    pending = self._conn.execute(
+                        'SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)
+                    ).fetchone()[0]
+                    if pending >= max_pending:
+                        raise QueueFull(f"{pending} jobs already pending")
+                self._conn.execute(
+                    'INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (job['id'], kind, json.dumps(params), QUEUED, job['created_at'])
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return job
+
+    def claim(self, lease=LEASE_SECONDS):
+        """Mark the oldest queued job running under a lease held by this store and return it, or None"""
+        now = time.time()
+        with self._lock:
+            # The UPDATE takes the write lock, so two processes never claim the same job
+            rows = self._conn.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_expires = ? WHERE id = ('
+                '  SELECT id FROM jobs WHERE status = ? ORDER BY created_at, rowid LIMIT 1'
+                ') RETURNING *', (RUNNING, now, self.owner, now + lease, QUEUED)
+            ).fetchall()
+        return self._job(rows[0] if rows else None)
+
+    def renew(self, lease=LEASE_SECONDS):
+        """Extend the leases of every job this store is running; returns how many"""
+        with self._lock:
+            return self._conn.execute(
+                'UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = ?',
+                (time.time() + lease, self.owner, RUNNING)
+            ).rowcount
+
+    def append_output(self, job_id, text):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO job_output (job_id, seq, chunk) VALUES '
+                '(?, (SELECT COUNT(*) FROM job_output WHERE job_id = ?), ?)', (job_id, job_id, text)
+            )
+
+    def finish(self, job_id, status, result=None, error=None, ttl=JOB_TTL):
+        now = time.time()
+        with self._lock:
+            # A job whose lease expired and was taken over is no longer ours to finish
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ?, '
+                'lease_expires = NULL WHERE id = ? AND status = ? AND owner = ?',
+                (status, json.dumps(result) if result is not None else None, error, now, now + ttl,
+                 job_id, RUNNING, self.owner)
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            return self._job(self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def read_output(self, job_id, offset=0):
+        """Output chunks from position offset on"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT chunk FROM job_output WHERE job_id = ? AND seq >= ? ORDER BY seq', (job_id, offset)
+            )]
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute(
+                'DELETE FROM job_output WHERE job_id IN (SELECT id FROM jobs WHERE expires_at <= ?)', (now,)
+            )
+            purged = self._conn.execute('DELETE FROM jobs WHERE expires_at <= ?', (now,)).rowcount
+            self._conn.execute('COMMIT')
+            return purged
+
+    def recover(self, now=None):
+        """Queue again the running jobs whose lease expired (their process died)"""
+        now = now or time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            ids = [row[0] for row in self._conn.execute(
+                'SELECT id FROM jobs WHERE status = ? AND (lease_expires IS NULL OR lease_expires <= ?)',
+                (RUNNING, now)
+            )]
+            self._conn.executemany('DELETE FROM job_output WHERE job_id = ?', [(job_id,) for job_id in ids])
+            self._conn.executemany(
+                'UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires = NULL WHERE id = ?',
+                [(QUEUED, job_id) for job_id in ids]
+            )
+            self._conn.execute('COMMIT')
+            return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def make_job_store(db_path=None):
+    """SQLite store when JOBS_DB (or db_path) is set, otherwise in-memory"""
+    db_path = db_path or os.environ.get('JOBS_DB')
+    return SQLiteJobStore(db_path) if db_path else MemoryJobStore()
+
+
+class JobQueue:
+    """
+    Runs registered job kinds on a fixed pool of worker threads
+
+    A handler is called as handler(params, emit) and returns a
+    JSON-serializable result; emit(text) appends output clients can read
+    while the job runs. Invalid params should raise ValueError, which
+    fails the job with that message. Workers start with the first
+    submission, so importing the application spawns no threads. While
+    jobs run, a heartbeat thread renews their leases in the store.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS, max_pending=MAX_PENDING, ttl=JOB_TTL,
+                 url_prefix='/api/v1/jobs', lease=LEASE_SECONDS):
+        self.store = store if store is not None else make_job_store()
+        self.url_prefix = url_prefix
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.lease = lease
+        self.handlers = {}
+        self._threads = []
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def start(self):
+        with self._wakeup:
+            if self._threads:
+                return
+            self.store.recover()
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'diagnostic-job-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.workers:
+                thread = threading.Thread(target=self._heartbeat, name='diagnostic-job-heartbeat', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, params):
+        """Queue a job and return it; raises ValueError or QueueFull"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        self._maybe_purge()
+        job = self.store.add(kind, params, max_pending=self.max_pending)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def get(self, job_id):
+        self._maybe_purge()
+        return self.store.get(job_id)
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            self.store.purge_expired(now)
+            # Jobs of a process that died after this one started
+            self.store.recover(now)
+
+    def run_one(self):
+        """Run the next queued job in this thread; False if there was none"""
+        job = self.store.claim(self.lease)
+        if job is None:
+            return False
+
+        def emit(text):
+            self.store.append_output(job['id'], text)
+
+        try:
+            result = self.handlers[job['kind']](job['params'], emit)
+        except Exception as e:
+            self.store.finish(job['id'], FAILED, error=str(e), ttl=self.ttl)
+        else:
+            self.store.finish(job['id'], SUCCEEDED, result=result, ttl=self.ttl)
+        return True
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_one()
+            except sqlite3.Error:
+                # Store busy: back off and retry
+                ran = False
+            if not ran:
+                with self._wakeup:
+                    self._wakeup.wait(POLL_INTERVAL)
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.store.renew(self.lease)
+            except sqlite3.Error:
+                # Store busy: the next beat retries well within the lease
+                pass
+
+    def close(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.store.close()
+
+    def submit_view(self):
+        """Submit a diagnostic job; the body is {"kind": ..., "params": {...}}"""
+        body = request.get_json(silent=True) or {}
+        try:
+            job = self.submit(body.get('kind'), body.get('params') or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except QueueFull as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        location = f"{self.url_prefix}/{job['id']}"
+        return (jsonify({'id': job['id'], 'status': job['status'], 'poll': location,
+                         'stream': f'{location}/stream'}), 202, {'Location': location})
+
+    def poll_view(self, job_id):
+        """Job status and result; output chunks from ?offset= on"""
+        job = self.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found or expired'}), 404
+        offset = request.args.get('offset', 0, type=int)
+        output = self.store.read_output(job_id, offset)
+        job['output'] = output
+        job['next_offset'] = offset + len(output)
+        return jsonify(job)
+
+    def stream_view(self, job_id):
+        """Job output as plain text, sent as it is produced until the job finishes"""
+        if self.get(job_id) is None:
+            return jsonify({'error': 'Job not found or expired'}), 404
+
+        def generate():
+            offset = 0
+            while True:
+                job = self.store.get(job_id)
+                chunks = self.store.read_output(job_id, offset)
+                offset += len(chunks)
+                yield from chunks
+                if job is None or job['status'] in FINISHED:
+                    if job is not None and job['status'] == FAILED:
+                        yield f"\nJob failed: {job['error']}\n"
+                    return
+                time.sleep(STREAM_INTERVAL)
+
+        return Response(stream_with_context(generate()), mimetype='text/plain')
+
+    def init_app(self, app):
+        """Register the submit, poll and stream views under url_prefix on a Flask app"""
+        app.add_url_rule(self.url_prefix, 'submit_job', self.submit_view, methods=['POST'])
+        app.add_url_rule(f'{self.url_prefix}/<job_id>', 'poll_job', self.poll_view)
+        app.add_url_rule(f'{self.url_prefix}/<job_id>/stream', 'stream_job', self.stream_view)
+        app.extensions['diagnostic_jobs'] = self
@@ -0,0 +1,264 @@
+"""
+Historical Findings Store
+SQLite-backed history of SAST/DAST findings keyed by stable fingerprints
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+# Findings are written in batches while the report is being streamed
+BATCH_SIZE = 1000
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        tool TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        total INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_tool ON runs (tool, id);
+
+    CREATE TABLE IF NOT EXISTS findings (
+        fingerprint TEXT PRIMARY KEY,
+        tool TEXT NOT NULL,
+        rule_id TEXT,
+        severity TEXT,
+        file TEXT,
+        line INTEGER,
+        message TEXT,
+        introduced_run INTEGER NOT NULL,
+        last_run INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_findings_introduced ON findings (introduced_run);
+    CREATE INDEX IF NOT EXISTS idx_findings_last ON findings (last_run);
+
+    CREATE TABLE IF NOT EXISTS run_findings (
+        run_id INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        PRIMARY KEY (run_id, fingerprint)
+    ) WITHOUT ROWID;
+
+    -- State of each finding before an unfinished run touched it, for abort()
+    CREATE TEMP TABLE IF NOT EXISTS run_undo (
+        run_id INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        severity TEXT,
+        file TEXT,
+        line INTEGER,
+        message TEXT,
+        introduced_run INTEGER NOT NULL,
+        last_run INTEGER NOT NULL,
+        PRIMARY KEY (run_id, fingerprint)
+    ) WITHOUT ROWID;
+'''
+
+
+def default_store_path(reports_dir=None):
+    """Location of the findings database (FINDINGS_DB overrides it)"""
+    if os.environ.get('FINDINGS_DB'):
+        return os.environ['FINDINGS_DB']
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    return os.path.join(reports_dir, 'findings.db')
+
+
+class FindingsStore:
+    """History of findings across pipeline runs"""
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def previous_run(self, tool, run_id):
+        row = self.conn.execute(
+            'SELECT MAX(id) FROM runs WHERE tool = ? AND id < ?', (tool, run_id)
+        ).fetchone()
+        return row[0]
+
+    def start_run(self, tool):
+        """Register a new run and return a recorder for its findings"""
+        cur = self.conn.execute(
+            'INSERT INTO runs (tool, started_at) VALUES (?, ?)',
+            (tool, datetime.now().isoformat(timespec='seconds'))
+        )
+        self.conn.commit()
+        return RunRecorder(self, tool, cur.lastrowid)
+
+    def diff(self, run_id):
+        """
+        New/fixed/unchanged counts of a run against the previous run of its tool
+
+        Every count comes from an indexed lookup, so the cost is proportional
+        to the number of new and fixed findings, not to the history size.
+        """
+        row = self.conn.execute('SELECT tool, total FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        previous = self.previous_run(row['tool'], run_id)
+
+        current = self.conn.execute(
+            'SELECT COUNT(*) FROM run_findings WHERE run_id = ?', (run_id,)
+        ).fetchone()[0]
+        new = self.conn.execute(
+            'SELECT COUNT(*) FROM findings WHERE introduced_run = ?', (run_id,)
+        ).fetchone()[0]
+        fixed = 0
+        if previous is not None:
+            fixed = self.conn.execute(
+                'SELECT COUNT(*) FROM findings WHERE last_run = ?', (previous,)
+            ).fetchone()[0]
+
+        return {
+            'run_id': run_id,
+            'previous_run_id': previous,
+            'new': new,
+            'fixed': fixed,
+            'unchanged': current - new,
+        }
+
+    def iter_new(self, run_id):
+        """Findings first seen (or re-introduced) in this run"""
+        yield from self.conn.execute(
+            'SELECT * FROM findings WHERE introduced_run = ?', (run_id,)
+        )
+
+    def iter_fixed(self, run_id):
+        """Findings present in the previous run but not in this one"""
+        tool = self.conn.execute('SELECT tool FROM runs WHERE id = ?', (run_id,)).fetchone()[0]
+        previous = self.previous_run(tool, run_id)
+        if previous is not None:
+            yield from self.conn.execute(
+                'SELECT * FROM findings WHERE last_run = ?', (previous,)
+            )
+
+    def compact(self, keep_runs=20, vacuum=True):
+        """
+        Keep only the latest `keep_runs` runs per tool
+
+        Findings that were last seen before the oldest kept run are dropped.
+        """
+        with self.conn:
+            for (tool,) in self.conn.execute('SELECT DISTINCT tool FROM runs').fetchall():
+                row = self.conn.execute(
+                    'SELECT id FROM runs WHERE tool = ? ORDER BY id DESC LIMIT 1 OFFSET ?',
+                    (tool, keep_runs - 1)
+                ).fetchone()
+                if row is None:
+                    continue
+                oldest_kept = row[0]
+                self.conn.execute(
+                    'DELETE FROM run_findings WHERE run_id IN '
+                    '(SELECT id FROM runs WHERE tool = ? AND id < ?)', (tool, oldest_kept)
+                )
+                self.conn.execute('DELETE FROM runs WHERE tool = ? AND id < ?', (tool, oldest_kept))
+                self.conn.execute(
+                    'DELETE FROM findings WHERE tool = ? AND last_run < ?', (tool, oldest_kept)
+                )
+        if vacuum:
+            self.conn.execute('VACUUM')
+
+
+class RunRecorder:
+    """Writes the findings of one run while they stream through the pipeline"""
+
+    def __init__(self, store, tool, run_id):
+        self.store = store
+        self.tool = tool
+        self.run_id = run_id
+        self.previous = store.previous_run(tool, run_id)
+        self.total = 0
+        self._batch = []
+
+    def add(self, finding):
+        self._batch.append((
+            finding['fingerprint'], self.tool, str(finding.get('rule_id', '')),
+            finding.get('severity'), finding.get('file'), finding.get('line'),
+            finding.get('message'), self.run_id, self.run_id
+        ))
+        self.total += 1
+        if len(self._batch) >= BATCH_SIZE:
+            self._flush()
+
+    def track(self, findings):
+        """Record every finding of a stream and pass it through unchanged"""
+        for finding in findings:
+            self.add(finding)
+            yield finding
+
+    def _flush(self):
+        if not self._batch:
+            return
+        with self.store.conn:
+            # Remember the pre-run state of findings this run sees for the first time
+            self.store.conn.executemany('''
+                INSERT OR IGNORE INTO run_undo (run_id, fingerprint, severity, file, line, message,
+                                                introduced_run, last_run)
+                SELECT ?, fingerprint, severity, file, line, message, introduced_run, last_run
+                FROM findings WHERE fingerprint = ? AND last_run != ?
+            ''', [(self.run_id, row[0], self.run_id) for row in self._batch])
+            # A finding that was absent from the previous run counts as new again
+            self.store.conn.executemany('''
+                INSERT INTO findings (fingerprint, tool, rule_id, severity, file, line,
+                                      message, introduced_run, last_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    introduced_run = CASE
+                        WHEN findings.last_run = excluded.last_run THEN findings.introduced_run
+                        WHEN findings.last_run = ? THEN findings.introduced_run
+                        ELSE excluded.introduced_run END,
+                    severity = excluded.severity,
+                    file = excluded.file,
+                    line = excluded.line,
+                    message = excluded.message,
+                    last_run = excluded.last_run
+            ''', [row + (self.previous if self.previous is not None else -1,) for row in self._batch])
+            self.store.conn.executemany(
+                'INSERT OR IGNORE INTO run_findings (run_id, fingerprint) VALUES (?, ?)',
+                [(self.run_id, row[0]) for row in self._batch]
+            )
+        self._batch = []
+
+    def abort(self):
+        """Forget a run whose report could not be read"""
+        self._batch = []
+        with self.store.conn:
+            # Findings the aborted run inserted go; the ones it updated get their old state back
+            self.store.conn.execute('''
+                DELETE FROM findings WHERE fingerprint IN (
+                    SELECT fingerprint FROM run_findings WHERE run_id = ?
+                    EXCEPT SELECT fingerprint FROM run_undo WHERE run_id = ?
+                )
+            ''', (self.run_id, self.run_id))
+            self.store.conn.execute('''
+                UPDATE findings SET severity = u.severity, file = u.file, line = u.line,
+                    message = u.message, introduced_run = u.introduced_run, last_run = u.last_run
+                FROM run_undo AS u
+                WHERE u.run_id = ? AND u.fingerprint = findings.fingerprint
+            ''', (self.run_id,))
+            self.store.conn.execute('DELETE FROM run_undo WHERE run_id = ?', (self.run_id,))
+            self.store.conn.execute('DELETE FROM run_findings WHERE run_id = ?', (self.run_id,))
+            self.store.conn.execute('DELETE FROM runs WHERE id = ?', (self.run_id,))
+
+    def finish(self):
+        """Flush pending findings and return the diff against the previous run"""
+        self._flush()
+        with self.store.conn:
+            self.store.conn.execute(
+                'UPDATE runs SET total = ? WHERE id = ?', (self.total, self.run_id)
+            )
+            self.store.conn.execute('DELETE FROM run_undo WHERE run_id = ?', (self.run_id,))
+        return self.store.diff(self.run_id)
@@ -0,0 +1,340 @@
+"""
+Integrity Manifest
+Hashes every file of a directory tree on a thread pool, reading into a
+reused per-thread buffer, and keeps (path, size, mtime, digest) in SQLite
+so re-runs only hash files that changed
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+DEFAULT_ALGORITHM = 'sha256'
+ALGORITHMS = ('md5', 'sha1', 'sha256', 'sha512', 'blake2b')
+
+# Bytes read and handed to one digest.update() call; both release the GIL,
+# so the pool hashes one file per thread in parallel
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# One read buffer per pool thread, reused for every file it hashes
+_buffers = threading.local()
+
+# Files modified this close to the scan may still be being written with an
+# unchanged mtime (coarse timestamps), so their digests are not cached
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS manifest_cache (
+        root TEXT NOT NULL,
+        algorithm TEXT NOT NULL,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest TEXT NOT NULL,
+        PRIMARY KEY (root, algorithm, path)
+    )
+'''
+
+
+def default_cache_path(reports_dir=None):
+    """Location of the digest cache (INTEGRITY_CACHE_DB overrides it)"""
+    if os.environ.get('INTEGRITY_CACHE_DB'):
+        return os.environ['INTEGRITY_CACHE_DB']
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    return os.path.join(reports_dir, 'integrity_cache.db')
+
+
+class ManifestCache:
+    """Last known size, mtime and digest of each file under a root"""
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, root, algorithm):
+        """{path: (size, mtime_ns, digest)} recorded for root"""
+        return {
+            path: (size, mtime_ns, digest)
+            for path, size, mtime_ns, digest in self.conn.execute(
+                'SELECT path, size, mtime_ns, digest FROM manifest_cache WHERE root = ? AND algorithm = ?',
+                (root, algorithm)
+            )
+        }
+
+    def save(self, root, algorithm, rows, removed=()):
+        """Store (path, size, mtime_ns, digest) rows and forget removed paths in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO manifest_cache (root, algorithm, path, size, mtime_ns, digest) '
+                'VALUES (?, ?, ?, ?, ?, ?)', [(root, algorithm) + tuple(row) for row in rows]
+            )
+            self.conn.executemany(
+                'DELETE FROM manifest_cache WHERE root = ? AND algorithm = ? AND path = ?',
+                [(root, algorithm, path) for path in removed]
+            )
+
+
+def _read_buffer():
+    view = getattr(_buffers, 'view', None)
+    if view is None or len(view) != HASH_CHUNK_BYTES:
+        view = _buffers.view = memoryview(bytearray(HASH_CHUNK_BYTES))
+    return view
+
+
+def hash_file(path, algorithm=DEFAULT_ALGORITHM):
+    """
+    Hex digest of a file
+
+    Reads with readinto() into the calling thread's buffer instead of
+    mapping the file: a file truncated while it is hashed just ends early,
+    where touching unmapped pages of a shrunken mmap kills the process
+    with SIGBUS.
+    """
+    digest = hashlib.new(algorithm)
+    view = _read_buffer()
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(view)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def iter_files(root, exclude=()):
+    """(relative path, size, mtime_ns) of every regular file under root; symlinks are not followed"""
+    exclude = {os.path.abspath(path) for path in exclude}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if os.path.abspath(entry.path) in exclude:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    relpath = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    yield relpath, stat.st_size, stat.st_mtime_ns
+            except OSError:
+                continue
+
+
+def build_manifest(root, cache=None, workers=None, algorithm=DEFAULT_ALGORITHM, full=False, exclude=()):
+    """
+    Digest of every file under root
+
+    Files whose size and mtime match the cache reuse the cached digest;
+    the rest are hashed on a thread pool, with at most a few files per
+    worker in flight so memory stays flat on trees of any size.
+
+    Args:
+        root: Directory to hash
+        cache: ManifestCache (None: hash everything, remember nothing)
+        workers: Thread pool size (defaults to ThreadPoolExecutor's default)
+        algorithm: hashlib algorithm name
+        full: Ignore cached digests and hash every file again
+        exclude: Paths (files or directories) to leave out
+
+    Returns ({path: digest}, stats).
+    """
+    root = os.path.abspath(root)
+    scan_start_ns = time.time_ns()
+    cached = cache.load(root, algorithm) if cache is not None else {}
+    manifest = {}
+    to_hash = []
+    stats = {'files': 0, 'bytes': 0, 'hashed': 0, 'hashed_bytes': 0, 'errors': 0}
+
+    for relpath, size, mtime_ns in iter_files(root, exclude):
+        stats['files'] += 1
+        stats['bytes'] += size
+        known = cached.get(relpath)
+        if not full and known is not None and known[0] == size and known[1] == mtime_ns:
+            manifest[relpath] = known[2]
+        else:
+            to_hash.append((relpath, size, mtime_ns))
+
+    updates, racy = [], set()
+
+    def collect(item, future):
+        relpath, size, mtime_ns = item
+        try:
+            digest = future.result()
+        except (OSError, ValueError):
+            # Vanished, truncated or unreadable since the walk
+            stats['errors'] += 1
+            return
+        manifest[relpath] = digest
+        stats['hashed'] += 1
+        stats['hashed_bytes'] += size
+        if mtime_ns < scan_start_ns - RACY_WINDOW_NS:
+            updates.append((relpath, size, mtime_ns, digest))
+        else:
+            racy.add(relpath)
+
+    # Largest files first so one big file does not finish the run alone
+    to_hash.sort(key=lambda item: -item[1])
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = workers * 4
+        in_flight = deque()
+        for item in to_hash:
+            in_flight.append((item, pool.submit(hash_file, os.path.join(root, item[0]), algorithm)))
+            if len(in_flight) >= window:
+                collect(*in_flight.popleft())
+        while in_flight:
+            collect(*in_flight.popleft())
+
+    if cache is not None:
+        cache.save(root, algorithm, updates, removed=(cached.keys() - manifest.keys()) | (cached.keys() & racy))
+    return manifest, stats
+
+
+def write_manifest(manifest, path):
+    """Write digests in sha256sum format (`<digest>  <path>`), sorted by path"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        for relpath in sorted(manifest):
+            f.write(f'{manifest[relpath]}  {relpath}\n')
+    os.replace(tmp_path, path)
+
+
+def read_manifest(path):
+    manifest = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                digest, relpath = line.split('  ', 1)
+                manifest[relpath] = digest
+    return manifest
+
+
+def compare_manifests(expected, actual):
+    """Paths modified, missing from actual and added to it"""
+    return {
+        'modified': sorted(p for p in expected.keys() & actual.keys() if expected[p] != actual[p]),
+        'missing': sorted(expected.keys() - actual.keys()),
+        'added': sorted(actual.keys() - expected.keys()),
+    }
+
+
+def run_integrity_manifest(root=None, reports_dir=None, workers=None, full=False, verify=None,
+                           algorithm=DEFAULT_ALGORITHM):
+    """
+    Build the manifest of root, or verify root against an existing one
+
+    Args:
+        root: Directory to hash (defaults to this repository)
+        reports_dir: Output directory (defaults to ./reports)
+        workers: Thread pool size
+        full: Hash every file again instead of trusting unchanged mtimes
+        verify: Manifest to check root against; the new manifest is not written.
+                Verification always hashes every file (full=True), since a
+                file tampered with size and mtime preserved keeps its cache entry
+        algorithm: hashlib algorithm name
+    """
+    print("=" * 60)
+    print("🧾 INTEGRITY MANIFEST - File Digests")
+    print("=" * 60)
+
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    if root is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+    manifest_path = os.path.join(reports_dir, f'integrity_manifest.{algorithm}')
+
+    if verify:
+        full = True
+
+    print(f"\n📁 Hashing: {root}")
+
+    try:
+        start = time.perf_counter()
+        with ManifestCache(default_cache_path(reports_dir)) as cache:
+            manifest, stats = build_manifest(root, cache, workers=workers, algorithm=algorithm,
+                                             full=full, exclude=[reports_dir])
+        duration = time.perf_counter() - start
+
+        throughput = stats['hashed_bytes'] / duration / (1024 * 1024) if duration else 0.0
+        print(f"⏱️ {stats['files']} files, {stats['bytes'] / (1024 * 1024):.1f} MB; "
+              f"{stats['hashed']} hashed ({stats['hashed_bytes'] / (1024 * 1024):.1f} MB) in {duration:.2f}s "
+              f"({throughput:.0f} MB/s)")
+        if stats['errors']:
+            print(f"⚠️ {stats['errors']} files could not be read")
+
+        result = {
+            'success': True,
+            'files': stats['files'],
+            'bytes': stats['bytes'],
+            'hashed': stats['hashed'],
+            'hashed_bytes': stats['hashed_bytes'],
+            'errors': stats['errors'],
+            'duration': round(duration, 3),
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if verify:
+            differences = compare_manifests(read_manifest(verify), manifest)
+            result['intact'] = not any(differences.values())
+            result.update(differences)
+            if result['intact']:
+                print(f"\n✅ All files match {verify}")
+            else:
+                print(f"\n🚨 Integrity differences against {verify}:")
+                for kind, icon in (('modified', '✏️'), ('missing', '❌'), ('added', '➕')):
+                    for relpath in differences[kind]:
+                        print(f"   {icon} {kind}: {relpath}")
+        else:
+            write_manifest(manifest, manifest_path)
+            result['reports'] = {'manifest': manifest_path}
+        return result
+    except Exception as e:
+        print(f"❌ Error building integrity manifest: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Directory Integrity Manifest')
+    parser.add_argument('root', nargs='?', default=None, help='Directory to hash')
+    parser.add_argument('--verify', default=None, help='Check the tree against this manifest instead of writing one')
+    parser.add_argument('--full', action='store_true', help='Hash every file again, ignoring the mtime cache')
+    parser.add_argument('--workers', type=int, default=None, help='Thread pool size')
+    parser.add_argument('--algorithm', default=DEFAULT_ALGORITHM, choices=ALGORITHMS,
+                        help='Digest algorithm')
+    args = parser.parse_args()
+
+    result = run_integrity_manifest(args.root, workers=args.workers, full=args.full, verify=args.verify,
+                                    algorithm=args.algorithm)
+    if not result['success']:
+        print(f"\n❌ Integrity manifest failed: {result.get('error', 'Unknown error')}")
+        sys.exit(1)
+    if args.verify and not result['intact']:
+        sys.exit(2)
+    print(f"\n✅ Integrity manifest completed: {result['files']} files")
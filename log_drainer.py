@@ -0,0 +1,78 @@
+"""
+Child Process Log Draining
+Reads a subprocess' stdout/stderr pipes in background threads so the child
+never blocks on a full pipe, keeping a tail in memory and a rotating log file
+"""
+
+import os
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+# Lines kept in memory for reports
+TAIL_LINES = 200
+
+# Rotating log file size and number of rotated files kept
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+class LogDrainer:
+    """
+    Drains the pipes of a subprocess.Popen
+
+    One daemon thread per pipe reads lines as they arrive and appends them
+    to a bounded ring buffer and to a size-rotated log file.
+    """
+
+    def __init__(self, process, log_path=None, tail_lines=TAIL_LINES,
+                 max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self._lines = deque(maxlen=tail_lines)
+        self._lock = threading.Lock()
+        self._handler = None
+        self.log_path = log_path
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._handler = RotatingFileHandler(
+                log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True
+            )
+            self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+        self._threads = []
+        for name in ('stdout', 'stderr'):
+            stream = getattr(process, name, None)
+            if stream is None:
+                continue
+            thread = threading.Thread(target=self._drain, args=(name, stream),
+                                      name=f'log-drainer-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _drain(self, name, stream):
+        try:
+            for raw in stream:
+                line = raw.decode('utf-8', errors='replace') if isinstance(raw, bytes) else str(raw)
+                line = f'[{name}] {line.rstrip()}'
+                with self._lock:
+                    self._lines.append(line)
+                    if self._handler:
+                        self._handler.emit(logging.makeLogRecord({'msg': line}))
+        except (OSError, ValueError):
+            # Pipe closed underneath us while the process was being torn down
+            pass
+
+    def tail(self, n=None):
+        """The last n lines drained so far (all buffered lines by default)"""
+        with self._lock:
+            lines = list(self._lines)
+        return lines if n is None else lines[-n:]
+
+    def close(self, timeout=5):
+        """Wait for the pipes to reach EOF, then close the log file"""
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._lock:
+            if self._handler:
+                self._handler.close()
+                self._handler = None
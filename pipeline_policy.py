@@ -0,0 +1,145 @@
+"""
+Pipeline Policy
+Fail-fast severity gates and a global time budget that decide which phases
+of the security pipeline still run
+"""
+
+import time
+
+SEVERITY_LEVELS = ['LOW', 'MEDIUM', 'HIGH']
+
+# Upper bounds of each DAST phase (the timeouts run_dast enforces)
+BASELINE_SCAN_SECONDS = 600
+FULL_SCAN_SECONDS = 1800
+
+# A ZAP scan shorter than this cannot get past container startup and spidering
+MIN_ZAP_SECONDS = 120
+MIN_PROBE_SECONDS = 5
+
+# Time kept back for stopping the app and writing the consolidated report
+REPORT_RESERVE_SECONDS = 30
+
+DAST_MODES = ('auto', 'baseline', 'full')
+GATE_ACTIONS = ('abort', 'skip')
+
+
+class Budget:
+    """Wall-clock budget for the whole pipeline; None means unlimited"""
+
+    def __init__(self, seconds=None, clock=time.monotonic):
+        self.seconds = seconds
+        self._clock = clock
+        self._start = clock()
+
+    def elapsed(self):
+        return self._clock() - self._start
+
+    def remaining(self):
+        if self.seconds is None:
+            return None
+        return max(0.0, self.seconds - self.elapsed())
+
+    def exhausted(self):
+        return self.seconds is not None and self.remaining() <= 0
+
+    def timeout(self, cap=None, reserve=0):
+        """cap, shortened to what is left of the budget after reserve (cap None: only the budget)"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        left = max(0.0, remaining - reserve)
+        return left if cap is None else min(cap, left)
+
+
+class PipelinePolicy:
+    """
+    Decides whether later phases run
+
+    Args:
+        fail_on: Lowest severity that counts against the gate (None disables it)
+        max_findings: Findings at or above fail_on tolerated before the gate trips
+        on_fail: 'abort' stops the pipeline at once; 'skip' skips the remaining
+                 scans but still writes the consolidated report
+        budget_seconds: Global time budget (None for unlimited)
+        dast_mode: 'baseline', 'full', or 'auto' to pick from the time left
+    """
+
+    def __init__(self, fail_on=None, max_findings=0, on_fail='skip', budget_seconds=None,
+                 dast_mode='baseline', reserve=REPORT_RESERVE_SECONDS, clock=time.monotonic):
+        if fail_on is not None and fail_on not in SEVERITY_LEVELS:
+            raise ValueError(f"fail_on must be one of {SEVERITY_LEVELS}")
+        if on_fail not in GATE_ACTIONS:
+            raise ValueError(f"on_fail must be one of {GATE_ACTIONS}")
+        if dast_mode not in DAST_MODES:
+            raise ValueError(f"dast_mode must be one of {DAST_MODES}")
+        self.fail_on = fail_on
+        self.max_findings = max_findings
+        self.on_fail = on_fail
+        self.dast_mode = dast_mode
+        self.reserve = reserve
+        self.budget = Budget(budget_seconds, clock=clock)
+        self.tripped = None
+
+    def _gate(self, phase, counts):
+        if self.fail_on is None:
+            return None
+        levels = SEVERITY_LEVELS[SEVERITY_LEVELS.index(self.fail_on):]
+        count = sum(counts.get(level.lower(), 0) or 0 for level in levels)
+        if count > self.max_findings:
+            self.tripped = (f"{phase} found {count} {self.fail_on}+ issues "
+                            f"(limit {self.max_findings})")
+        return self.tripped
+
+    def check_sast(self, sast_result):
+        """Gate on SAST severities; returns the reason if the gate tripped"""
+        if not sast_result or not sast_result.get('success'):
+            return None
+        return self._gate('SAST', sast_result)
+
+    def check_secrets(self, secrets_result):
+        """Gate on hardcoded credentials; returns the reason if the gate tripped"""
+        if not secrets_result or not secrets_result.get('success'):
+            return None
+        return self._gate('Secrets scan', secrets_result)
+
+    def check_dast(self, dast_result):
+        """Gate on DAST risk levels; returns the reason if the gate tripped"""
+        if not dast_result or not dast_result.get('success') or not dast_result.get('alerts'):
+            return None
+        return self._gate('DAST', dast_result['alerts'])
+
+    def choose_dast(self, backend='zap'):
+        """
+        Pick the DAST scan that fits the time left
+
+        Returns (mode, timeout, reason) where mode is 'probe', 'baseline',
+        'full' or 'skip', and timeout is the seconds the scan may take.
+        """
+        if self.tripped:
+            return 'skip', 0, self.tripped
+
+        if backend == 'probe':
+            timeout = self.budget.timeout(BASELINE_SCAN_SECONDS, self.reserve)
+            if timeout < MIN_PROBE_SECONDS:
+                return 'skip', 0, 'time budget exhausted'
+            return 'probe', timeout, None
+
+        full = self.budget.timeout(FULL_SCAN_SECONDS, self.reserve)
+        baseline = self.budget.timeout(BASELINE_SCAN_SECONDS, self.reserve)
+        if self.dast_mode == 'full' or (
+                self.dast_mode == 'auto' and self.budget.seconds is not None
+                and full >= FULL_SCAN_SECONDS):
+            if full >= MIN_ZAP_SECONDS:
+                return 'full', full, None
+        elif baseline >= MIN_ZAP_SECONDS:
+            return 'baseline', baseline, None
+        return 'skip', 0, 'not enough time budget left for a ZAP scan'
+
+    def summary(self):
+        remaining = self.budget.remaining()
+        return {
+            'gate': self.tripped,
+            'action': self.on_fail if self.tripped else None,
+            'elapsed': round(self.budget.elapsed(), 1),
+            'remaining': None if remaining is None else round(remaining, 1),
+        }
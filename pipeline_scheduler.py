@@ -0,0 +1,306 @@
+"""
+Pipeline Stage Scheduler
+Runs declaratively configured stages as a DAG, in parallel where possible,
+and skips stages whose inputs have not changed since their last run
+"""
+
+import os
+import sys
+import json
+import glob
+import shutil
+import hashlib
+import inspect
+import importlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.join(BASE_DIR, 'pipeline_stages.json')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.pipeline_cache')
+
+# Bumping this invalidates every cached stage
+CACHE_VERSION = 1
+
+
+def load_stages(path=DEFAULT_CONFIG):
+    """Read stage definitions from JSON (or YAML when PyYAML is installed)"""
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+
+    stages = {}
+    for stage in config['stages']:
+        if stage['name'] in stages:
+            raise ValueError(f"Duplicate stage: {stage['name']}")
+        stages[stage['name']] = stage
+    for stage in stages.values():
+        for need in stage.get('needs', []):
+            if need not in stages:
+                raise ValueError(f"Stage '{stage['name']}' needs unknown stage '{need}'")
+    _check_acyclic(stages)
+    return stages
+
+
+def _check_acyclic(stages):
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage dependency cycle through '{name}'")
+        visiting.add(name)
+        for need in stages[name].get('needs', []):
+            visit(need)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in stages:
+        visit(name)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Content-addressed artifact store plus the last fingerprint of each stage"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.stages_dir = os.path.join(cache_dir, 'stages')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.stages_dir, exist_ok=True)
+        self._tools_path = os.path.join(cache_dir, 'tools.json')
+        try:
+            with open(self._tools_path) as f:
+                self._tools = json.load(f)
+        except (OSError, ValueError):
+            self._tools = {}
+
+    def tool_version(self, tool):
+        """
+        Version string of a command-line tool
+
+        Cached by executable path and mtime so the (slow) --version call
+        only happens after the tool is installed or upgraded.
+        """
+        executable = shutil.which(tool)
+        if executable is None:
+            return 'missing'
+        stat = os.stat(executable)
+        key = f'{executable}:{stat.st_mtime_ns}:{stat.st_size}'
+        cached = self._tools.get(tool)
+        if cached and cached['key'] == key:
+            return cached['version']
+        try:
+            result = subprocess.run([executable, '--version'], capture_output=True, text=True, timeout=60)
+            output = (result.stdout or result.stderr).strip()
+            version = output.splitlines()[0] if output else ''
+        except (OSError, subprocess.TimeoutExpired):
+            version = 'unknown'
+        self._tools[tool] = {'key': key, 'version': version}
+        with open(self._tools_path, 'w') as f:
+            json.dump(self._tools, f, indent=2)
+        return version
+
+    def store_object(self, path):
+        digest = _file_digest(path)
+        target = os.path.join(self.objects_dir, digest)
+        if not os.path.exists(target):
+            shutil.copyfile(path, target + '.tmp')
+            os.replace(target + '.tmp', target)
+        return digest
+
+    def restore_object(self, digest, path):
+        source = os.path.join(self.objects_dir, digest)
+        if os.path.exists(path) and _file_digest(path) == digest:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(source, path)
+
+    def has_object(self, digest):
+        return os.path.exists(os.path.join(self.objects_dir, digest))
+
+    def load_entry(self, name):
+        try:
+            with open(os.path.join(self.stages_dir, f'{name}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_entry(self, name, entry):
+        path = os.path.join(self.stages_dir, f'{name}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(entry, f, indent=2, default=str)
+        os.replace(path + '.tmp', path)
+
+
+class StageScheduler:
+    """Executes a stage DAG with fingerprint-based caching"""
+
+    def __init__(self, stages, reports_dir=None, cache=None, max_workers=4, base_dir=BASE_DIR):
+        self.stages = stages
+        self.base_dir = base_dir
+        self.reports_dir = reports_dir or os.path.join(base_dir, 'reports')
+        self.cache = cache or StageCache()
+        self.max_workers = max_workers
+        self.fingerprints = {}
+        self.results = {}
+        self.status = {}
+
+    def _input_files(self, stage):
+        files = set()
+        for pattern in stage.get('inputs', []):
+            for path in glob.glob(os.path.join(self.base_dir, pattern), recursive=True):
+                if os.path.isfile(path):
+                    files.add(os.path.relpath(path, self.base_dir))
+        # A stage whose tool picks its own files names the function that lists
+        # them, so the fingerprint covers exactly what the tool reads
+        if stage.get('inputs_from'):
+            module_name, func_name = stage['inputs_from'].split(':')
+            list_inputs = getattr(importlib.import_module(module_name), func_name)
+            for path in list_inputs(self.base_dir):
+                files.add(os.path.relpath(os.path.join(self.base_dir, path), self.base_dir))
+        return sorted(files)
+
+    def fingerprint(self, name):
+        """Hash of the stage definition, input files, tool versions and upstream fingerprints"""
+        stage = self.stages[name]
+        digest = hashlib.sha256()
+        digest.update(f'v{CACHE_VERSION}|{sys.version}'.encode())
+        digest.update(json.dumps(stage, sort_keys=True).encode())
+        for path in self._input_files(stage):
+            digest.update(f'|file:{path}:{_file_digest(os.path.join(self.base_dir, path))}'.encode())
+        for tool in stage.get('tools', []):
+            digest.update(f'|tool:{tool}:{self.cache.tool_version(tool)}'.encode())
+        for need in sorted(stage.get('needs', [])):
+            digest.update(f'|need:{need}:{self.fingerprints[need]}'.encode())
+        return digest.hexdigest()
+
+    def _output_files(self, stage):
+        files = []
+        for pattern in stage.get('outputs', []):
+            for path in glob.glob(os.path.join(self.reports_dir, pattern)):
+                if os.path.isfile(path):
+                    files.append(os.path.relpath(path, self.reports_dir))
+        return sorted(files)
+
+    def _try_restore(self, name, fingerprint):
+        """Reuse the previous result if its fingerprint and artifacts are intact"""
+        stage = self.stages[name]
+        entry = self.cache.load_entry(name)
+        if not entry or entry.get('fingerprint') != fingerprint or not stage.get('cache', True):
+            return None
+        if not all(self.cache.has_object(d) for d in entry['artifacts'].values()):
+            return None
+        for rel_path, digest in entry['artifacts'].items():
+            self.cache.restore_object(digest, os.path.join(self.reports_dir, rel_path))
+        return entry['result']
+
+    def _execute(self, name):
+        """Run one stage callable; exceptions become failed results"""
+        stage = self.stages[name]
+        module_name, func_name = stage['run'].split(':')
+        func = getattr(importlib.import_module(module_name), func_name)
+
+        kwargs = dict(stage.get('kwargs', {}))
+        params = inspect.signature(func).parameters
+        if 'reports_dir' in params:
+            kwargs['reports_dir'] = self.reports_dir
+        if 'upstream' in params:
+            kwargs['upstream'] = {need: self.results.get(need) for need in stage.get('needs', [])}
+        try:
+            result = func(*stage.get('args', []), **kwargs)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        # Plain return values (e.g. export_route_seeds' path dict) count as success
+        if not isinstance(result, dict) or 'success' not in result:
+            result = {'success': True, 'result': result}
+        return result
+
+    def _finish(self, name, fingerprint, result):
+        stage = self.stages[name]
+        self.results[name] = result
+        if result.get('success') and stage.get('cache', True):
+            artifacts = {path: self.cache.store_object(os.path.join(self.reports_dir, path))
+                         for path in self._output_files(stage)}
+            self.cache.save_entry(name, {
+                'fingerprint': fingerprint, 'result': result, 'artifacts': artifacts
+            })
+
+    def run(self):
+        """Run every stage once its needs are done; returns {stage: result}"""
+        os.makedirs(self.reports_dir, exist_ok=True)
+        pending = set(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in sorted(pending):
+                    if any(need not in self.results for need in self.stages[name].get('needs', [])):
+                        continue
+                    pending.discard(name)
+                    fingerprint = self.fingerprints[name] = self.fingerprint(name)
+                    cached = self._try_restore(name, fingerprint)
+                    if cached is not None:
+                        print(f"⏭️ Stage '{name}' unchanged, reusing cached result")
+                        self.results[name] = cached
+                        self.status[name] = 'cached'
+                    else:
+                        print(f"▶️ Stage '{name}' starting")
+                        running[pool.submit(self._execute, name)] = (name, fingerprint)
+
+                if not running:
+                    # Restored stages may have unblocked others
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    result = future.result()
+                    self._finish(name, fingerprint, result)
+                    self.status[name] = 'ran' if result.get('success') else 'failed'
+                    mark = '✅' if result.get('success') else '❌'
+                    print(f"{mark} Stage '{name}' finished")
+
+        return self.results
+
+
+def run_scheduled_pipeline(config=DEFAULT_CONFIG, reports_dir=None, max_workers=4, cache_dir=DEFAULT_CACHE_DIR):
+    """Load the stage config, run the DAG and print a per-stage summary"""
+    scheduler = StageScheduler(load_stages(config), reports_dir=reports_dir,
+                               cache=StageCache(cache_dir), max_workers=max_workers)
+    results = scheduler.run()
+
+    print("\n" + "=" * 70)
+    print("🏁 STAGES")
+    print("=" * 70)
+    for name in scheduler.stages:
+        print(f"   • {name}: {scheduler.status.get(name, 'skipped')}")
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Security Pipeline Stage Scheduler')
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='Stage definition file')
+    parser.add_argument('--workers', type=int, default=4, help='Stages run in parallel')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore cached stage results')
+    args = parser.parse_args()
+
+    if args.no_cache:
+        shutil.rmtree(os.path.join(DEFAULT_CACHE_DIR, 'stages'), ignore_errors=True)
+    run_scheduled_pipeline(args.config, max_workers=args.workers)
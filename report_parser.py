@@ -0,0 +1,383 @@
+"""
+Streaming Report Parser
+Single-pass, bounded-memory parsing of Bandit and OWASP ZAP JSON reports
+"""
+
+import os
+import re
+import json
+import heapq
+import hashlib
+from urllib.parse import urlsplit, parse_qsl
+
+# Severity / confidence ordering shared by every scanner
+SEVERITY_RANK = {'INFORMATIONAL': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3}
+CONFIDENCE_RANK = {'FALSE_POSITIVE': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CONFIRMED': 4}
+
+# ZAP encodes risk and confidence as numeric strings
+ZAP_RISK = {'0': 'INFORMATIONAL', '1': 'LOW', '2': 'MEDIUM', '3': 'HIGH'}
+ZAP_CONFIDENCE = {'0': 'FALSE_POSITIVE', '1': 'LOW', '2': 'MEDIUM', '3': 'HIGH', '4': 'CONFIRMED'}
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+# Characters that may still extend a number decoded at the end of the buffer
+_NUMBER_TAIL = re.compile(r'[-+.eE0-9]*')
+_CODE_LINE_NUMBER = re.compile(r'^\s*\d+\s?', re.MULTILINE)
+_SPACES = re.compile(r'\s+')
+
+
+class _JsonStream:
+    """Chunked reader that decodes one JSON value at a time from a file"""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Drop consumed input and read more; returns False at end of file"""
+        if self.eof:
+            return False
+        # Grow the read size with the pending value so huge values stay linear
+        data = self.fp.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON: expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode and return the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut at the buffer edge ('12.' or '1e') decodes as its prefix
+            # and leaves only number characters after it; read on before accepting it
+            if (isinstance(value, (int, float)) and _NUMBER_TAIL.fullmatch(self.buf, end)
+                    and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Consume the next JSON value without building it"""
+        char = self.peek()
+        if char not in '[{':
+            self.decode()
+            return
+
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _STRING_END if in_string else _STRUCTURE
+            match = pattern.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Malformed JSON: unexpected end of file")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if in_string:
+                if char == '\\':
+                    # Make sure the escaped character is in the buffer, then skip it
+                    if self.pos >= len(self.buf) and not self._fill():
+                        raise ValueError("Malformed JSON: unexpected end of file")
+                    self.pos += 1
+                else:
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+
+def _walk(stream, path, targets, prefixes):
+    """Yield (target, value) pairs for the value starting at the stream position"""
+    mode = targets.get(path)
+    if mode == 'value':
+        yield path, stream.decode()
+        return
+
+    char = stream.peek()
+    if mode == 'items' and char == '[':
+        stream.expect('[')
+        if stream.peek() == ']':
+            stream.expect(']')
+            return
+        while True:
+            yield path, stream.decode()
+            if stream.peek() == ',':
+                stream.expect(',')
+            else:
+                stream.expect(']')
+                return
+
+    if path not in prefixes:
+        stream.skip()
+        return
+
+    if char == '{':
+        stream.expect('{')
+        if stream.peek() == '}':
+            stream.expect('}')
+            return
+        while True:
+            key = stream.decode()
+            stream.expect(':')
+            yield from _walk(stream, path + (key,), targets, prefixes)
+            if stream.peek() == ',':
+                stream.expect(',')
+            else:
+                stream.expect('}')
+                return
+    elif char == '[':
+        stream.expect('[')
+        if stream.peek() == ']':
+            stream.expect(']')
+            return
+        while True:
+            yield from _walk(stream, path + ('*',), targets, prefixes)
+            if stream.peek() == ',':
+                stream.expect(',')
+            else:
+                stream.expect(']')
+                return
+    else:
+        stream.skip()
+
+
+def iter_json(fp, targets, chunk_size=CHUNK_SIZE):
+    """
+    Stream selected parts of a JSON document
+
+    Args:
+        fp: Text file object positioned at the start of the document
+        targets: Mapping of key paths to 'items' (yield each element of the
+                 array at that path) or 'value' (yield the decoded value).
+                 '*' in a path matches every element of an array.
+
+    Yields:
+        (path, value) tuples in document order
+    """
+    prefixes = set()
+    for path in targets:
+        for i in range(len(path)):
+            prefixes.add(tuple(path[:i]))
+    yield from _walk(_JsonStream(fp, chunk_size), (), dict(targets), prefixes)
+
+
+def normalize_bandit_issue(issue):
+    """Convert a Bandit result entry into the pipeline's finding shape"""
+    return {
+        'tool': 'bandit',
+        'rule_id': issue.get('test_id', 'N/A'),
+        'rule_name': issue.get('test_name', ''),
+        'severity': issue.get('issue_severity', 'LOW'),
+        'confidence': issue.get('issue_confidence', 'UNKNOWN'),
+        'file': issue.get('filename', 'N/A'),
+        'line': issue.get('line_number'),
+        'message': issue.get('issue_text', 'N/A'),
+        'code': issue.get('code', ''),
+        'more_info': issue.get('more_info', 'N/A'),
+    }
+
+
+def normalize_zap_alert(alert, tool='zap'):
+    """Convert a ZAP alert into one finding per reported instance"""
+    base = {
+        'tool': tool,
+        'rule_id': str(alert.get('pluginid', 'N/A')),
+        'rule_name': alert.get('alert') or alert.get('name', ''),
+        'severity': ZAP_RISK.get(str(alert.get('riskcode', '0')), 'INFORMATIONAL'),
+        'confidence': ZAP_CONFIDENCE.get(str(alert.get('confidence', '')), 'UNKNOWN'),
+        'line': None,
+        'message': alert.get('alert') or alert.get('name', ''),
+        'more_info': alert.get('reference', ''),
+    }
+    instances = alert.get('instances') or [{}]
+    for instance in instances:
+        finding = dict(base)
+        finding['file'] = instance.get('uri', 'N/A')
+        finding['method'] = instance.get('method', '')
+        finding['param'] = instance.get('param', '')
+        finding['code'] = instance.get('evidence', '')
+        yield finding
+
+
+def iter_bandit_findings(path, metrics=None):
+    """
+    Stream normalized findings from a Bandit JSON report
+
+    If a `metrics` dict is given it is filled with metrics._totals during
+    the same pass over the file.
+    """
+    targets = {('results',): 'items', ('metrics', '_totals'): 'value'}
+    with open(path, 'r', encoding='utf-8') as f:
+        for target, value in iter_json(f, targets):
+            if target == ('results',):
+                yield normalize_bandit_issue(value)
+            elif metrics is not None:
+                metrics.update(value)
+
+
+def iter_zap_findings(path, tool='zap'):
+    """Stream normalized findings from a ZAP-format JSON report"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for _, alert in iter_json(f, {('site', '*', 'alerts'): 'items'}):
+            yield from normalize_zap_alert(alert, tool=tool)
+
+
+def iter_secrets_findings(path):
+    """Stream findings from a secrets_report.json (already in the finding shape)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for _, finding in iter_json(f, {('results',): 'items'}):
+            yield finding
+
+
+def normalize_code(code):
+    """Strip Bandit's line-number gutter and collapse whitespace"""
+    return _SPACES.sub(' ', _CODE_LINE_NUMBER.sub('', code or '')).strip()
+
+
+def normalize_location(location, base_dir=None):
+    """
+    Make a finding location independent of checkout path and target port
+
+    Files become paths relative to base_dir, URLs keep only the path and the
+    sorted query parameter names.
+    """
+    if not location:
+        return ''
+    if '://' in location:
+        parts = urlsplit(location)
+        names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+        return parts.path + ('?' + '&'.join(names) if names else '')
+    if base_dir and os.path.isabs(location):
+        location = os.path.relpath(location, base_dir)
+    return location.replace('\\', '/')
+
+
+def flagged_code(finding):
+    """
+    The flagged source line from Bandit's code context, normalized
+
+    Bandit includes neighbouring lines, so adjacent findings of the same
+    rule share a context; only the flagged line tells them apart.
+    """
+    code = finding.get('code') or ''
+    line = finding.get('line')
+    if line is not None:
+        prefix = str(line)
+        for text in code.splitlines():
+            stripped = text.lstrip()
+            if stripped.startswith(prefix) and stripped[len(prefix):len(prefix) + 1] in (' ', '\t', ''):
+                return normalize_code(stripped[len(prefix):])
+    return normalize_code(code)
+
+
+def fingerprint(finding, base_dir=None):
+    """Stable identity of a finding: tool, rule, location and normalized code context"""
+    parts = [
+        finding.get('tool', ''),
+        str(finding.get('rule_id', '')),
+        normalize_location(finding.get('file'), base_dir),
+        finding.get('method', ''),
+        finding.get('param', ''),
+        flagged_code(finding),
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def with_fingerprints(findings, base_dir=None):
+    """Attach a 'fingerprint' key to every finding of a stream"""
+    for finding in findings:
+        finding['fingerprint'] = fingerprint(finding, base_dir)
+        yield finding
+
+
+class FindingSummary:
+    """Single-pass accumulator for totals, per-rule breakdown and top-N details"""
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        self.total = 0
+        self.severity_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+        self.by_rule = {}
+        self._top = []
+
+    def add(self, finding):
+        self.total += 1
+        severity = finding.get('severity', 'LOW')
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+
+        rule = self.by_rule.get(finding['rule_id'])
+        if rule is None:
+            rule = self.by_rule[finding['rule_id']] = {
+                'name': finding.get('rule_name', ''), 'count': 0
+            }
+        rule['count'] += 1
+
+        if self.top_n:
+            # Higher severity/confidence first, earlier findings win ties
+            key = (SEVERITY_RANK.get(severity, 0),
+                   CONFIDENCE_RANK.get(finding.get('confidence'), 0),
+                   -self.total)
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, (key, finding))
+            elif key > self._top[0][0]:
+                heapq.heapreplace(self._top, (key, finding))
+
+    def top_findings(self):
+        return [finding for _, finding in sorted(self._top, key=lambda item: item[0], reverse=True)]
+
+    def as_dict(self):
+        return {
+            'total_issues': self.total,
+            'high': self.severity_counts.get('HIGH', 0),
+            'medium': self.severity_counts.get('MEDIUM', 0),
+            'low': self.severity_counts.get('LOW', 0),
+            'informational': self.severity_counts.get('INFORMATIONAL', 0),
+            'by_test_id': self.by_rule,
+            'top_findings': self.top_findings(),
+        }
+
+
+def summarize_findings(findings, top_n=20):
+    """Consume a finding iterator once and return its FindingSummary"""
+    summary = FindingSummary(top_n=top_n)
+    for finding in findings:
+        summary.add(finding)
+    return summary
+
@@ -0,0 +1,446 @@
+"""
+Report Sinks
+Streaming writers that turn the normalized finding stream into report artifacts
+"""
+
+import os
+import re
+import json
+import glob
+import shutil
+import tempfile
+from xml.sax.saxutils import escape, quoteattr
+
+# Findings per page of the lazily loaded HTML report
+PAGE_SIZE = 500
+
+SEVERITIES = ['HIGH', 'MEDIUM', 'LOW', 'INFORMATIONAL']
+
+# Fields shipped to the browser (code context stays in the tool reports)
+PAGE_FIELDS = ('tool', 'rule_id', 'rule_name', 'severity', 'confidence',
+               'file', 'line', 'param', 'message', 'more_info', 'fingerprint')
+
+
+class PagedFindingsSink:
+    """
+    Writes findings as fixed-size pages, bucketed by severity
+
+    Pages are JavaScript files wrapping a JSON array so the report can load
+    them with <script> tags, which also works when opened from file://
+    (browsers block fetch() there). At most one page per severity is held
+    in memory, whatever the number of findings.
+    """
+
+    def __init__(self, reports_dir, page_size=PAGE_SIZE, subdir='findings'):
+        self.page_size = page_size
+        self.subdir = subdir
+        self.pages_dir = os.path.join(reports_dir, subdir)
+        os.makedirs(self.pages_dir, exist_ok=True)
+        # Pages of a previous, larger report must not be picked up
+        for stale in glob.glob(os.path.join(self.pages_dir, 'page-*.js')):
+            os.remove(stale)
+        self._buffers = {}
+        self.pages = {}
+        self.totals = {}
+        self.tools = {}
+
+    def add(self, finding):
+        severity = finding.get('severity') if finding.get('severity') in SEVERITIES else 'LOW'
+        buffer = self._buffers.setdefault(severity, [])
+        buffer.append({key: finding.get(key) for key in PAGE_FIELDS})
+        self.totals[severity] = self.totals.get(severity, 0) + 1
+        tool = finding.get('tool', 'unknown')
+        self.tools[tool] = self.tools.get(tool, 0) + 1
+        if len(buffer) >= self.page_size:
+            self._write_page(severity)
+
+    def _write_page(self, severity):
+        buffer = self._buffers.get(severity)
+        if not buffer:
+            return
+        names = self.pages.setdefault(severity, [])
+        name = f'page-{severity.lower()}-{len(names) + 1:05d}.js'
+        with open(os.path.join(self.pages_dir, name), 'w', encoding='utf-8') as f:
+            f.write(f'registerFindingsPage({json.dumps(name)}, ')
+            json.dump(buffer, f, separators=(',', ':'))
+            f.write(');\n')
+        names.append(f'{self.subdir}/{name}')
+        self._buffers[severity] = []
+
+    def close(self):
+        """Flush partial pages and return the manifest embedded in the HTML shell"""
+        for severity in SEVERITIES:
+            self._write_page(severity)
+        return {
+            'page_size': self.page_size,
+            'severities': [s for s in SEVERITIES if s in self.pages],
+            'pages': self.pages,
+            'totals': self.totals,
+            'tools': self.tools,
+        }
+
+
+# Display names and home pages of the tools behind the finding stream
+TOOL_INFO = {
+    'bandit': ('Bandit', 'https://bandit.readthedocs.io/'),
+    'secrets': ('Secrets Scanner', None),
+    'secrets-history': ('Secrets Scanner (git history)', None),
+    'zap': ('OWASP ZAP', 'https://www.zaproxy.org/'),
+    'zap-full': ('OWASP ZAP (full scan)', 'https://www.zaproxy.org/'),
+    'probe': ('Probe DAST Engine', None),
+}
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_LEVELS = {'HIGH': 'error', 'MEDIUM': 'warning', 'LOW': 'note', 'INFORMATIONAL': 'note'}
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class SarifSink:
+    """
+    Writes findings as a SARIF 2.1.0 log, one run per tool
+
+    Results are written as they arrive; only the rule table of the current
+    run is held in memory and written when the tool changes. File locations
+    become URIs relative to base_dir (the %SRCROOT% base).
+    """
+
+    def __init__(self, path, base_dir=None):
+        self.path = path
+        self.base_dir = base_dir
+        self.total = 0
+        self._file = open(path + '.tmp', 'w', encoding='utf-8')
+        self._file.write(json.dumps({'$schema': SARIF_SCHEMA, 'version': '2.1.0'})[:-1] + ', "runs": [')
+        self._tool = None
+        self._rules = {}
+        self._rule_index = {}
+        self._runs = 0
+        self._results = 0
+
+    def _start_run(self, tool):
+        self._end_run()
+        self._file.write((',' if self._runs else '') + '\n{"results": [')
+        self._tool = tool
+        self._rules = {}
+        self._rule_index = {}
+        self._results = 0
+        self._runs += 1
+
+    def _end_run(self):
+        if self._tool is None:
+            return
+        name, uri = TOOL_INFO.get(self._tool, (self._tool, None))
+        driver = {'name': name, 'rules': list(self._rules.values())}
+        if uri:
+            driver['informationUri'] = uri
+        run = {'tool': {'driver': driver}}
+        if self.base_dir:
+            root = os.path.abspath(self.base_dir).replace('\\', '/').rstrip('/')
+            run['originalUriBaseIds'] = {'SRCROOT': {'uri': f'file://{root}/'}}
+        self._file.write('\n], ' + json.dumps(run)[1:])
+        self._tool = None
+
+    def _location(self, finding):
+        location = finding.get('file') or ''
+        if '://' in location:
+            return {'physicalLocation': {'artifactLocation': {'uri': location}}}
+        artifact = {'uri': location.replace('\\', '/')}
+        if self.base_dir and os.path.isabs(location):
+            artifact = {'uri': os.path.relpath(location, self.base_dir).replace('\\', '/'), 'uriBaseId': 'SRCROOT'}
+        physical = {'artifactLocation': artifact}
+        if finding.get('line'):
+            physical['region'] = {'startLine': int(finding['line'])}
+        return {'physicalLocation': physical}
+
+    def add(self, finding):
+        tool = finding.get('tool', 'unknown')
+        if tool != self._tool:
+            self._start_run(tool)
+        rule_id = str(finding.get('rule_id', ''))
+        if rule_id not in self._rules:
+            rule = {'id': rule_id, 'name': finding.get('rule_name') or rule_id}
+            if finding.get('more_info'):
+                rule['helpUri'] = finding['more_info']
+            self._rule_index[rule_id] = len(self._rules)
+            self._rules[rule_id] = rule
+        result = {
+            'ruleId': rule_id,
+            'ruleIndex': self._rule_index[rule_id],
+            'level': SARIF_LEVELS.get(finding.get('severity'), 'note'),
+            'message': {'text': finding.get('message') or finding.get('rule_name') or rule_id},
+            'locations': [self._location(finding)],
+            'properties': {'severity': finding.get('severity'), 'confidence': finding.get('confidence')},
+        }
+        if finding.get('fingerprint'):
+            result['partialFingerprints'] = {'securityPipelineFingerprint/v1': finding['fingerprint']}
+        self._file.write((',' if self._results else '') + '\n' + json.dumps(result))
+        self._results += 1
+        self.total += 1
+
+    def close(self):
+        """Finish the log and move it into place; returns its path"""
+        self._end_run()
+        self._file.write('\n]}\n')
+        self._file.close()
+        os.replace(self.path + '.tmp', self.path)
+        return self.path
+
+
+class JUnitSink:
+    """
+    Writes findings as JUnit XML, one test suite per tool and one failed
+    test case per finding
+
+    JUnit puts the test and failure counts on the suite element, ahead of
+    its test cases, so each suite's cases are streamed to a spool file and
+    copied behind the suite header once the counts are known.
+    """
+
+    def __init__(self, path, suite_prefix='security'):
+        self.path = path
+        self.suite_prefix = suite_prefix
+        self.total = 0
+        self._spools = {}
+        self._counts = {}
+
+    def add(self, finding):
+        tool = finding.get('tool', 'unknown')
+        spool = self._spools.get(tool)
+        if spool is None:
+            spool = self._spools[tool] = tempfile.TemporaryFile('w+', encoding='utf-8')
+            self._counts[tool] = 0
+        location = finding.get('file') or ''
+        if finding.get('line'):
+            location = f"{location}:{finding['line']}"
+        name = f"{finding.get('rule_id', '')} {location}".strip()
+        message = finding.get('message') or finding.get('rule_name') or ''
+        details = '\n'.join(part for part in (
+            f"{finding.get('rule_name', '')} ({finding.get('severity')}, confidence {finding.get('confidence')})",
+            location,
+            finding.get('code') or '',
+            finding.get('more_info') or '',
+        ) if part)
+        spool.write(
+            f'    <testcase classname={_xml_attr(f"{self.suite_prefix}.{tool}")} name={_xml_attr(name)}>\n'
+            f'      <failure type={_xml_attr(finding.get("severity") or "")} message={_xml_attr(message)}>'
+            f'{escape(_XML_INVALID.sub("", details))}</failure>\n'
+            f'    </testcase>\n'
+        )
+        self._counts[tool] += 1
+        self.total += 1
+
+    def close(self):
+        """Write the suites and move the file into place; returns its path"""
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write(f'<testsuites name={_xml_attr(self.suite_prefix)} tests="{self.total}" '
+                    f'failures="{self.total}">\n')
+            for tool, spool in self._spools.items():
+                count = self._counts[tool]
+                f.write(f'  <testsuite name={_xml_attr(f"{self.suite_prefix}.{tool}")} tests="{count}" '
+                        f'failures="{count}" errors="0" skipped="0">\n')
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+                f.write('  </testsuite>\n')
+            f.write('</testsuites>\n')
+        os.replace(self.path + '.tmp', self.path)
+        self._spools = {}
+        return self.path
+
+
+def _xml_attr(value):
+    return quoteattr(_XML_INVALID.sub('', str(value)))
+
+
+FINDINGS_BROWSER_STYLE = """
+        .toolbar {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 10px;
+            align-items: center;
+            margin-bottom: 15px;
+        }
+        .toolbar select, .toolbar input, .toolbar button {
+            background: rgba(255,255,255,0.08);
+            color: #eee;
+            border: 1px solid rgba(255,255,255,0.2);
+            border-radius: 8px;
+            padding: 6px 10px;
+        }
+        .toolbar button { cursor: pointer; }
+        #findings-table td { font-size: 0.9em; word-break: break-all; }
+        #findings-status { color: #888; }
+"""
+
+FINDINGS_BROWSER_SCRIPT = """
+<script>
+(function () {
+    var manifest = __MANIFEST__;
+    var loaded = {};        // page name -> true once its script ran
+    var nextPage = {};      // severity -> index of the next page to load
+    var findings = [];
+    var shown = 200;
+    var rank = {HIGH: 3, MEDIUM: 2, LOW: 1, INFORMATIONAL: 0};
+
+    window.registerFindingsPage = function (name, items) {
+        loaded[name] = true;
+        Array.prototype.push.apply(findings, items);
+    };
+
+    function selectedSeverities() {
+        var value = document.getElementById('severity-filter').value;
+        return value ? [value] : manifest.severities;
+    }
+
+    function loadScript(src) {
+        return new Promise(function (resolve, reject) {
+            var script = document.createElement('script');
+            script.src = src;
+            script.onload = resolve;
+            script.onerror = reject;
+            document.head.appendChild(script);
+        });
+    }
+
+    // Loads the next page of the most severe selected bucket that has one left
+    function loadMore() {
+        var severities = selectedSeverities();
+        for (var i = 0; i < severities.length; i++) {
+            var severity = severities[i];
+            var pages = manifest.pages[severity] || [];
+            var index = nextPage[severity] || 0;
+            if (index < pages.length) {
+                nextPage[severity] = index + 1;
+                return loadScript(pages[index]).then(render);
+            }
+        }
+        return Promise.resolve();
+    }
+
+    function pendingPages() {
+        return selectedSeverities().reduce(function (sum, severity) {
+            return sum + (manifest.pages[severity] || []).length - (nextPage[severity] || 0);
+        }, 0);
+    }
+
+    function cell(row, text) {
+        var td = document.createElement('td');
+        td.textContent = text === null || text === undefined ? '' : text;
+        row.appendChild(td);
+    }
+
+    function render() {
+        var severity = document.getElementById('severity-filter').value;
+        var tool = document.getElementById('tool-filter').value;
+        var text = document.getElementById('text-filter').value.toLowerCase();
+        var sortKey = document.getElementById('sort-key').value;
+
+        var rows = findings.filter(function (f) {
+            if (severity && f.severity !== severity) return false;
+            if (tool && f.tool !== tool) return false;
+            if (text) {
+                var haystack = [f.rule_id, f.rule_name, f.file, f.message].join(' ').toLowerCase();
+                if (haystack.indexOf(text) === -1) return false;
+            }
+            return true;
+        });
+        rows.sort(function (a, b) {
+            if (sortKey === 'severity') return rank[b.severity] - rank[a.severity];
+            var x = String(a[sortKey] || ''), y = String(b[sortKey] || '');
+            return x < y ? -1 : x > y ? 1 : 0;
+        });
+
+        var body = document.getElementById('findings-body');
+        body.textContent = '';
+        rows.slice(0, shown).forEach(function (f) {
+            var row = document.createElement('tr');
+            cell(row, f.severity);
+            cell(row, f.tool);
+            cell(row, f.rule_id + (f.rule_name ? ' ' + f.rule_name : ''));
+            cell(row, f.file + (f.line ? ':' + f.line : '') + (f.param ? ' [' + f.param + ']' : ''));
+            cell(row, f.message);
+            body.appendChild(row);
+        });
+
+        var total = selectedSeverities().reduce(function (sum, s) {
+            return sum + (manifest.totals[s] || 0);
+        }, 0);
+        document.getElementById('findings-status').textContent =
+            'Showing ' + Math.min(shown, rows.length) + ' of ' + rows.length +
+            ' matching loaded findings (' + findings.length + ' of ' + total + ' loaded)';
+        document.getElementById('load-more').disabled = pendingPages() === 0 && shown >= rows.length;
+    }
+
+    function onFilterChange() {
+        shown = 200;
+        if (findings.filter(function (f) {
+                return selectedSeverities().indexOf(f.severity) !== -1;
+            }).length === 0) {
+            loadMore();
+        } else {
+            render();
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        ['severity-filter', 'tool-filter', 'sort-key'].forEach(function (id) {
+            document.getElementById(id).addEventListener('change', onFilterChange);
+        });
+        document.getElementById('text-filter').addEventListener('input', render);
+        document.getElementById('load-more').addEventListener('click', function () {
+            shown += 200;
+            loadMore().then(render);
+        });
+        loadMore().then(render);
+    });
+})();
+</script>
+"""
+
+
+def render_findings_browser(manifest):
+    """HTML for the findings card: toolbar, empty table and the page loader"""
+    if not manifest or not manifest['severities']:
+        return '<p class="success">No findings to list.</p>'
+
+    options = ''.join(
+        f'<option value="{s}">{s.title()} ({manifest["totals"][s]})</option>'
+        for s in manifest['severities']
+    )
+    # Only the tools that reported something, known ones first
+    tools = manifest.get('tools', {})
+    order = list(TOOL_INFO)
+    tool_options = ''.join(
+        f'<option value={quoteattr(t)}>{escape(TOOL_INFO.get(t, (t,))[0])} ({tools[t]})</option>'
+        for t in sorted(tools, key=lambda t: (order.index(t) if t in order else len(order), t))
+    )
+    script = FINDINGS_BROWSER_SCRIPT.replace('__MANIFEST__', json.dumps(manifest))
+    return f"""
+            <div class="toolbar">
+                <select id="severity-filter">
+                    <option value="">All severities</option>
+                    {options}
+                </select>
+                <select id="tool-filter">
+                    <option value="">All tools</option>
+                    {tool_options}
+                </select>
+                <select id="sort-key">
+                    <option value="severity">Sort by severity</option>
+                    <option value="rule_id">Sort by rule</option>
+                    <option value="file">Sort by location</option>
+                </select>
+                <input id="text-filter" type="search" placeholder="Filter text...">
+                <button id="load-more">Load more</button>
+                <span id="findings-status"></span>
+            </div>
+            <table id="findings-table">
+                <thead>
+                    <tr><th>Severity</th><th>Tool</th><th>Rule</th><th>Location</th><th>Issue</th></tr>
+                </thead>
+                <tbody id="findings-body"></tbody>
+            </table>
+            {script}
+    """
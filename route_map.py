@@ -0,0 +1,197 @@
+"""
+Route Map Export
+Turns the Flask url_map into OpenAPI / URL seeds so DAST does not have to
+discover the application by spidering it
+"""
+
+import os
+import sys
+import ast
+import json
+import hashlib
+import inspect
+import textwrap
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Request attributes whose .get()/[] lookups are treated as query parameters
+QUERY_SOURCES = {'args', 'values'}
+
+# Endpoints that are framework plumbing rather than application surface
+IGNORED_ENDPOINTS = {'static'}
+
+
+def load_app(module_name='server_main'):
+    """Import the target module and return its Flask app"""
+    return __import__(module_name).app
+
+
+def view_query_params(view):
+    """
+    Query parameters a view reads, found by walking its AST
+
+    Recognizes request.args.get('name', default) and request.args['name'].
+    Returns a list of {'name', 'default'} dicts in source order.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(inspect.unwrap(view)))
+    except (OSError, TypeError):
+        return []
+
+    params = []
+    seen = set()
+    for node in ast.walk(ast.parse(source)):
+        name = default = None
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'get' and _is_request_source(node.func.value)
+                and node.args and isinstance(node.args[0], ast.Constant)):
+            name = node.args[0].value
+            if len(node.args) > 1 and isinstance(node.args[1], ast.Constant):
+                default = node.args[1].value
+        elif (isinstance(node, ast.Subscript) and _is_request_source(node.value)
+                and isinstance(node.slice, ast.Constant)):
+            name = node.slice.value
+        if isinstance(name, str) and name not in seen:
+            seen.add(name)
+            params.append(((node.lineno, node.col_offset), {'name': name, 'default': default}))
+
+    # ast.walk is breadth-first; report parameters in the order they appear
+    return [param for _, param in sorted(params, key=lambda item: item[0])]
+
+
+def _is_request_source(node):
+    return (isinstance(node, ast.Attribute) and node.attr in QUERY_SOURCES
+            and isinstance(node.value, ast.Name) and node.value.id == 'request')
+
+
+def _source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return None
+
+
+def view_fingerprint(view):
+    """
+    Hash of a view's source and of the module-level functions it calls
+
+    Helpers are followed one level deep: editing a function the view calls
+    directly changes the fingerprint, deeper call chains are not tracked.
+    """
+    view = inspect.unwrap(view)
+    source = _source(view)
+    if source is None:
+        return None
+
+    digest = hashlib.sha256(source.encode())
+    module_globals = getattr(view, '__globals__', {})
+    code = getattr(view, '__code__', None)
+    for name in sorted(set(code.co_names)) if code else []:
+        helper = module_globals.get(name)
+        if (inspect.isfunction(helper) and helper is not view
+                and helper.__module__ == view.__module__):
+            digest.update(f'\0{name}\0'.encode())
+            digest.update((_source(helper) or '').encode())
+    return digest.hexdigest()
+
+
+def collect_routes(app):
+    """Every application route with its methods, view and query parameters"""
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in IGNORED_ENDPOINTS:
+            continue
+        view = app.view_functions[rule.endpoint]
+        routes.append({
+            'rule': rule.rule,
+            'endpoint': rule.endpoint,
+            'methods': sorted(rule.methods - {'HEAD', 'OPTIONS'}),
+            'path_params': sorted(rule.arguments),
+            'query_params': view_query_params(view),
+            'fingerprint': view_fingerprint(view),
+            'view': view,
+        })
+    return sorted(routes, key=lambda r: r['rule'])
+
+
+def _openapi_path(rule):
+    """Convert Flask's /items/<int:id> syntax to OpenAPI's /items/{id}"""
+    parts = []
+    for segment in rule.split('/'):
+        if segment.startswith('<') and segment.endswith('>'):
+            segment = '{' + segment[1:-1].split(':')[-1] + '}'
+        parts.append(segment)
+    return '/'.join(parts)
+
+
+def build_openapi(routes, server_url, title='CorpNet Diagnostics'):
+    """OpenAPI 3.0 document describing every route and its query parameters"""
+    paths = {}
+    for route in routes:
+        operations = paths.setdefault(_openapi_path(route['rule']), {})
+        parameters = [
+            {'name': name, 'in': 'path', 'required': True, 'schema': {'type': 'string'}}
+            for name in route['path_params']
+        ]
+        for param in route['query_params']:
+            schema = {'type': 'string'}
+            if param['default'] is not None:
+                schema['example'] = str(param['default'])
+            parameters.append({'name': param['name'], 'in': 'query', 'required': False, 'schema': schema})
+        for method in route['methods']:
+            operations[method.lower()] = {
+                'operationId': f"{route['endpoint']}_{method.lower()}",
+                'parameters': parameters,
+                'responses': {'200': {'description': 'OK'}},
+            }
+    return {
+        'openapi': '3.0.3',
+        'info': {'title': title, 'version': '1.0'},
+        'servers': [{'url': server_url}],
+        'paths': paths,
+    }
+
+
+def build_url_seeds(routes, base_url):
+    """Concrete GET URLs with every query parameter filled in"""
+    urls = []
+    for route in routes:
+        if 'GET' not in route['methods'] or route['path_params']:
+            continue
+        query = {p['name']: p['default'] if p['default'] not in (None, '') else 'test'
+                 for p in route['query_params']}
+        url = base_url.rstrip('/') + route['rule']
+        urls.append(url + ('?' + urlencode(query) if query else ''))
+    return urls
+
+
+def export_route_seeds(target_url, reports_dir=None, app=None):
+    """
+    Write reports/openapi.json and reports/url_seeds.txt for the target
+
+    Returns a dict with both paths and the number of routes exported.
+    """
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+
+    routes = collect_routes(app or load_app())
+
+    openapi_path = os.path.join(reports_dir, 'openapi.json')
+    with open(openapi_path, 'w') as f:
+        json.dump(build_openapi(routes, target_url), f, indent=2)
+
+    seeds_path = os.path.join(reports_dir, 'url_seeds.txt')
+    with open(seeds_path, 'w') as f:
+        f.write('\n'.join(build_url_seeds(routes, target_url)) + '\n')
+
+    return {'openapi': openapi_path, 'urls': seeds_path, 'routes': len(routes)}
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000'
+    result = export_route_seeds(target)
+    print(f"✅ Exported {result['routes']} routes")
+    print(f"   • OpenAPI: {result['openapi']}")
+    print(f"   • URLs:    {result['urls']}")
@@ -0,0 +1,297 @@
+"""
+Pipeline Benchmark
+Replays the SAST phase and report generation over synthetic codebases
+to measure how the pipeline scales with repository size
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from run_sast import run_bandit_scan
+from security_pipeline import generate_consolidated_report
+
+
+# Vulnerable snippets modelled on the legacy endpoints in server_main.py
+INJECTED_PATTERNS = [
+    'DATABASE_PASSWORD = "admin{n}"',
+    'SECRET_KEY = "super_secret_key_{n}"',
+    'def lookup_{n}(conn, user_id):\n'
+    '    return conn.execute(f"SELECT * FROM users WHERE id = {{user_id}}").fetchone()',
+    'def ping_{n}(host):\n'
+    '    return subprocess.check_output(f"ping -n 1 {{host}}", shell=True, timeout=5)',
+    'def digest_{n}(value):\n'
+    '    return hashlib.md5(value.encode()).hexdigest()',
+    'def render_{n}(query):\n'
+    '    return render_template_string(f"<p>{{query}}</p>")',
+]
+
+FILE_HEADER = (
+    'import subprocess\n'
+    'import hashlib\n'
+    'from flask import render_template_string\n\n'
+)
+
+DEFAULT_SIZES = [(10, 100), (50, 200), (200, 200)]
+
+
+def generate_synthetic_tree(root, n_files, lines_per_file, pattern_every=20, seed=0):
+    """
+    Write N synthetic Python files of roughly M lines each under root
+
+    Every `pattern_every` lines one of the INJECTED_PATTERNS is emitted,
+    the rest is benign filler code. Returns the number of injected patterns.
+    """
+    rng = random.Random(seed)
+    injected = 0
+
+    for i in range(n_files):
+        package = os.path.join(root, f'pkg_{i // 100:03d}')
+        os.makedirs(package, exist_ok=True)
+
+        lines = [FILE_HEADER]
+        written = FILE_HEADER.count('\n')
+        n = 0
+        while written < lines_per_file:
+            if n % pattern_every == 0:
+                snippet = rng.choice(INJECTED_PATTERNS).format(n=f'{i}_{n}')
+                injected += 1
+            else:
+                snippet = f'def helper_{i}_{n}(a, b):\n    return a * {n} + b'
+            lines.append(snippet + '\n\n')
+            written += snippet.count('\n') + 2
+            n += 1
+
+        with open(os.path.join(package, f'module_{i:05d}.py'), 'w') as f:
+            f.writelines(lines)
+
+    return injected
+
+
+def _child_peak_rss_kb():
+    """
+    Largest peak resident set size of any finished child process (KB, 0 if unknown)
+
+    This is a high-water mark over the life of the calling process, not a
+    per-call figure; benchmark_size_isolated gives each size its own process.
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def benchmark_size(n_files, lines_per_file, workdir=None, keep=False):
+    """Generate one synthetic tree, scan it and build the report"""
+    root = tempfile.mkdtemp(prefix=f'bench_{n_files}x{lines_per_file}_', dir=workdir)
+    src_dir = os.path.join(root, 'src')
+    reports_dir = os.path.join(root, 'reports')
+
+    try:
+        injected = generate_synthetic_tree(src_dir, n_files, lines_per_file)
+
+        # Scanner output for large trees is huge, keep it off the console
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            tracemalloc.start()
+            start = time.perf_counter()
+            sast_result = run_bandit_scan(target=src_dir, reports_dir=reports_dir)
+            sast_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            generate_consolidated_report(
+                sast_result, {'success': False, 'error': 'Skipped'}, reports_dir=reports_dir
+            )
+            report_time = time.perf_counter() - start
+            _, py_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        wall = sast_time + report_time
+        return {
+            'files': n_files,
+            'lines_per_file': lines_per_file,
+            'injected_patterns': injected,
+            'success': sast_result.get('success', False),
+            'total_issues': sast_result.get('total_issues', 0),
+            'sast_seconds': round(sast_time, 3),
+            'report_seconds': round(report_time, 3),
+            'wall_seconds': round(wall, 3),
+            'files_per_second': round(n_files / wall, 1) if wall else None,
+            'python_peak_mb': round(py_peak / (1024 * 1024), 2),
+            'scanner_peak_rss_mb': round(_child_peak_rss_kb() / 1024, 2),
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def benchmark_size_isolated(n_files, lines_per_file, workdir=None, keep=False):
+    """benchmark_size in a fresh worker process, so the scanner peak RSS covers this size only"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(benchmark_size, n_files, lines_per_file, workdir=workdir, keep=keep).result()
+
+
+def run_benchmark(sizes=None, output=None, keep=False):
+    """Run the benchmark for every (files, lines) size and save the results"""
+    sizes = sizes or DEFAULT_SIZES
+
+    print("=" * 60)
+    print("⏱️ PIPELINE BENCHMARK - SAST + Report Generation")
+    print("=" * 60)
+
+    results = []
+    for n_files, lines_per_file in sizes:
+        print(f"\n🔄 Benchmarking {n_files} files x {lines_per_file} lines...")
+        row = benchmark_size_isolated(n_files, lines_per_file, keep=keep)
+        results.append(row)
+        status = "✅" if row['success'] else "❌"
+        print(f"   {status} {row['wall_seconds']}s wall | "
+              f"{row['files_per_second']} files/s | "
+              f"{row['total_issues']} issues | "
+              f"py peak {row['python_peak_mb']} MB | "
+              f"scanner peak {row['scanner_peak_rss_mb']} MB")
+
+    if output is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        output = os.path.join(reports_dir, 'benchmark_results.json')
+
+    with open(output, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'results': results
+        }, f, indent=2)
+
+    print(f"\n📄 Benchmark results saved to: {output}")
+    return results
+
+
+# Runs in a fresh interpreter so nothing is imported or cached yet; times
+# are seconds since the interpreter started importing server_main
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import server_main
+marks = {'import': time.perf_counter()}
+app = server_main.create_app({'USERS_DB': sys.argv[1], 'TESTING': True})
+marks['create_app'] = time.perf_counter()
+client = app.test_client()
+client.get('/')
+marks['first_request'] = time.perf_counter()
+client.get('/api/v1/profile?id=1')
+marks['first_db_request'] = time.perf_counter()
+print(json.dumps({name: mark - start for name, mark in marks.items()}))
+"""
+
+
+def _startup_sample(db_path):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', STARTUP_PROBE, db_path], cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample['process'] = time.perf_counter() - start
+    return sample
+
+
+def benchmark_startup(runs=5, workdir=None):
+    """
+    Median cold-start timings (ms) of server_main over fresh interpreters
+
+    Each run starts once against a new database (schema created on the
+    first DB request) and once more against the database it left behind
+    (schema only checked).
+    """
+    samples = {'new_db': [], 'existing_db': []}
+    for _ in range(runs):
+        root = tempfile.mkdtemp(prefix='bench_startup_', dir=workdir)
+        try:
+            db_path = os.path.join(root, 'users.db')
+            samples['new_db'].append(_startup_sample(db_path))
+            samples['existing_db'].append(_startup_sample(db_path))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return {
+        variant: {name: round(statistics.median(s[name] for s in rows) * 1000, 1) for name in rows[0]}
+        for variant, rows in samples.items()
+    }
+
+
+def run_startup_benchmark(runs=5, output=None):
+    """Measure import, app creation and first-request latency and save the results"""
+    print("=" * 60)
+    print("⏱️ STARTUP BENCHMARK - Diagnostics Server Cold Start")
+    print("=" * 60)
+
+    results = benchmark_startup(runs)
+    for variant, timings in results.items():
+        print(f"\n🔄 {variant.replace('_', ' ')} (median of {runs}, ms since import started)")
+        print(f"   import {timings['import']} | create_app {timings['create_app']} | "
+              f"first request {timings['first_request']} | first DB request {timings['first_db_request']} | "
+              f"whole process {timings['process']}")
+
+    if output is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        output = os.path.join(reports_dir, 'startup_benchmark.json')
+
+    with open(output, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'runs': runs,
+            'results': results
+        }, f, indent=2)
+
+    print(f"\n📄 Startup results saved to: {output}")
+    return results
+
+
+def parse_sizes(spec):
+    """Parse a size list such as '10x100,100x200' into [(10, 100), (100, 200)]"""
+    sizes = []
+    for item in spec.split(','):
+        files, lines = item.lower().split('x')
+        sizes.append((int(files), int(lines)))
+    return sizes
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Security Pipeline Benchmark')
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                        help='Comma-separated FILESxLINES list (e.g. 10x100,100x200)')
+    parser.add_argument('--output', help='Where to write the JSON results')
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep the generated trees and reports')
+    parser.add_argument('--startup', type=int, metavar='RUNS', default=None,
+                        help='Measure diagnostics server cold start over RUNS fresh processes instead')
+
+    args = parser.parse_args()
+    if args.startup:
+        run_startup_benchmark(args.startup, output=args.output)
+    else:
+        run_benchmark(args.sizes, output=args.output, keep=args.keep)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,91 @@ import subprocess
 import os
 import time
 import sys
+import shutil
 
-def run_zap_baseline_scan(target_url="http://localhost:5000"):
+from report_parser import iter_zap_findings, summarize_findings, with_fingerprints
+from findings_store import FindingsStore, default_store_path
+from baseline import Baseline
+
+def summarize_dast_report(json_report, reports_dir, tool='zap'):
+    """
+    Stream a ZAP-format JSON report through the baseline, history store and
+    summary in one pass, print the totals and return (alerts, delta, suppressed)
+    """
+    baseline = Baseline.load()
+    with FindingsStore(default_store_path(reports_dir)) as store:
+        recorder = store.start_run(tool)
+        try:
+            findings = baseline.filter(with_fingerprints(iter_zap_findings(json_report, tool=tool)))
+            alerts = summarize_findings(recorder.track(findings)).as_dict()
+        except (OSError, ValueError):
+            recorder.abort()
+            raise
+        delta = recorder.finish()
+
+    print(f"\n🚨 Alerts Found: {alerts['total_issues']}")
+    print(f"   • HIGH Risk:   {alerts['high']}")
+    print(f"   • MEDIUM Risk: {alerts['medium']}")
+    print(f"   • LOW Risk:    {alerts['low']}")
+    print(f"   • INFO:        {alerts['informational']}")
+    if baseline.suppressed:
+        print(f"   • Baselined (suppressed): {baseline.suppressed}")
+    if delta['previous_run_id'] is not None:
+        print(f"\n📈 Since last run: {delta['new']} new | "
+              f"{delta['fixed']} fixed | {delta['unchanged']} unchanged")
+    return alerts, delta, baseline.suppressed
+
+
+def zap_seed_options(seed_file, reports_dir, docker_target):
+    """
+    ZAP options importing an OpenAPI seed from the mounted reports directory
+
+    The seed is copied into reports_dir if needed, since that is the only
+    host directory the container can see (as /zap/wrk).
+    """
+    if os.path.dirname(os.path.abspath(seed_file)) != os.path.abspath(reports_dir):
+        shutil.copy(seed_file, reports_dir)
+    name = os.path.basename(seed_file)
+    return ['-z', f'-openapifile /zap/wrk/{name} -openapitargeturl {docker_target}']
+
+
+def zap_container_name(kind):
+    """Unique name so a timed-out scan's container can be stopped"""
+    return f"security-pipeline-zap-{kind}-{os.getpid()}-{int(time.time())}"
+
+
+def run_zap_container(cmd, container_name, timeout):
+    """
+    Run a ZAP docker command, stopping its container if the timeout hits
+
+    Killing the docker client alone leaves the container scanning in the
+    background, so it is stopped by name before TimeoutExpired propagates.
+    """
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print(f"⏹️ Stopping ZAP container {container_name}...")
+        try:
+            subprocess.run(['docker', 'stop', '-t', '5', container_name],
+                           capture_output=True, timeout=60)
+        except (subprocess.TimeoutExpired, OSError):
+            pass
+        raise
+
+
+def run_zap_baseline_scan(target_url="http://localhost:5000", seed_file=None, spider_minutes=None,
+                          reports_dir=None, timeout=600):
     """
     Execute OWASP ZAP baseline scan using Docker
     This is a quick scan suitable for CI/CD pipelines
+    
+    Args:
+        target_url: Base URL of the running application
+        seed_file: OpenAPI document (see route_map.py) imported before spidering
+        spider_minutes: Spider budget; defaults to 0 (just the ~10s grace
+                        period) when seeded and to ZAP's own default otherwise
+        reports_dir: Output directory for reports (defaults to ./reports)
+        timeout: Seconds before the scan is cancelled and its container stopped
     """
     
     print("=" * 60)
@@ -19,7 +99,8 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
     print("=" * 60)
     
     # Create reports directory
-    reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     
     # Report file paths
@@ -43,9 +124,10 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
     # ZAP Baseline scan command
     # Using host.docker.internal for Windows/Mac to access host's localhost
     docker_target = target_url.replace('localhost', 'host.docker.internal')
+    container_name = zap_container_name('baseline')
     
     cmd = [
-        'docker', 'run', '--rm',
+        'docker', 'run', '--rm', '--name', container_name,
         '-v', f'{reports_dir}:/zap/wrk:rw',
         '--add-host=host.docker.internal:host-gateway',
         'ghcr.io/zaproxy/zaproxy:stable',
@@ -56,16 +138,20 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
         '-I'  # Continue even if warnings found
     ]
     
+    # Known routes are imported up front, so the spider only needs a short pass
+    if seed_file:
+        cmd += zap_seed_options(seed_file, reports_dir, docker_target)
+        print(f"🌱 Seeding scan with routes from: {seed_file}")
+        if spider_minutes is None:
+            spider_minutes = 0
+    if spider_minutes is not None:
+        cmd += ['-m', str(spider_minutes)]
+    
     print(f"📌 Running command:")
     print(f"   {' '.join(cmd)}\n")
     
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout
-        )
+        result = run_zap_container(cmd, container_name, timeout)
         
         print("\n" + "=" * 60)
         print("📊 ZAP SCAN OUTPUT")
@@ -89,6 +175,14 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
         for report in reports_generated:
             print(f"   • {report}")
         
+        # Summarize alerts in a single streaming pass over the JSON report
+        alerts, delta, suppressed = None, None, 0
+        if os.path.exists(json_report):
+            try:
+                alerts, delta, suppressed = summarize_dast_report(json_report, reports_dir)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not parse ZAP JSON report: {e}")
+        
         # Return code meanings:
         # 0: No warnings
         # 1: Only informational alerts
@@ -98,6 +192,9 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
         scan_result = {
             'success': True,
             'return_code': result.returncode,
+            'alerts': alerts,
+            'delta': delta,
+            'suppressed': suppressed,
             'reports': {
                 'html': html_report if os.path.exists(html_report) else None,
                 'json': json_report if os.path.exists(json_report) else None
@@ -116,29 +213,37 @@ def run_zap_baseline_scan(target_url="http://localhost:5000"):
         return scan_result
         
     except subprocess.TimeoutExpired:
-        print("❌ Error: Scan timed out after 10 minutes")
+        print(f"❌ Error: Scan timed out after {timeout:.0f} seconds")
         return {'success': False, 'error': 'Timeout'}
     except Exception as e:
         print(f"❌ Error during scan: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 
-def run_zap_full_scan(target_url="http://localhost:5000"):
+def run_zap_full_scan(target_url="http://localhost:5000", reports_dir=None, timeout=1800):
     """
     Execute OWASP ZAP full scan (more thorough but slower)
+
+    Findings are recorded as tool 'zap-full', so the history diffs full
+    scans against full scans and baseline scans against baseline scans.
     """
     
     print("=" * 60)
     print("🌐 DAST FULL SCAN - OWASP ZAP")
     print("=" * 60)
     
-    reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     
+    html_report = os.path.join(reports_dir, 'zap_full_report.html')
+    json_report = os.path.join(reports_dir, 'zap_full_report.json')
+    
     docker_target = target_url.replace('localhost', 'host.docker.internal')
+    container_name = zap_container_name('full')
     
     cmd = [
-        'docker', 'run', '--rm',
+        'docker', 'run', '--rm', '--name', container_name,
         '-v', f'{reports_dir}:/zap/wrk:rw',
         '--add-host=host.docker.internal:host-gateway',
         'ghcr.io/zaproxy/zaproxy:stable',
@@ -150,12 +255,35 @@ def run_zap_full_scan(target_url="http://localhost:5000"):
     ]
     
     print(f"\n🎯 Target: {target_url}")
-    print("⏱️ Full scan may take 15-30 minutes...")
+    print(f"⏱️ Full scan may take 15-30 minutes (cancelled after {timeout:.0f}s)...")
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+        result = run_zap_container(cmd, container_name, timeout)
         print(result.stdout)
-        return {'success': True, 'output': result.stdout}
+        
+        alerts, delta, suppressed = None, None, 0
+        if os.path.exists(json_report):
+            try:
+                alerts, delta, suppressed = summarize_dast_report(json_report, reports_dir, tool='zap-full')
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not parse ZAP JSON report: {e}")
+        
+        return {
+            'success': True,
+            'engine': 'zap-full',
+            'output': result.stdout,
+            'return_code': result.returncode,
+            'alerts': alerts,
+            'delta': delta,
+            'suppressed': suppressed,
+            'reports': {
+                'html': html_report if os.path.exists(html_report) else None,
+                'json': json_report if os.path.exists(json_report) else None
+            }
+        }
+    except subprocess.TimeoutExpired:
+        print(f"❌ Error: Full scan timed out after {timeout:.0f} seconds")
+        return {'success': False, 'error': 'Timeout'}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
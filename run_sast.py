@@ -5,18 +5,112 @@ Runs static analysis on Python code and generates reports
 
 import subprocess
 import os
-import json
+import time
 from datetime import datetime
 
-def run_bandit_scan():
-    """Execute Bandit SAST scan and generate reports"""
+from report_parser import iter_bandit_findings, summarize_findings, with_fingerprints
+from findings_store import FindingsStore, default_store_path
+from baseline import Baseline
+
+# Number of findings printed in detail (the JSON report keeps all of them)
+DETAIL_LIMIT = 25
+
+# Ways to run Bandit: 'cli' spawns the bandit command, 'daemon' asks a running
+# scanner_daemon, 'inprocess' imports Bandit here; 'auto' tries them warmest first
+ENGINES = ('auto', 'daemon', 'inprocess', 'cli')
+
+
+def _time_left(deadline):
+    """Seconds until deadline (None: no deadline); raises TimeoutExpired once it passed"""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise subprocess.TimeoutExpired('bandit', 0)
+    return left
+
+
+def _run_bandit_cli(target, json_report, html_report, txt_report, deadline=None):
+    """Generate the three reports with one bandit process per format"""
+    # Generate JSON report
+    subprocess.run(
+        ['bandit', '-r', target, '-f', 'json', '-o', json_report],
+        capture_output=True,
+        text=True,
+        timeout=_time_left(deadline)
+    )
+    
+    # Generate HTML report
+    subprocess.run(
+        ['bandit', '-r', target, '-f', 'html', '-o', html_report],
+        capture_output=True,
+        text=True,
+        timeout=_time_left(deadline)
+    )
+    
+    # Generate console output and save to txt
+    console_result = subprocess.run(
+        ['bandit', '-r', target, '-f', 'txt'],
+        capture_output=True,
+        text=True,
+        timeout=_time_left(deadline)
+    )
+    
+    with open(txt_report, 'w') as f:
+        f.write(console_result.stdout)
+
+
+def _generate_reports(engine, target, json_report, html_report, txt_report, deadline=None):
+    """Write the Bandit reports with the requested engine; returns the engine used"""
+    reports = {'json': json_report, 'html': html_report, 'txt': txt_report}
+    
+    if engine in ('auto', 'daemon'):
+        from scanner_daemon import scan_via_daemon, SCAN_TIMEOUT
+        timeout = _time_left(deadline)
+        response = scan_via_daemon(target, reports,
+                                   timeout=SCAN_TIMEOUT if timeout is None else min(SCAN_TIMEOUT, timeout))
+        if response is not None:
+            if not response['success']:
+                raise RuntimeError(response['error'])
+            return 'daemon'
+        if engine == 'daemon':
+            raise RuntimeError('Scanner daemon not running (start it with: python scanner_daemon.py start)')
+    
+    # An in-process scan cannot be interrupted, so a deadline leaves it to the CLI
+    if engine == 'inprocess' or (engine == 'auto' and deadline is None):
+        from scanner_daemon import WarmScanner
+        try:
+            scanner = WarmScanner()
+        except ImportError:
+            if engine == 'inprocess':
+                raise FileNotFoundError('bandit')
+        else:
+            scanner.scan(target, reports)
+            return 'inprocess'
+    
+    _run_bandit_cli(target, json_report, html_report, txt_report, deadline)
+    return 'cli'
+
+
+def run_bandit_scan(target=None, reports_dir=None, engine='cli', timeout=None):
+    """
+    Execute Bandit SAST scan and generate reports
+
+    Args:
+        target: File or directory to scan (defaults to server_main.py)
+        reports_dir: Output directory for reports (defaults to ./reports)
+        engine: One of ENGINES; 'auto' uses the warm daemon when it runs
+        timeout: Seconds the scan may take (None: no limit); enforced by the
+                 'cli' and 'daemon' engines, so 'auto' skips 'inprocess' when set
+    """
     
     print("=" * 60)
     print("🔍 SAST SCAN - Bandit Security Analysis")
     print("=" * 60)
     
     # Create reports directory
-    reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     
     # Define output files
@@ -25,7 +119,8 @@ def run_bandit_scan():
     txt_report = os.path.join(reports_dir, 'bandit_report.txt')
     
     # Target file to scan
-    target = os.path.join(os.path.dirname(__file__), 'server_main.py')
+    if target is None:
+        target = os.path.join(os.path.dirname(__file__), 'server_main.py')
     
     print(f"\n📁 Scanning: {target}")
     print(f"📊 Reports will be saved to: {reports_dir}")
@@ -34,37 +129,28 @@ def run_bandit_scan():
     print("\n🔄 Running Bandit analysis...")
     
     try:
-        # Generate JSON report
-        result = subprocess.run(
-            ['bandit', '-r', target, '-f', 'json', '-o', json_report],
-            capture_output=True,
-            text=True
-        )
-        
-        # Generate HTML report
-        subprocess.run(
-            ['bandit', '-r', target, '-f', 'html', '-o', html_report],
-            capture_output=True,
-            text=True
-        )
-        
-        # Generate console output and save to txt
-        console_result = subprocess.run(
-            ['bandit', '-r', target, '-f', 'txt'],
-            capture_output=True,
-            text=True
-        )
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        used_engine = _generate_reports(engine, target, json_report, html_report, txt_report, deadline)
+        print(f"⏱️ Reports generated in {time.perf_counter() - start:.2f}s ({used_engine})")
         
-        with open(txt_report, 'w') as f:
-            f.write(console_result.stdout)
-        
-        # Parse and display results
+        # Parse and display results in a single streaming pass
         if os.path.exists(json_report):
-            with open(json_report, 'r') as f:
-                data = json.load(f)
-            
-            metrics = data.get('metrics', {}).get('_totals', {})
-            results = data.get('results', [])
+            metrics = {}
+            baseline = Baseline.load()
+            scan_root = target if os.path.isdir(target) else os.path.dirname(target)
+            with FindingsStore(default_store_path(reports_dir)) as store:
+                recorder = store.start_run('bandit')
+                findings = baseline.filter(with_fingerprints(
+                    iter_bandit_findings(json_report, metrics=metrics), base_dir=scan_root
+                ))
+                try:
+                    summary = summarize_findings(recorder.track(findings), top_n=DETAIL_LIMIT)
+                except (OSError, ValueError):
+                    recorder.abort()
+                    raise
+                delta = recorder.finish()
+            severity_counts = summary.severity_counts
             
             print("\n" + "=" * 60)
             print("📊 SCAN RESULTS SUMMARY")
@@ -74,35 +160,43 @@ def run_bandit_scan():
             print(f"   • Lines of Code: {metrics.get('loc', 'N/A')}")
             print(f"   • Lines Skipped: {metrics.get('nosec', 0)}")
             
-            # Count by severity
-            severity_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
-            for issue in results:
-                severity = issue.get('issue_severity', 'LOW')
-                severity_counts[severity] = severity_counts.get(severity, 0) + 1
-            
-            print(f"\n🚨 Vulnerabilities Found: {len(results)}")
+            print(f"\n🚨 Vulnerabilities Found: {summary.total}")
             print(f"   • HIGH Severity:   {severity_counts['HIGH']}")
             print(f"   • MEDIUM Severity: {severity_counts['MEDIUM']}")
             print(f"   • LOW Severity:    {severity_counts['LOW']}")
+            if baseline.suppressed:
+                print(f"   • Baselined (suppressed): {baseline.suppressed}")
+            
+            if delta['previous_run_id'] is not None:
+                print(f"\n📈 Since last run: {delta['new']} new | "
+                      f"{delta['fixed']} fixed | {delta['unchanged']} unchanged")
             
-            if results:
+            if summary.by_rule:
+                print(f"\n🧪 By Test ID:")
+                for test_id, rule in sorted(summary.by_rule.items(), key=lambda item: -item[1]['count']):
+                    print(f"   • {test_id} ({rule['name'] or 'N/A'}): {rule['count']}")
+            
+            top_findings = summary.top_findings()
+            if top_findings:
                 print("\n" + "=" * 60)
                 print("🔴 DETAILED FINDINGS")
                 print("=" * 60)
                 
-                for i, issue in enumerate(results, 1):
-                    severity = issue.get('issue_severity', 'UNKNOWN')
-                    confidence = issue.get('issue_confidence', 'UNKNOWN')
+                for i, issue in enumerate(top_findings, 1):
+                    severity = issue['severity']
                     
                     # Emoji based on severity
                     emoji = "🔴" if severity == "HIGH" else "🟠" if severity == "MEDIUM" else "🟡"
                     
-                    print(f"\n{emoji} Issue #{i}: {issue.get('test_id', 'N/A')}")
-                    print(f"   Severity: {severity} | Confidence: {confidence}")
-                    print(f"   File: {issue.get('filename', 'N/A')}")
-                    print(f"   Line: {issue.get('line_number', 'N/A')}")
-                    print(f"   Issue: {issue.get('issue_text', 'N/A')}")
-                    print(f"   More Info: {issue.get('more_info', 'N/A')}")
+                    print(f"\n{emoji} Issue #{i}: {issue['rule_id']}")
+                    print(f"   Severity: {severity} | Confidence: {issue['confidence']}")
+                    print(f"   File: {issue['file']}")
+                    print(f"   Line: {issue['line'] or 'N/A'}")
+                    print(f"   Issue: {issue['message']}")
+                    print(f"   More Info: {issue['more_info']}")
+                
+                if summary.total > len(top_findings):
+                    print(f"\n   ... {summary.total - len(top_findings)} more findings in {json_report}")
             
             print("\n" + "=" * 60)
             print("📁 REPORTS GENERATED")
@@ -114,10 +208,16 @@ def run_bandit_scan():
             
             return {
                 'success': True,
-                'total_issues': len(results),
+                'total_issues': summary.total,
                 'high': severity_counts['HIGH'],
                 'medium': severity_counts['MEDIUM'],
                 'low': severity_counts['LOW'],
+                'by_test_id': summary.by_rule,
+                'top_findings': top_findings,
+                'delta': delta,
+                'suppressed': baseline.suppressed,
+                'scan_root': scan_root,
+                'engine': used_engine,
                 'reports': {
                     'json': json_report,
                     'html': html_report,
@@ -131,16 +231,52 @@ def run_bandit_scan():
     except FileNotFoundError:
         print("❌ Error: Bandit not found. Install with: pip install bandit")
         return {'success': False, 'error': 'Bandit not installed'}
+    except (subprocess.TimeoutExpired, TimeoutError):
+        if timeout is None:
+            # Only the scanner daemon has a limit of its own
+            from scanner_daemon import SCAN_TIMEOUT
+            timeout = SCAN_TIMEOUT
+        print(f"❌ Error: Bandit scan timed out after {timeout:.0f} seconds")
+        return {'success': False, 'error': 'Timeout'}
     except Exception as e:
         print(f"❌ Error during scan: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 
-if __name__ == '__main__':
-    result = run_bandit_scan()
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='SAST Scanner using Bandit')
+    parser.add_argument('target', nargs='?', default=None,
+                        help='File or directory to scan (default: server_main.py)')
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help='How to run Bandit (default: auto)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and re-scan files as they are saved')
+    parser.add_argument('--reports-dir', default=None, help='Output directory for reports')
+    
+    args = parser.parse_args()
+    
+    if args.watch:
+        from sast_watch import SastWatch
+        target = args.target or os.path.join(os.path.dirname(__file__), 'server_main.py')
+        reports_dir = args.reports_dir or os.path.join(os.path.dirname(__file__), 'reports')
+        try:
+            watch = SastWatch(target, reports_dir)
+        except ImportError:
+            print("❌ Error: Bandit not found. Install with: pip install bandit")
+            return
+        watch.run()
+        return
+    
+    result = run_bandit_scan(args.target, args.reports_dir, engine=args.engine)
     
     if result['success']:
         print(f"\n✅ SAST scan completed successfully!")
         print(f"   Found {result['total_issues']} potential security issues.")
     else:
         print(f"\n❌ SAST scan failed: {result.get('error', 'Unknown error')}")
+
+
+if __name__ == '__main__':
+    main()
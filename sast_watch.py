@@ -0,0 +1,219 @@
+"""
+Continuous SAST
+Watches the source tree and re-scans only the files touched since the last
+scan, rewriting bandit_report.json/.txt in place
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from scanner_daemon import WarmScanner
+
+# Quiet period that ends a burst of saves (editors often write several times)
+DEBOUNCE = 0.2
+
+# mtime polling interval when inotify is not available
+POLL_INTERVAL = 0.25
+
+# Directories never watched (matches the .bandit exclude_dirs)
+IGNORED_DIRS = {'.git', '.venv', 'venv', '__pycache__', 'reports', '.pipeline_cache', 'node_modules'}
+
+WATCHED_SUFFIXES = ('.py',)
+
+# <linux/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_EVENT = struct.Struct('iIII')
+
+
+def _walk_dirs(root):
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        yield dirpath
+
+
+def _watched(path):
+    return path.endswith(WATCHED_SUFFIXES)
+
+
+class InotifyWatcher:
+    """Linux inotify watches on every directory of the tree, through libc"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, root):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify not available')
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.root = root
+        self._dirs = {}
+        for path in _walk_dirs(root):
+            self._add(path)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def changes(self, timeout):
+        """Paths changed within timeout seconds (None blocks until one does)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: the caller has to look at everything
+                changed.add(self.root)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in IGNORED_DIRS:
+                    for new_dir in _walk_dirs(path):
+                        self._add(new_dir)
+                    changed.add(path)
+            elif _watched(name):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback comparing mtimes and sizes of the watched files"""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory in _walk_dirs(self.root):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file() and _watched(entry.name):
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout):
+        """Paths changed within timeout seconds (None blocks until one does)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic()))
+            time.sleep(wait)
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(path) != self._snapshot.get(path)}
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(root):
+    """inotify where the kernel supports it, mtime polling elsewhere"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except OSError:
+            pass
+    return PollingWatcher(root)
+
+
+def collect_changes(watcher, debounce=DEBOUNCE):
+    """Block for the first change, then gather the burst until it goes quiet"""
+    changed = watcher.changes(None)
+    while True:
+        more = watcher.changes(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+class SastWatch:
+    """Keeps the Bandit reports of a target current as files change"""
+
+    def __init__(self, target, reports_dir, scanner=None):
+        self.target = os.path.abspath(target)
+        self.root = self.target if os.path.isdir(self.target) else os.path.dirname(self.target)
+        self.reports = {
+            'json': os.path.join(reports_dir, 'bandit_report.json'),
+            'txt': os.path.join(reports_dir, 'bandit_report.txt'),
+        }
+        os.makedirs(reports_dir, exist_ok=True)
+        self.scanner = scanner or WarmScanner()
+        self.last = None
+
+    def _in_target(self, path):
+        return path == self.target or (
+            os.path.isdir(self.target) and path.startswith(self.target + os.sep))
+
+    def rescan(self, changed=()):
+        """Scan the target (only changed files are parsed) and print the new totals"""
+        result = self.scanner.scan(self.target, self.reports)
+        severity = result['severity']
+        delta = '' if self.last is None else f" ({result['issues'] - self.last['issues']:+d})"
+        print(f"\n🔁 {len(changed) or result['files']} file(s) scanned in {result['duration']:.3f}s: "
+              f"{result['issues']} issues{delta} | HIGH {severity['HIGH']} | "
+              f"MEDIUM {severity['MEDIUM']} | LOW {severity['LOW']}")
+        for path in sorted(changed):
+            for issue in self.scanner.file_issues(path):
+                emoji = "🔴" if issue.severity == "HIGH" else "🟠" if issue.severity == "MEDIUM" else "🟡"
+                print(f"   {emoji} {os.path.relpath(path, self.root)}:{issue.lineno} "
+                      f"{issue.test_id} {issue.text}")
+        self.last = result
+        return result
+
+    def run(self, watcher=None):
+        watcher = watcher or create_watcher(self.root)
+        kind = 'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'
+        print(f"👀 Watching {self.root} ({kind}); Ctrl+C to stop")
+        self.rescan()
+        try:
+            while True:
+                changed = collect_changes(watcher)
+                files = sorted(p for p in changed if _watched(p) and self._in_target(p))
+                # Directories show up after a new package or an inotify overflow
+                if files or any(os.path.isdir(p) for p in changed):
+                    self.rescan(files)
+        except KeyboardInterrupt:
+            print("\n🛑 Watch stopped")
+        finally:
+            watcher.close()
@@ -0,0 +1,246 @@
+"""
+Warm Bandit Scanner
+Keeps Bandit's config, plugins and per-file results loaded in a long-lived
+process, so incremental scans skip interpreter startup and plugin discovery
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import threading
+import socketserver
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Code lines shown around each issue (bandit -n default)
+CONTEXT_LINES = 3
+
+CONNECT_TIMEOUT = 0.5
+SCAN_TIMEOUT = 300
+
+
+def default_socket_path():
+    """Socket the daemon listens on (BANDIT_DAEMON_SOCKET overrides it)"""
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.environ.get(
+        'BANDIT_DAEMON_SOCKET',
+        os.path.join(tempfile.gettempdir(), f'security-pipeline-bandit-{uid}.sock')
+    )
+
+
+class WarmScanner:
+    """
+    In-process Bandit runner
+
+    The plugin set and config are loaded once. Results are cached per file
+    and keyed by mtime and size, so a rescan only parses files that changed.
+    """
+
+    def __init__(self, config_file=None):
+        # Raises ImportError when Bandit is not installed
+        from bandit.core import config as b_config
+        from bandit.core import constants
+        from bandit.core import manager as b_manager
+
+        self._config = b_config.BanditConfig(config_file)
+        self._excluded = ','.join(constants.EXCLUDE)
+        self._manager_class = _caching_manager_class(b_manager.BanditManager)
+        self._file_cache = {}
+        self._lock = threading.Lock()
+
+    def scan(self, target, reports):
+        """
+        Scan a file or directory and write the reports
+
+        Args:
+            target: File or directory to scan
+            reports: Mapping of format ('json', 'html', 'txt') to output path
+
+        Returns a dict with the number of files scanned and cache hits.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            manager = self._manager_class(self._config, self._file_cache)
+            manager.discover_files([target], recursive=True, excluded_paths=self._excluded)
+            manager.run_tests()
+            for output_format, path in reports.items():
+                # Readers (editors, the watch loop) never see a half-written report
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    manager.output_results(CONTEXT_LINES, 'LOW', 'LOW', f, output_format)
+                os.replace(path + '.tmp', path)
+
+            # Drop files that disappeared from the scanned tree
+            for fname in set(self._file_cache) - set(manager.files_list):
+                if not os.path.exists(fname):
+                    del self._file_cache[fname]
+
+        severity = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+        for issue in manager.results:
+            severity[issue.severity] = severity.get(issue.severity, 0) + 1
+        return {
+            'success': True,
+            'files': len(manager.files_list),
+            'cached': manager.cache_hits,
+            'issues': len(manager.results),
+            'severity': severity,
+            'duration': round(time.perf_counter() - start, 4),
+        }
+
+    def file_issues(self, fname):
+        """Issues found in one file by the latest scan (empty if not scanned)"""
+        cached = self._file_cache.get(fname)
+        return list(cached[1]) if cached else []
+
+
+def _caching_manager_class(base):
+    """BanditManager subclass that reuses results of unchanged files"""
+
+    class CachingManager(base):
+
+        def __init__(self, config, file_cache):
+            super().__init__(config, 'file', quiet=True)
+            self._file_cache = file_cache
+            self.cache_hits = 0
+
+        def _parse_file(self, fname, fdata, new_files_list):
+            try:
+                stat = os.fstat(fdata.fileno())
+            except (AttributeError, OSError, ValueError):
+                return super()._parse_file(fname, fdata, new_files_list)
+
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = self._file_cache.get(fname)
+            if cached and cached[0] == key:
+                _, results, file_metrics, score = cached
+                self.metrics.data[fname] = dict(file_metrics)
+                self.results.extend(results)
+                self.scores.append(score)
+                self.cache_hits += 1
+                return
+
+            first_result = len(self.results)
+            skipped = len(self.skipped)
+            super()._parse_file(fname, fdata, new_files_list)
+            if len(self.skipped) == skipped:
+                self._file_cache[fname] = (
+                    key, self.results[first_result:], dict(self.metrics.data[fname]), self.scores[-1]
+                )
+
+    return CachingManager
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            if request.get('command') == 'shutdown':
+                response = {'success': True}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif request.get('command') == 'ping':
+                response = {'success': True, 'pid': os.getpid()}
+            else:
+                response = self.server.scanner.scan(request['target'], request['reports'])
+        except Exception as e:
+            response = {'success': False, 'error': str(e)}
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class ScannerDaemon(socketserver.UnixStreamServer):
+    """Unix socket server wrapping a WarmScanner"""
+
+    def __init__(self, socket_path=None, scanner=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.scanner = scanner or WarmScanner()
+        if os.path.exists(self.socket_path):
+            if _send({'command': 'ping'}, self.socket_path) is not None:
+                raise RuntimeError(f"Scanner daemon already running on {self.socket_path}")
+            # Left over from a daemon that did not shut down cleanly
+            os.unlink(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _send(request, socket_path=None, timeout=SCAN_TIMEOUT):
+    """Send one request; returns the response, or None when no daemon answers"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout):
+            return None
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+        return json.loads(line) if line else None
+    finally:
+        sock.close()
+
+
+def scan_via_daemon(target, reports, socket_path=None, timeout=SCAN_TIMEOUT):
+    """
+    Ask a running daemon to scan target and write the reports
+
+    Returns the daemon's result dict, or None when no daemon is running;
+    raises TimeoutError when the daemon takes longer than timeout.
+    """
+    return _send({'target': os.path.abspath(target),
+                  'reports': {fmt: os.path.abspath(path) for fmt, path in reports.items()}},
+                 socket_path, timeout=timeout)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Warm Bandit Scanner Daemon')
+    parser.add_argument('command', choices=['start', 'stop', 'status'])
+    parser.add_argument('--socket', default=default_socket_path(), help='Unix socket path')
+    args = parser.parse_args()
+
+    if args.command == 'start':
+        try:
+            daemon = ScannerDaemon(args.socket)
+        except (ImportError, RuntimeError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"🔥 Scanner daemon listening on {args.socket} (pid {os.getpid()})")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.server_close()
+            print("🛑 Scanner daemon stopped")
+    elif args.command == 'stop':
+        response = _send({'command': 'shutdown'}, args.socket)
+        print("✅ Scanner daemon stopped" if response else "ℹ️ Scanner daemon not running")
+    else:
+        response = _send({'command': 'ping'}, args.socket)
+        if response:
+            print(f"✅ Scanner daemon running (pid {response['pid']})")
+        else:
+            print("ℹ️ Scanner daemon not running")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
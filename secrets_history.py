@@ -0,0 +1,372 @@
+"""
+Git History Secrets Scan
+Scans every blob ever committed for hardcoded credentials, resuming from the
+last scanned commit so later runs only read new history
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from secrets_scan import scan_buffer, BINARY_SNIFF_BYTES, MAX_FILE_BYTES
+from report_parser import iter_secrets_findings, summarize_findings, with_fingerprints
+from findings_store import FindingsStore, default_store_path
+from baseline import Baseline
+
+# Bytes read from `git log` per chunk
+READ_CHUNK = 64 * 1024
+
+# Blobs committed to the state database per transaction
+BATCH_SIZE = 500
+
+NULL_OID = '0' * 40
+
+# Regular files and executables; symlinks and submodules carry no content
+SCANNED_MODES = ('100644', '100755')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS history_state (
+        repo TEXT PRIMARY KEY,
+        head TEXT NOT NULL,
+        scanned_at TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS history_blobs (
+        blob TEXT PRIMARY KEY
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS history_findings (
+        blob TEXT NOT NULL,
+        commit_id TEXT NOT NULL,
+        path TEXT NOT NULL,
+        line INTEGER NOT NULL,
+        rule_id TEXT NOT NULL,
+        rule_name TEXT,
+        severity TEXT,
+        confidence TEXT,
+        message TEXT,
+        code TEXT,
+        more_info TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_history_findings_blob ON history_findings (blob);
+'''
+
+
+def default_state_path(reports_dir=None):
+    """Location of the history scan database (SECRETS_HISTORY_DB overrides it)"""
+    if os.environ.get('SECRETS_HISTORY_DB'):
+        return os.environ['SECRETS_HISTORY_DB']
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    return os.path.join(reports_dir, 'secrets_history.db')
+
+
+def _git(repo, *args):
+    result = subprocess.run(['git', '-C', repo, *args], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _iter_tokens(stream):
+    """NUL-separated tokens of a byte stream, read in fixed-size chunks"""
+    pending = b''
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        tokens = (pending + chunk).split(b'\0')
+        pending = tokens.pop()
+        yield from tokens
+    if pending:
+        yield pending
+
+
+def iter_new_blobs(repo, head, since=None):
+    """
+    (blob id, commit, path) of every blob added or modified in since..head
+
+    Streams `git log --raw -z`, oldest commit first, so each blob is
+    reported with the commit that introduced it.
+    """
+    command = ['git', '-C', repo, 'log', '--raw', '-z', '-m', '--root', '--reverse', '--no-renames',
+               '--no-abbrev', '--format=%x01%H', head]
+    if since:
+        command.append(f'^{since}')
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        commit = None
+        tokens = _iter_tokens(process.stdout)
+        for token in tokens:
+            token = token.lstrip(b'\n')
+            if token.startswith(b'\x01'):
+                commit = token[1:].decode()
+            elif token.startswith(b':'):
+                path = next(tokens, b'').decode('utf-8', errors='replace')
+                _, new_mode, _, new_blob, status = token[1:].decode().split(' ')
+                if status != 'D' and new_mode in SCANNED_MODES and new_blob != NULL_OID:
+                    yield new_blob, commit, path
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"git log failed with exit code {process.returncode}")
+
+
+def iter_blob_contents(repo, blob_ids):
+    """
+    (blob id, content) for each id, read through one `git cat-file --batch`
+
+    Requests are written from a separate thread so git never waits on us
+    reading a response before it can accept the next id.
+    """
+    process = subprocess.Popen(['git', '-C', repo, 'cat-file', '--batch'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        try:
+            for blob_id in blob_ids:
+                process.stdin.write(blob_id.encode() + b'\n')
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    writer = threading.Thread(target=feed, name='cat-file-feeder', daemon=True)
+    writer.start()
+    try:
+        for blob_id in blob_ids:
+            header = process.stdout.readline().split()
+            if len(header) < 3:
+                # "<id> missing": the object was pruned
+                continue
+            size = int(header[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)
+            yield blob_id, content
+    finally:
+        process.stdout.close()
+        writer.join()
+        process.wait()
+
+
+class HistoryState:
+    """Scanned blob ids, history findings and the high-water mark per repository"""
+
+    def __init__(self, path=None):
+        self.path = path or default_state_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def high_water_mark(self, repo):
+        row = self.conn.execute('SELECT head FROM history_state WHERE repo = ?', (repo,)).fetchone()
+        return row['head'] if row else None
+
+    def set_high_water_mark(self, repo, head):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO history_state (repo, head, scanned_at) VALUES (?, ?, ?)',
+            (repo, head, datetime.now().isoformat(timespec='seconds'))
+        )
+        self.conn.commit()
+
+    def is_scanned(self, blob_id):
+        return self.conn.execute('SELECT 1 FROM history_blobs WHERE blob = ?', (blob_id,)).fetchone() is not None
+
+    def record(self, blob_id, commit, path, findings):
+        """Mark a blob as scanned together with its findings"""
+        self.conn.execute('INSERT OR IGNORE INTO history_blobs (blob) VALUES (?)', (blob_id,))
+        self.conn.executemany(
+            'INSERT INTO history_findings (blob, commit_id, path, line, rule_id, rule_name, severity, '
+            'confidence, message, code, more_info) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(blob_id, commit, path, f['line'], f['rule_id'], f['rule_name'], f['severity'],
+              f['confidence'], f['message'], f['code'], f['more_info']) for f in findings]
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def iter_findings(self):
+        """
+        Every secret found in history, in the shape of secrets_report.json results
+
+        A secret that survives several revisions of a file is reported once,
+        with the commit that introduced it.
+        """
+        for row in self.conn.execute(
+            'SELECT * FROM history_findings WHERE rowid IN '
+            '(SELECT MIN(rowid) FROM history_findings GROUP BY path, rule_id, code) ORDER BY path, line'
+        ):
+            yield {
+                'tool': 'secrets-history',
+                'rule_id': row['rule_id'],
+                'rule_name': row['rule_name'],
+                'severity': row['severity'],
+                'confidence': row['confidence'],
+                'file': row['path'],
+                'line': row['line'],
+                'message': row['message'],
+                'code': row['code'],
+                'more_info': row['more_info'],
+                'commit': row['commit_id'],
+                'blob': row['blob'],
+            }
+
+
+def scan_history(repo, state, full=False):
+    """
+    Scan the blobs committed since the high-water mark
+
+    Returns counts of the commits' new blobs, blobs scanned and secrets found.
+    """
+    repo = os.path.abspath(repo)
+    head = _git(repo, 'rev-parse', '--verify', 'HEAD^{commit}')
+    if head is None:
+        raise RuntimeError(f"{repo} is not a git repository with commits")
+
+    since = None if full else state.high_water_mark(repo)
+    if since and _git(repo, 'cat-file', '-e', f'{since}^{{commit}}') is None:
+        # History was rewritten and the old head pruned: the blob set still
+        # keeps the rescan down to blobs never seen before
+        since = None
+
+    pending = {}
+    for blob_id, commit, path in iter_new_blobs(repo, head, since) if since != head else ():
+        if blob_id not in pending and not state.is_scanned(blob_id):
+            pending[blob_id] = (commit, path)
+
+    found = 0
+    scanned = 0
+    for blob_id, content in iter_blob_contents(repo, list(pending)):
+        commit, path = pending[blob_id]
+        findings = []
+        if len(content) <= MAX_FILE_BYTES and b'\0' not in content[:BINARY_SNIFF_BYTES]:
+            findings = scan_buffer(content, path)
+        state.record(blob_id, commit, path, findings)
+        found += len(findings)
+        scanned += 1
+        if scanned % BATCH_SIZE == 0:
+            state.commit()
+    state.commit()
+    # Only a completed scan moves the mark; an interrupted one resumes from
+    # the blobs already recorded
+    state.set_high_water_mark(repo, head)
+    return {'head': head, 'since': since, 'blobs': scanned, 'new_secrets': found}
+
+
+def run_history_scan(repo=None, reports_dir=None, full=False):
+    """
+    Scan git history for secrets and write reports/secrets_history_report.json
+
+    Args:
+        repo: Repository to scan (defaults to the one containing this file)
+        reports_dir: Output directory for reports (defaults to ./reports)
+        full: Ignore the high-water mark and walk all of history again
+              (blobs already scanned are still skipped)
+    """
+    print("=" * 60)
+    print("🕰️ SECRETS HISTORY SCAN - Git History")
+    print("=" * 60)
+
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    if repo is None:
+        repo = os.path.dirname(os.path.abspath(__file__))
+    repo = os.path.abspath(repo)
+    json_report = os.path.join(reports_dir, 'secrets_history_report.json')
+
+    print(f"\n📁 Repository: {repo}")
+
+    try:
+        start = time.perf_counter()
+        with HistoryState(default_state_path(reports_dir)) as state:
+            scan = scan_history(repo, state, full=full)
+            duration = time.perf_counter() - start
+
+            with open(json_report, 'w', encoding='utf-8') as f:
+                f.write('{"generated_at": %s, "head": %s, "results": [' % (
+                    json.dumps(datetime.now().isoformat(timespec='seconds')), json.dumps(scan['head'])))
+                for index, finding in enumerate(state.iter_findings()):
+                    f.write((',\n' if index else '\n') + json.dumps(finding))
+                f.write('\n]}\n')
+
+        since = scan['since'][:12] if scan['since'] else 'the first commit'
+        print(f"⏱️ {scan['blobs']} new blobs since {since} scanned in {duration:.2f}s "
+              f"({scan['new_secrets']} new secrets)")
+
+        baseline = Baseline.load()
+        with FindingsStore(default_store_path(reports_dir)) as store:
+            recorder = store.start_run('secrets-history')
+            try:
+                stream = baseline.filter(with_fingerprints(iter_secrets_findings(json_report), base_dir=repo))
+                summary = summarize_findings(recorder.track(stream))
+            except (OSError, ValueError):
+                recorder.abort()
+                raise
+            delta = recorder.finish()
+        counts = summary.severity_counts
+
+        print(f"\n🚨 Secrets in History: {summary.total}")
+        print(f"   • HIGH Severity:   {counts['HIGH']}")
+        print(f"   • MEDIUM Severity: {counts['MEDIUM']}")
+        if baseline.suppressed:
+            print(f"   • Baselined (suppressed): {baseline.suppressed}")
+        for finding in summary.top_findings():
+            print(f"   🔑 {finding['commit'][:12]} {finding['file']}:{finding['line']} "
+                  f"{finding['rule_id']} {finding['code']}")
+
+        return {
+            'success': True,
+            'total_issues': summary.total,
+            'high': counts['HIGH'],
+            'medium': counts['MEDIUM'],
+            'low': counts['LOW'],
+            'head': scan['head'],
+            'since': scan['since'],
+            'blobs': scan['blobs'],
+            'new_secrets': scan['new_secrets'],
+            'duration': round(duration, 3),
+            'delta': delta,
+            'suppressed': baseline.suppressed,
+            'scan_root': repo,
+            'reports': {'json': json_report},
+        }
+    except Exception as e:
+        print(f"❌ Error during history scan: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Git History Secrets Scanner')
+    parser.add_argument('repo', nargs='?', default=None, help='Repository to scan')
+    parser.add_argument('--full', action='store_true',
+                        help='Walk all of history again instead of resuming from the last scanned commit')
+    args = parser.parse_args()
+
+    result = run_history_scan(args.repo, full=args.full)
+    if result['success']:
+        print(f"\n✅ History scan completed: {result['total_issues']} findings")
+    else:
+        print(f"\n❌ History scan failed: {result.get('error', 'Unknown error')}")
+        sys.exit(1)
@@ -0,0 +1,368 @@
+"""
+Secrets Scanner
+Finds hardcoded credentials in memory-mapped files: a literal keyword
+prefilter picks candidate lines, per-rule regexes confirm them
+"""
+
+import os
+import re
+import sys
+import fnmatch
+import json
+import math
+import mmap
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as PoolTimeout
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from report_parser import iter_secrets_findings, summarize_findings, with_fingerprints
+from findings_store import FindingsStore, default_store_path
+from baseline import Baseline
+
+# Directories never scanned
+IGNORED_DIRS = {'.git', '.venv', 'venv', '__pycache__', 'node_modules', 'reports', '.pipeline_cache',
+                '.pytest_cache', '.mypy_cache', '.tox', '.nox'}
+
+# Files never scanned unless named as the target: diffs and patches quote
+# code from elsewhere, and test fixtures hold fake credentials on purpose.
+# Globs match the path relative to the scanned directory or the file name.
+IGNORED_GLOBS = ('*.patch', '*.diff', 'test_*.py', '*_test.py', 'conftest.py', 'tests/*')
+
+# Files larger than this are skipped (generated data, archives)
+MAX_FILE_BYTES = 256 * 1024 * 1024
+
+# Bytes of files handed to one worker task, and the tree size below which
+# a process pool costs more than it saves
+BATCH_BYTES = 64 * 1024 * 1024
+POOL_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+# Bytes sniffed for NUL to tell binary files apart
+BINARY_SNIFF_BYTES = 8192
+
+MORE_INFO = 'https://owasp.org/www-community/vulnerabilities/Use_of_hard-coded_password'
+
+
+class SecretRule:
+    """A literal prefilter keyword set and the regex that confirms a hit"""
+
+    def __init__(self, rule_id, name, severity, keywords, pattern, min_entropy=0.0):
+        self.rule_id = rule_id
+        self.name = name
+        self.severity = severity
+        self.keywords = keywords
+        self.pattern = re.compile(pattern)
+        self.min_entropy = min_entropy
+
+    def confirm(self, line):
+        """Yield (start column, secret bytes) for every confirmed match in a line"""
+        for match in self.pattern.finditer(line):
+            secret = match.group('secret')
+            if shannon_entropy(secret) >= self.min_entropy:
+                yield match.start('secret'), secret
+
+
+RULES = [
+    SecretRule('SECRET-AWS-KEY', 'AWS access key id', 'HIGH', [b'AKIA', b'ASIA'],
+               rb'(?P<secret>\b(?:AKIA|ASIA)[0-9A-Z]{16})\b'),
+    SecretRule('SECRET-GITHUB-TOKEN', 'GitHub token', 'HIGH', [b'ghp_', b'gho_', b'ghs_', b'ghu_', b'github_pat_'],
+               rb'(?P<secret>\b(?:gh[posu]_[A-Za-z0-9]{36}|github_pat_[A-Za-z0-9_]{40,}))'),
+    SecretRule('SECRET-SLACK-TOKEN', 'Slack token', 'HIGH', [b'xox'],
+               rb'(?P<secret>\bxox[abpors]-[A-Za-z0-9-]{10,})'),
+    SecretRule('SECRET-API-KEY', 'API secret key', 'HIGH', [b'sk-', b'sk_live_'],
+               rb'(?P<secret>\bsk(?:-|_live_)[A-Za-z0-9]{16,})', min_entropy=3.0),
+    SecretRule('SECRET-PRIVATE-KEY', 'Private key', 'HIGH', [b'-----BEGIN'],
+               rb'(?P<secret>-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP )?PRIVATE KEY(?: BLOCK)?-----)'),
+    # NAME = "literal" where the name says it holds a credential
+    SecretRule('SECRET-ASSIGNMENT', 'Hardcoded credential', 'MEDIUM',
+               [b'passw', b'secret', b'api_key', b'apikey', b'token', b'credential'],
+               rb'(?i)\b[\w.-]*(?:password|passwd|secret|api_?key|token|credential)[\w.-]*[\'"]?'
+               rb'\s*[:=]\s*[rbuf]?([\'"])(?P<secret>[^\'"\s]{6,})\1',
+               min_entropy=2.5),
+]
+
+# Every keyword of every rule as (keyword, rule index, case-folded); keywords
+# of case-insensitive rules are matched against a lowercased copy. bytes.find
+# runs at memory speed, so a handful of literal passes over a window beats
+# one pass of a regex alternation or a pure-Python automaton by an order of
+# magnitude
+KEYWORDS = [
+    (keyword.lower() if rule.pattern.flags & re.IGNORECASE else keyword, index,
+     bool(rule.pattern.flags & re.IGNORECASE))
+    for index, rule in enumerate(RULES)
+    for keyword in rule.keywords
+]
+
+# Bytes searched per window: small enough to stay in cache across the keyword
+# passes; windows overlap so a keyword straddling the boundary is still found
+# in the window it starts in
+WINDOW_BYTES = 1024 * 1024
+WINDOW_OVERLAP = max(len(keyword) for keyword, _, _ in KEYWORDS) - 1
+
+
+def shannon_entropy(data):
+    """Bits of entropy per character"""
+    if not data:
+        return 0.0
+    counts = Counter(data)
+    length = len(data)
+    return -sum(c / length * math.log2(c / length) for c in counts.values())
+
+
+def redact(line, start, secret):
+    """Source line with the secret masked, keeping its first characters"""
+    visible = secret[:4]
+    return line[:start] + visible + b'*' * min(len(secret) - len(visible), 12) + line[start + len(secret):]
+
+
+def prefilter(buffer):
+    """Sorted (offset, rule index) of every keyword hit in a buffer"""
+    hits = []
+    size = len(buffer)
+    for window_start in range(0, size, WINDOW_BYTES):
+        window_size = min(WINDOW_BYTES, size - window_start)
+        window = buffer[window_start:window_start + window_size + WINDOW_OVERLAP]
+        folded = window.lower()
+        for keyword, rule_index, fold in KEYWORDS:
+            haystack = folded if fold else window
+            offset = haystack.find(keyword)
+            while offset != -1 and offset < window_size:
+                hits.append((window_start + offset, rule_index))
+                offset = haystack.find(keyword, offset + 1)
+    hits.sort()
+    return hits
+
+
+def scan_buffer(buffer, path):
+    """Findings in one in-memory or memory-mapped buffer"""
+    findings = []
+    seen = set()
+    line_number, counted_to = 1, 0
+    for offset, rule_index in prefilter(buffer):
+        # Hits are sorted, so counting newlines incrementally keeps this linear
+        # (mmap has no count(); the slice copy is a memcpy of the gap)
+        line_number += buffer[counted_to:offset].count(b'\n')
+        counted_to = offset
+        start = buffer.rfind(b'\n', 0, offset) + 1
+        if (start, rule_index) in seen:
+            continue
+        seen.add((start, rule_index))
+
+        end = buffer.find(b'\n', offset)
+        line = bytes(buffer[start:end if end != -1 else len(buffer)]).rstrip(b'\r')
+        rule = RULES[rule_index]
+        for column, secret in rule.confirm(line):
+            findings.append({
+                'tool': 'secrets',
+                'rule_id': rule.rule_id,
+                'rule_name': rule.name,
+                'severity': rule.severity,
+                'confidence': 'HIGH' if rule.rule_id != 'SECRET-ASSIGNMENT' else 'MEDIUM',
+                'file': path,
+                'line': line_number,
+                'message': f'{rule.name} found in source',
+                'code': redact(line, column, secret).decode('utf-8', errors='replace').strip(),
+                'more_info': MORE_INFO,
+            })
+    return findings
+
+
+def scan_file(path):
+    """Findings in one file, read through mmap; binary and empty files are skipped"""
+    try:
+        with open(path, 'rb') as f:
+            if b'\0' in f.read(BINARY_SNIFF_BYTES):
+                return []
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return scan_buffer(buffer, path)
+    except (OSError, ValueError):
+        return []
+
+
+def _scan_batch(paths):
+    findings = []
+    for path in paths:
+        findings.extend(scan_file(path))
+    return findings
+
+
+def is_ignored(relpath, exclude=IGNORED_GLOBS):
+    """True if a path relative to the scan root matches one of the exclude globs"""
+    relpath = relpath.replace(os.sep, '/')
+    name = relpath.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatch(relpath, pattern) or fnmatch.fnmatch(name, pattern) for pattern in exclude)
+
+
+def discover_files(target, exclude=IGNORED_GLOBS):
+    """(path, size) of every candidate file under target that no exclude glob matches"""
+    if os.path.isfile(target):
+        return [(target, os.path.getsize(target))]
+    files = []
+    for dirpath, dirnames, filenames in os.walk(target):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if is_ignored(os.path.relpath(path, target), exclude):
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if 0 < size <= MAX_FILE_BYTES:
+                files.append((path, size))
+    return files
+
+
+def input_files(target):
+    """Paths of every file a scan of target reads, for the stage scheduler's fingerprint"""
+    return [path for path, _ in discover_files(target)]
+
+
+def _batches(files, batch_bytes):
+    batch, size = [], 0
+    for path, file_size in sorted(files, key=lambda item: -item[1]):
+        batch.append(path)
+        size += file_size
+        if size >= batch_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def scan_tree(target, workers=None, batch_bytes=BATCH_BYTES, timeout=None, exclude=IGNORED_GLOBS):
+    """
+    Scan every file under target; returns (findings, files, bytes)
+
+    Large trees are split into size-balanced batches scanned by a process
+    pool; small ones are scanned in this process. Raises TimeoutError when
+    the scan takes longer than timeout seconds; batches not yet started are
+    cancelled.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    files = discover_files(target, exclude)
+    total_bytes = sum(size for _, size in files)
+    findings = []
+    if workers == 1 or total_bytes < POOL_THRESHOLD_BYTES:
+        for path, _ in files:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"secrets scan exceeded {timeout:.0f}s")
+            findings.extend(scan_file(path))
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            for batch_findings in pool.map(_scan_batch, _batches(files, batch_bytes), timeout=left):
+                findings.extend(batch_findings)
+        except PoolTimeout:
+            raise TimeoutError(f"secrets scan exceeded {timeout:.0f}s") from None
+        finally:
+            pool.shutdown(cancel_futures=True)
+    findings.sort(key=lambda f: (f['file'], f['line']))
+    return findings, len(files), total_bytes
+
+
+def run_secrets_scan(target=None, reports_dir=None, workers=None, timeout=None, exclude=()):
+    """
+    Execute the secrets scan and write reports/secrets_report.json
+
+    Args:
+        target: File or directory to scan (defaults to this repository)
+        reports_dir: Output directory for reports (defaults to ./reports)
+        workers: Process pool size (defaults to the CPU count)
+        timeout: Seconds the scan may take (None: no limit)
+        exclude: Globs to skip on top of IGNORED_GLOBS
+    """
+    print("=" * 60)
+    print("🔑 SECRETS SCAN - Hardcoded Credentials")
+    print("=" * 60)
+
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    if target is None:
+        target = os.path.dirname(os.path.abspath(__file__))
+    json_report = os.path.join(reports_dir, 'secrets_report.json')
+    scan_root = target if os.path.isdir(target) else os.path.dirname(target)
+
+    print(f"\n📁 Scanning: {target}")
+
+    try:
+        start = time.perf_counter()
+        findings, file_count, total_bytes = scan_tree(target, workers=workers, timeout=timeout,
+                                                      exclude=IGNORED_GLOBS + tuple(exclude))
+        duration = time.perf_counter() - start
+
+        with open(json_report, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'metrics': {'files': file_count, 'bytes': total_bytes, 'duration': round(duration, 3)},
+                'results': findings,
+            }, f, indent=2)
+
+        throughput = total_bytes / duration / (1024 * 1024) if duration else 0.0
+        print(f"⏱️ {file_count} files, {total_bytes / (1024 * 1024):.1f} MB in {duration:.2f}s "
+              f"({throughput:.0f} MB/s)")
+
+        baseline = Baseline.load()
+        with FindingsStore(default_store_path(reports_dir)) as store:
+            recorder = store.start_run('secrets')
+            try:
+                stream = baseline.filter(with_fingerprints(iter_secrets_findings(json_report), base_dir=scan_root))
+                summary = summarize_findings(recorder.track(stream))
+            except (OSError, ValueError):
+                recorder.abort()
+                raise
+            delta = recorder.finish()
+        counts = summary.severity_counts
+
+        print(f"\n🚨 Secrets Found: {summary.total}")
+        print(f"   • HIGH Severity:   {counts['HIGH']}")
+        print(f"   • MEDIUM Severity: {counts['MEDIUM']}")
+        if baseline.suppressed:
+            print(f"   • Baselined (suppressed): {baseline.suppressed}")
+        for finding in summary.top_findings():
+            print(f"   🔑 {os.path.relpath(finding['file'], scan_root)}:{finding['line']} "
+                  f"{finding['rule_id']} {finding['code']}")
+
+        return {
+            'success': True,
+            'total_issues': summary.total,
+            'high': counts['HIGH'],
+            'medium': counts['MEDIUM'],
+            'low': counts['LOW'],
+            'files': file_count,
+            'bytes': total_bytes,
+            'duration': round(duration, 3),
+            'delta': delta,
+            'suppressed': baseline.suppressed,
+            'scan_root': scan_root,
+            'reports': {'json': json_report},
+        }
+    except TimeoutError:
+        print(f"❌ Error: Secrets scan timed out after {timeout:.0f} seconds")
+        return {'success': False, 'error': 'Timeout'}
+    except Exception as e:
+        print(f"❌ Error during secrets scan: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Secrets Scanner')
+    parser.add_argument('target', nargs='?', default=None, help='File or directory to scan')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='Skip matching files, on top of patches and test files (repeatable)')
+    args = parser.parse_args()
+
+    result = run_secrets_scan(args.target, workers=args.workers, exclude=args.exclude)
+    if result['success']:
+        print(f"\n✅ Secrets scan completed: {result['total_issues']} findings")
+    else:
+        print(f"\n❌ Secrets scan failed: {result.get('error', 'Unknown error')}")
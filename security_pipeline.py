@@ -8,6 +8,7 @@ import os
 import sys
 import time
 import json
+import html
 from datetime import datetime
 import threading
 import signal
@@ -16,7 +17,16 @@ import signal
 sys.path.insert(0, os.path.dirname(__file__))
 
 from run_sast import run_bandit_scan
-from run_dast import run_zap_baseline_scan
+from run_dast import run_zap_baseline_scan, run_zap_full_scan
+from secrets_scan import run_secrets_scan
+from report_parser import iter_bandit_findings, iter_secrets_findings, iter_zap_findings, with_fingerprints
+from report_sinks import PagedFindingsSink, SarifSink, JUnitSink, render_findings_browser, FINDINGS_BROWSER_STYLE
+from baseline import Baseline
+from log_drainer import LogDrainer
+from pipeline_policy import PipelinePolicy, SEVERITY_LEVELS, DAST_MODES, GATE_ACTIONS
+
+# Lines of the target application's output shown when it fails
+APP_LOG_LINES = 50
 
 
 def print_banner():
@@ -34,25 +44,74 @@ def print_banner():
     print(banner)
 
 
-def run_flask_app():
-    """Start the Flask application in a subprocess"""
+def allocate_port():
+    """Ask the OS for a free TCP port on localhost"""
+    import socket
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_flask_app(port=5000, db_path=None, log_path=None):
+    """
+    Start the Flask application in a subprocess
+    
+    Its output is drained in the background (process.log_drainer) so the
+    app never blocks on a full pipe during long scans.
+    
+    Args:
+        port: Port the application listens on
+        db_path: SQLite user registry for this instance (defaults to ./users.db)
+        log_path: Rotating log of the app's output (defaults to reports/app.log)
+    """
     app_path = os.path.join(os.path.dirname(__file__), 'server_main.py')
-    return subprocess.Popen(
+    env = dict(os.environ, PORT=str(port))
+    if db_path:
+        env['USERS_DB'] = db_path
+    process = subprocess.Popen(
         [sys.executable, app_path],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        env=env,
         creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
     )
+    if log_path is None:
+        log_path = os.path.join(os.path.dirname(__file__), 'reports', 'app.log')
+    process.log_drainer = LogDrainer(process, log_path)
+    return process
+
 
+def app_log_tail(flask_process, lines=APP_LOG_LINES):
+    """Last lines the application wrote to stdout/stderr"""
+    drainer = getattr(flask_process, 'log_drainer', None)
+    return drainer.tail(lines) if drainer else []
 
-def wait_for_app(url="http://localhost:5000", timeout=30):
-    """Wait for the Flask app to be ready"""
+
+def stop_flask_app(flask_process):
+    """Terminate an application started with run_flask_app"""
+    print("\n🛑 Stopping Flask application...")
+    if os.name == 'nt':
+        flask_process.terminate()
+    else:
+        os.kill(flask_process.pid, signal.SIGTERM)
+    flask_process.wait()
+    drainer = getattr(flask_process, 'log_drainer', None)
+    if drainer:
+        drainer.close()
+    print("✅ Flask application stopped")
+
+
+def wait_for_app(url="http://localhost:5000", timeout=30, process=None):
+    """Wait for the Flask app to be ready (gives up early if process exits)"""
     import urllib.request
     
     print(f"⏳ Waiting for application at {url}...")
     start_time = time.time()
     
     while time.time() - start_time < timeout:
+        if process is not None and process.poll() is not None:
+            print(f"❌ Application exited with code {process.returncode}")
+            return False
         try:
             urllib.request.urlopen(url, timeout=2)
             print("✅ Application is ready!")
@@ -64,16 +123,101 @@ def wait_for_app(url="http://localhost:5000", timeout=30):
     return False
 
 
-def generate_consolidated_report(sast_result, dast_result):
+def render_delta(delta):
+    """Render the new/fixed/unchanged counts against the previous run"""
+    if not delta or delta.get('previous_run_id') is None:
+        return '<p style="color: #888;">No previous run to compare against.</p>'
+    return f"""
+        <p>
+            <span class="badge badge-high">+{delta['new']} new</span>
+            <span class="badge badge-low">-{delta['fixed']} fixed</span>
+            <span class="badge" style="background: #475569;">{delta['unchanged']} unchanged</span>
+        </p>
+    """
+
+
+def render_policy(policy):
+    """Render the fail-fast gate outcome, if a gate tripped"""
+    if not policy or not policy.get('gate'):
+        return ''
+    return f"""
+        <p><span class="badge badge-high">🚫 Fail-fast gate</span> {html.escape(policy['gate'])}
+        ({'pipeline aborted' if policy['action'] == 'abort' else 'later scans skipped'})</p>
+    """
+
+
+def render_app_log(lines):
+    """Render the tail of the target application's output"""
+    if not lines:
+        return ''
+    escaped = html.escape('\n'.join(lines))
+    return f"""
+        <h3>📜 Target application output (last {len(lines)} lines)</h3>
+        <pre style="background: rgba(0,0,0,0.4); padding: 10px; border-radius: 8px; overflow-x: auto; font-size: 0.85em;">{escaped}</pre>
+    """
+
+
+def iter_pipeline_findings(sast_result, dast_result, secrets_result=None):
+    """Stream the non-baselined findings of every successful scan"""
+    baseline = Baseline.load()
+
+    sast_json = (sast_result.get('reports') or {}).get('json')
+    if sast_result.get('success') and sast_json and os.path.exists(sast_json):
+        findings = with_fingerprints(iter_bandit_findings(sast_json), base_dir=sast_result.get('scan_root'))
+        yield from baseline.filter(findings)
+
+    secrets_result = secrets_result or {}
+    secrets_json = (secrets_result.get('reports') or {}).get('json')
+    if secrets_result.get('success') and secrets_json and os.path.exists(secrets_json):
+        findings = with_fingerprints(iter_secrets_findings(secrets_json), base_dir=secrets_result.get('scan_root'))
+        yield from baseline.filter(findings)
+
+    dast_json = (dast_result.get('reports') or {}).get('json')
+    if dast_result.get('success') and dast_json and os.path.exists(dast_json):
+        tool = dast_result.get('engine', 'zap')
+        yield from baseline.filter(with_fingerprints(iter_zap_findings(dast_json, tool=tool)))
+
+
+def export_seeds(target_url, reports_dir=None):
+    """Export the target's route map as an OpenAPI seed; None if unavailable"""
+    try:
+        from route_map import export_route_seeds
+        seeds = export_route_seeds(target_url, reports_dir=reports_dir)
+        print(f"🌱 Exported {seeds['routes']} routes as DAST seeds")
+        return seeds['openapi']
+    except Exception as e:
+        print(f"⚠️ Could not export route seeds, falling back to spidering: {e}")
+        return None
+
+
+def generate_consolidated_report(sast_result, dast_result, reports_dir=None, policy=None, secrets_result=None):
     """Generate a consolidated security report"""
     
-    reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    if secrets_result is None:
+        secrets_result = {'success': False, 'error': 'Skipped'}
+    
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     
     report_path = os.path.join(reports_dir, 'security_pipeline_report.html')
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
+    # One pass over the findings feeds every sink: paged chunks the HTML
+    # report loads on demand, SARIF for code review and JUnit for CI
+    pages = PagedFindingsSink(reports_dir)
+    sarif = SarifSink(os.path.join(reports_dir, 'security_pipeline.sarif'),
+                      base_dir=os.path.dirname(os.path.abspath(__file__)))
+    junit = JUnitSink(os.path.join(reports_dir, 'security_pipeline_junit.xml'))
+    for finding in iter_pipeline_findings(sast_result, dast_result, secrets_result):
+        pages.add(finding)
+        sarif.add(finding)
+        junit.add(finding)
+    findings_browser = render_findings_browser(pages.close())
+    sarif.close()
+    junit.close()
+    
     # SAST summary
     sast_summary = "❌ Failed" if not sast_result.get('success') else f"""
         <ul>
@@ -81,13 +225,43 @@ def generate_consolidated_report(sast_result, dast_result):
             <li>Medium Severity: {sast_result.get('medium', 0)}</li>
             <li>Low Severity: {sast_result.get('low', 0)}</li>
             <li>Total Issues: {sast_result.get('total_issues', 0)}</li>
+            <li>Baselined (suppressed): {sast_result.get('suppressed', 0)}</li>
+        </ul>
+        {render_delta(sast_result.get('delta'))}
+    """
+    
+    # Secrets summary
+    secrets_summary = f"❌ {secrets_result.get('error', 'Failed')}" if not secrets_result.get('success') else f"""
+        <ul>
+            <li>High Severity: {secrets_result.get('high', 0)}</li>
+            <li>Medium Severity: {secrets_result.get('medium', 0)}</li>
+            <li>Total Secrets: {secrets_result.get('total_issues', 0)}</li>
+            <li>Baselined (suppressed): {secrets_result.get('suppressed', 0)}</li>
+            <li>Scanned: {secrets_result.get('files', 0)} files, {secrets_result.get('bytes', 0) / (1024 * 1024):.1f} MB in {secrets_result.get('duration', 0)}s</li>
         </ul>
+        {render_delta(secrets_result.get('delta'))}
     """
     
     # DAST summary  
-    dast_summary = "❌ Failed" if not dast_result.get('success') else """
+    alerts = dast_result.get('alerts')
+    if not dast_result.get('success'):
+        dast_summary = "❌ Failed"
+    elif alerts:
+        dast_summary = f"""
+        <ul>
+            <li>High Risk: {alerts.get('high', 0)}</li>
+            <li>Medium Risk: {alerts.get('medium', 0)}</li>
+            <li>Low Risk: {alerts.get('low', 0)}</li>
+            <li>Informational: {alerts.get('informational', 0)}</li>
+            <li>Total Alerts: {alerts.get('total_issues', 0)}</li>
+            <li>Baselined (suppressed): {dast_result.get('suppressed', 0)}</li>
+        </ul>
+        {render_delta(dast_result.get('delta'))}
+        """
+    else:
+        dast_summary = """
         <p>✅ Scan completed. See detailed report for findings.</p>
-    """
+        """
     
     html_content = f"""
 <!DOCTYPE html>
@@ -165,6 +339,7 @@ def generate_consolidated_report(sast_result, dast_result):
             margin-top: 40px;
             color: #666;
         }}
+        {FINDINGS_BROWSER_STYLE}
     </style>
 </head>
 <body>
@@ -187,6 +362,13 @@ def generate_consolidated_report(sast_result, dast_result):
                         {'✅ Completed' if sast_result.get('success') else '❌ Failed'}
                     </td>
                 </tr>
+                <tr>
+                    <td>Secrets (Hardcoded Credentials)</td>
+                    <td>Secrets Scanner</td>
+                    <td class="{'success' if secrets_result.get('success') else 'error'}">
+                        {'✅ Completed' if secrets_result.get('success') else '❌ Failed'}
+                    </td>
+                </tr>
                 <tr>
                     <td>DAST (Dynamic Analysis)</td>
                     <td>OWASP ZAP</td>
@@ -202,9 +384,21 @@ def generate_consolidated_report(sast_result, dast_result):
             {sast_summary}
         </div>
         
+        <div class="card">
+            <h2>🔑 Secrets Results</h2>
+            {secrets_summary}
+        </div>
+        
         <div class="card">
             <h2>🌐 DAST Results (OWASP ZAP)</h2>
             {dast_summary}
+            {render_app_log(dast_result.get('app_log'))}
+            {render_policy(policy)}
+        </div>
+        
+        <div class="card">
+            <h2>🧾 Findings</h2>
+            {findings_browser}
         </div>
         
         <div class="card">
@@ -212,6 +406,9 @@ def generate_consolidated_report(sast_result, dast_result):
             <ul>
                 <li><a href="bandit_report.html" style="color: #e94560;">Bandit SAST Report (HTML)</a></li>
                 <li><a href="bandit_report.json" style="color: #e94560;">Bandit SAST Report (JSON)</a></li>
+                <li><a href="secrets_report.json" style="color: #e94560;">Secrets Report (JSON)</a></li>
+                <li><a href="security_pipeline.sarif" style="color: #e94560;">All Findings (SARIF 2.1)</a></li>
+                <li><a href="security_pipeline_junit.xml" style="color: #e94560;">All Findings (JUnit XML)</a></li>
                 <li><a href="zap_report.html" style="color: #e94560;">OWASP ZAP DAST Report (HTML)</a></li>
             </ul>
         </div>
@@ -231,21 +428,57 @@ def generate_consolidated_report(sast_result, dast_result):
     return report_path
 
 
-def run_pipeline(run_dast=True):
+def prepare_run_dir(base_dir=None):
+    """Create a private reports/runs/<id> directory for one pipeline run"""
+    if base_dir is None:
+        base_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    run_dir = os.path.join(base_dir, 'runs', run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    return run_dir
+
+
+def run_pipeline(run_dast=True, dast_backend='zap', isolated=False, port=None, incremental_dast=False,
+                 policy=None, run_secrets=True, secrets_target=None):
     """
     Run the complete security pipeline
     
     Args:
-        run_dast: If True, also runs DAST scan (requires Docker)
+        run_dast: If True, also runs DAST scan
+        dast_backend: 'zap' (OWASP ZAP in Docker) or 'probe' (in-process engine)
+        isolated: Use a free port, a private reports/runs/<id> directory and a
+                  private users.db so several pipelines can share one host
+        port: Explicit port for the target application
+        incremental_dast: Only probe routes whose handler changed since the
+                          last probe scan (probe backend)
+        policy: PipelinePolicy with fail-fast gates and the time budget
+                (default: no gates, no budget, ZAP baseline scan)
+        run_secrets: If False, skips the secrets scan
+        secrets_target: File or directory the secrets scan covers (defaults to
+                        this repository, minus patches and test files)
     """
+    if policy is None:
+        policy = PipelinePolicy()
+    
     print_banner()
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"🕐 Pipeline started at: {timestamp}")
     print(f"📂 Working directory: {os.path.dirname(__file__)}")
     
+    reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    db_path = None
+    if isolated:
+        reports_dir = prepare_run_dir()
+        db_path = os.path.join(reports_dir, 'users.db')
+        if port is None:
+            port = allocate_port()
+        print(f"🧪 Isolated run: port {port}, reports in {reports_dir}")
+    target_url = f"http://localhost:{port or 5000}"
+    
     results = {
         'sast': None,
+        'secrets': None,
         'dast': None
     }
     
@@ -259,10 +492,35 @@ def run_pipeline(run_dast=True):
         print("📌 PHASE 1: Static Application Security Testing (SAST)")
         print("=" * 70)
         
-        results['sast'] = run_bandit_scan()
+        # Each scan gets what is left of the budget (None: no limit)
+        results['sast'] = run_bandit_scan(reports_dir=reports_dir,
+                                          timeout=policy.budget.timeout(reserve=policy.reserve))
+        
+        gate = policy.check_sast(results['sast'])
+        if gate:
+            results['secrets'] = {'success': False, 'error': f'Skipped: {gate}'}
+        elif not run_secrets:
+            print("\n⏭️ Skipping secrets scan (--skip-secrets)")
+            results['secrets'] = {'success': False, 'error': 'Skipped'}
+        else:
+            print()
+            results['secrets'] = run_secrets_scan(secrets_target, reports_dir=reports_dir,
+                                                  timeout=policy.budget.timeout(reserve=policy.reserve))
+            gate = policy.check_secrets(results['secrets'])
+        if gate:
+            print(f"\n🚫 Fail-fast gate tripped: {gate}")
+            if policy.on_fail == 'abort':
+                print("⏹️ Aborting pipeline")
+                results['dast'] = {'success': False, 'error': f'Aborted: {gate}'}
+                results['policy'] = policy.summary()
+                return results
         
+        dast_mode, _, skip_reason = policy.choose_dast(dast_backend)
         if not run_dast:
             print("\n⏭️ Skipping DAST scan (use --full to include DAST)")
+        elif dast_mode == 'skip':
+            print(f"\n⏭️ Skipping DAST scan: {skip_reason}")
+            results['dast'] = {'success': False, 'error': f'Skipped: {skip_reason}'}
         else:
             # ============================================
             # PHASE 2: Start Flask Application
@@ -272,9 +530,11 @@ def run_pipeline(run_dast=True):
             print("=" * 70)
             
             print("\n🚀 Starting Flask application...")
-            flask_process = run_flask_app()
+            flask_process = run_flask_app(port=port or 5000, db_path=db_path,
+                                          log_path=os.path.join(reports_dir, 'app.log'))
             
-            if wait_for_app():
+            startup_timeout = policy.budget.timeout(30, policy.reserve)
+            if wait_for_app(target_url, timeout=startup_timeout, process=flask_process):
                 # ============================================
                 # PHASE 3: DAST Scan with OWASP ZAP
                 # ============================================
@@ -282,9 +542,44 @@ def run_pipeline(run_dast=True):
                 print("📌 PHASE 3: Dynamic Application Security Testing (DAST)")
                 print("=" * 70)
                 
-                results['dast'] = run_zap_baseline_scan()
+                # Startup used part of the budget; the scan gets what is left
+                dast_mode, dast_timeout, skip_reason = policy.choose_dast(dast_backend)
+                if policy.budget.seconds is not None and dast_mode != 'skip':
+                    print(f"⏱️ Time budget: {dast_mode} scan, cancelled after {dast_timeout:.0f}s")
+                
+                if dast_mode == 'skip':
+                    print(f"⏭️ Skipping DAST scan: {skip_reason}")
+                    results['dast'] = {'success': False, 'error': f'Skipped: {skip_reason}'}
+                elif dast_mode == 'probe':
+                    from dast_probe import run_probe_scan, default_route_cache_path
+                    # The route cache outlives isolated run dirs so --incremental can reuse it
+                    results['dast'] = run_probe_scan(target_url, reports_dir=reports_dir,
+                                                     incremental=incremental_dast,
+                                                     time_limit=dast_timeout,
+                                                     route_cache=default_route_cache_path())
+                elif dast_mode == 'full':
+                    results['dast'] = run_zap_full_scan(target_url, reports_dir=reports_dir,
+                                                        timeout=dast_timeout)
+                else:
+                    if incremental_dast:
+                        print("ℹ️ Incremental DAST needs the probe backend; running a full ZAP scan")
+                    results['dast'] = run_zap_baseline_scan(
+                        target_url,
+                        seed_file=export_seeds(target_url, reports_dir),
+                        reports_dir=reports_dir,
+                        timeout=dast_timeout
+                    )
+                
+                gate = policy.check_dast(results['dast'])
+                if gate:
+                    print(f"\n🚫 Fail-fast gate tripped: {gate}")
+                
+                if flask_process.poll() is not None:
+                    print(f"⚠️ Application exited during the scan (code {flask_process.returncode})")
+                    results['dast'] = dict(results['dast'], app_log=app_log_tail(flask_process))
             else:
-                results['dast'] = {'success': False, 'error': 'App not ready'}
+                results['dast'] = {'success': False, 'error': 'App not ready',
+                                   'app_log': app_log_tail(flask_process)}
         
         # ============================================
         # PHASE 4: Generate Consolidated Report
@@ -296,7 +591,9 @@ def run_pipeline(run_dast=True):
         if results['dast'] is None:
             results['dast'] = {'success': False, 'error': 'Skipped'}
         
-        report_path = generate_consolidated_report(results['sast'], results['dast'])
+        results['policy'] = policy.summary()
+        report_path = generate_consolidated_report(results['sast'], results['dast'], reports_dir=reports_dir,
+                                                   policy=results['policy'], secrets_result=results['secrets'])
         
         # ============================================
         # Summary
@@ -309,27 +606,65 @@ def run_pipeline(run_dast=True):
         print(f"   • SAST (Bandit): {'✅ Success' if results['sast'].get('success') else '❌ Failed'}")
         if results['sast'].get('success'):
             print(f"     - Found {results['sast'].get('total_issues', 0)} security issues")
+        print(f"   • Secrets: {'✅ Success' if results['secrets'].get('success') else '❌ ' + results['secrets'].get('error', 'Failed')}")
+        if results['secrets'].get('success'):
+            print(f"     - Found {results['secrets'].get('total_issues', 0)} hardcoded secrets")
+        
+        print(f"   • DAST ({'Probe' if dast_backend == 'probe' else 'ZAP'}): {'✅ Success' if results['dast'].get('success') else '❌ ' + results['dast'].get('error', 'Failed')}")
         
-        print(f"   • DAST (ZAP): {'✅ Success' if results['dast'].get('success') else '❌ ' + results['dast'].get('error', 'Failed')}")
+        if results['policy']['gate']:
+            print(f"   • Gate: 🚫 {results['policy']['gate']}")
+        print(f"   • Time: {results['policy']['elapsed']}s"
+              + (f" ({results['policy']['remaining']}s of budget left)"
+                 if results['policy']['remaining'] is not None else ''))
         
-        print(f"\n📁 Reports available in: {os.path.join(os.path.dirname(__file__), 'reports')}")
+        print(f"\n📁 Reports available in: {reports_dir}")
         
     except KeyboardInterrupt:
         print("\n\n⚠️ Pipeline interrupted by user")
     finally:
         # Clean up Flask process
         if flask_process:
-            print("\n🛑 Stopping Flask application...")
-            if os.name == 'nt':
-                flask_process.terminate()
-            else:
-                os.kill(flask_process.pid, signal.SIGTERM)
-            flask_process.wait()
-            print("✅ Flask application stopped")
+            stop_flask_app(flask_process)
     
     return results
 
 
+def run_dast_stage(reports_dir=None, backend='probe', incremental=False):
+    """
+    Scheduler stage: start a private app instance, run DAST against it, stop it
+    """
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+    port = allocate_port()
+    target_url = f"http://localhost:{port}"
+    flask_process = run_flask_app(port=port, db_path=os.path.join(reports_dir, 'users.db'),
+                                  log_path=os.path.join(reports_dir, 'app.log'))
+    try:
+        if not wait_for_app(target_url, process=flask_process):
+            return {'success': False, 'error': 'App not ready', 'app_log': app_log_tail(flask_process)}
+        if backend == 'probe':
+            from dast_probe import run_probe_scan
+            return run_probe_scan(target_url, reports_dir=reports_dir, incremental=incremental)
+        seed_file = os.path.join(reports_dir, 'openapi.json')
+        return run_zap_baseline_scan(
+            target_url,
+            seed_file=seed_file if os.path.exists(seed_file) else None,
+            reports_dir=reports_dir
+        )
+    finally:
+        stop_flask_app(flask_process)
+
+
+def report_stage(reports_dir=None, upstream=None):
+    """Scheduler stage: consolidated report from the SAST, secrets and DAST stage results"""
+    upstream = upstream or {}
+    sast = upstream.get('sast') or {'success': False, 'error': 'Skipped'}
+    dast = upstream.get('dast') or {'success': False, 'error': 'Skipped'}
+    return {'success': True, 'report': generate_consolidated_report(sast, dast, reports_dir=reports_dir,
+                                                                    secrets_result=upstream.get('secrets'))}
+
+
 def main():
     """Main entry point"""
     import argparse
@@ -339,9 +674,45 @@ def main():
                         help='Run only SAST scan (no Docker required)')
     parser.add_argument('--full', action='store_true',
                         help='Run full pipeline including DAST (requires Docker)')
+    parser.add_argument('--dast-backend', choices=['zap', 'probe'], default='zap',
+                        help="DAST engine: 'zap' (Docker) or 'probe' (in-process, no Docker)")
+    parser.add_argument('--isolated', action='store_true',
+                        help='Free port, private reports/runs/<id> and users.db (parallel runs)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Probe only routes whose handler source changed since the last scan')
+    parser.add_argument('--scheduled', action='store_true',
+                        help='Run the stage DAG from pipeline_stages.json, reusing cached stages')
+    parser.add_argument('--port', type=int,
+                        help='Port for the target application (default 5000, or a free one with --isolated)')
+    parser.add_argument('--fail-on', choices=SEVERITY_LEVELS,
+                        help='Fail-fast gate: severity that fails the build')
+    parser.add_argument('--max-findings', type=int, default=0,
+                        help='Findings at or above --fail-on tolerated before the gate trips (default 0)')
+    parser.add_argument('--on-fail', choices=GATE_ACTIONS, default='skip',
+                        help="When the gate trips: 'abort' at once or 'skip' later scans and still report")
+    parser.add_argument('--budget', type=float,
+                        help='Time budget for the whole pipeline, in minutes')
+    parser.add_argument('--dast-mode', choices=DAST_MODES, default='baseline',
+                        help="ZAP scan: 'baseline', 'full', or 'auto' to pick from the time budget")
+    parser.add_argument('--skip-secrets', action='store_true',
+                        help='Skip the hardcoded secrets scan')
+    parser.add_argument('--secrets-target',
+                        help='File or directory for the secrets scan (default: this repository, '
+                             'without patches and test files)')
     
     args = parser.parse_args()
     
+    if args.scheduled:
+        # The stage DAG takes its settings from pipeline_stages.json
+        ignored = [action.option_strings[0] for action in parser._actions
+                   if action.dest not in ('help', 'scheduled')
+                   and getattr(args, action.dest) != action.default]
+        if ignored:
+            parser.error(f"--scheduled cannot be combined with {', '.join(ignored)}")
+        from pipeline_scheduler import run_scheduled_pipeline
+        run_scheduled_pipeline()
+        return
+    
     # By default, run SAST only for easier demo
     run_dast = args.full and not args.sast_only
     
@@ -350,7 +721,22 @@ def main():
         print("       Use --sast-only to run only Bandit analysis")
         print("")
     
-    run_pipeline(run_dast=run_dast)
+    policy = PipelinePolicy(
+        fail_on=args.fail_on,
+        max_findings=args.max_findings,
+        on_fail=args.on_fail,
+        budget_seconds=args.budget * 60 if args.budget else None,
+        dast_mode=args.dast_mode
+    )
+    
+    results = run_pipeline(run_dast=run_dast, dast_backend=args.dast_backend,
+                           isolated=args.isolated, port=args.port, incremental_dast=args.incremental,
+                           policy=policy, run_secrets=not args.skip_secrets,
+                           secrets_target=args.secrets_target)
+    
+    # A tripped gate fails the CI job
+    if results.get('policy', {}).get('gate'):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,493 @@
+"""
+Async Diagnostics Server
+ASGI serving mode for server_main: the I/O-bound views (connectivity probes,
+profile reads) are awaited on one event loop, every other route runs the
+Flask view in a small thread pool
+"""
+
+import io
+import os
+import sys
+import time
+import asyncio
+import signal
+import logging
+import threading
+import subprocess
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import server_main
+from admission import DEFAULT_PRIORITY
+
+try:
+    import uvicorn
+except ImportError:  # Optional: the built-in HTTP/1.1 server is used instead
+    uvicorn = None
+
+# Same limit as the Flask view's check_output
+CONNECTIVITY_TIMEOUT = 5
+
+# Threads for blocking work: SQLite reads and the Flask fallback
+DB_WORKERS = 4
+WSGI_WORKERS = 8
+
+# Largest request head the built-in server accepts
+MAX_HEADER_BYTES = 64 * 1024
+
+HTML_HEADERS = [(b'content-type', b'text/html; charset=utf-8')]
+
+
+def _first_args(query_string):
+    """request.args.get semantics: the first value of every parameter"""
+    args = {}
+    for name, value in parse_qsl(query_string.decode('latin-1'), keep_blank_values=True):
+        args.setdefault(name, value)
+    return args
+
+
+class AsyncDiagnosticsApp:
+    """
+    ASGI application serving server_main's routes
+
+    /api/v1/connectivity runs ping as an asyncio subprocess and
+    /api/v1/profile awaits its read (an in-memory lookup in snapshot mode,
+    a bounded thread pool otherwise), so a slow probe only costs a
+    coroutine. Other routes are cheap and go through the Flask app.
+    The Flask app's AdmissionController limits are applied to the fast
+    path as well, with the same 429/503 responses.
+    """
+
+    def __init__(self, wsgi_app=None, db_workers=DB_WORKERS, wsgi_workers=WSGI_WORKERS):
+        self.wsgi_app = wsgi_app or server_main.app
+        self._db_pool = ThreadPoolExecutor(db_workers, thread_name_prefix='async-db')
+        self._wsgi_pool = ThreadPoolExecutor(wsgi_workers, thread_name_prefix='async-wsgi')
+        self.routes = {
+            '/api/v1/connectivity': self.check_connectivity,
+            '/api/v1/profile': self.get_user_profile,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        view = self.routes.get(scope['path'])
+        if view is None:
+            await self._call_wsgi(scope, receive, send)
+            return
+
+        gate = None
+        admission = self.wsgi_app.extensions.get('admission')
+        if admission is not None:
+            header = admission.priority_header.lower().encode('latin-1')
+            priority = dict(scope.get('headers', [])).get(header, b'').decode('latin-1') or DEFAULT_PRIORITY
+            rejection, gate = await admission.admit_async(scope['path'], priority)
+            if rejection is not None:
+                content, status, headers = rejection
+                await _send_response(send, status, HTML_HEADERS + [
+                    (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()
+                ], content.encode('utf-8'))
+                return
+        try:
+            body = await view(_first_args(scope.get('query_string', b'')))
+        finally:
+            if gate is not None:
+                gate.release()
+        await _send_response(send, 200, HTML_HEADERS, body.encode('utf-8'))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Load the users snapshot (if enabled) before the first request
+                await asyncio.get_running_loop().run_in_executor(self._db_pool, server_main.get_users_snapshot)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def check_connectivity(self, args):
+        host = args.get('host', 'localhost')
+        command = server_main.connectivity_command(host)
+        try:
+            process = await asyncio.create_subprocess_shell(
+                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                start_new_session=(os.name == 'posix')
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), CONNECTIVITY_TIMEOUT)
+            except asyncio.TimeoutError:
+                _kill_tree(process)
+                await process.wait()
+                output = "Connection timed out"
+            else:
+                if process.returncode:
+                    output = f"Diagnostic Error: {subprocess.CalledProcessError(process.returncode, command)}"
+                else:
+                    output = stdout.decode('utf-8', errors='ignore')
+        except Exception as e:
+            output = f"Diagnostic Error: {str(e)}"
+        server_main.get_connectivity_history().record_output(host, output)
+        return server_main.render_connectivity(host, output)
+
+    async def get_user_profile(self, args):
+        user_id = args.get('id', '1')
+        try:
+            if server_main.get_users_snapshot() is not None:
+                result = server_main.fetch_user_profile(user_id)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._db_pool, server_main.fetch_user_profile, user_id
+                )
+            return server_main.render_user_profile(result)
+        except Exception as e:
+            return server_main.render_profile_error(e)
+
+    async def _call_wsgi(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        environ = _wsgi_environ(scope, body)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        def call():
+            chunks = self.wsgi_app(environ, start_response)
+            try:
+                return b''.join(chunks)
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+
+        content = await asyncio.get_running_loop().run_in_executor(self._wsgi_pool, call)
+        headers = [(name, value) for name, value in response['headers'] if name != b'content-length']
+        await _send_response(send, response['status'], headers, content)
+
+    def close(self):
+        self._db_pool.shutdown(wait=False)
+        self._wsgi_pool.shutdown(wait=False)
+
+
+def _kill_tree(process):
+    """Kill the shell and whatever it started (it leads its own session on POSIX)"""
+    if os.name == 'posix':
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except ProcessLookupError:
+            return
+    process.kill()
+
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _send_response(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class AsyncHTTPServer:
+    """
+    Minimal HTTP/1.1 server for an ASGI app, used when uvicorn is missing
+
+    One event loop serves every connection, with keep-alive. It covers
+    what the diagnostics app needs (Content-Length bodies, no chunked
+    uploads, no TLS); use uvicorn for anything else.
+    """
+
+    def __init__(self, app, host='127.0.0.1', port=5000):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._lifespan_messages = asyncio.Queue()
+        self._lifespan_done = {}
+        self._lifespan_task = asyncio.ensure_future(
+            self.app({'type': 'lifespan'}, self._lifespan_messages.get, self._lifespan_send))
+        await self._lifespan('startup')
+        return self
+
+    async def _lifespan_send(self, message):
+        event = self._lifespan_done.get(message['type'].rsplit('.', 1)[0])
+        if event is not None:
+            event.set()
+
+    async def _lifespan(self, phase):
+        done = self._lifespan_done[f'lifespan.{phase}'] = asyncio.Event()
+        await self._lifespan_messages.put({'type': f'lifespan.{phase}'})
+        await done.wait()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self._lifespan('shutdown')
+        await self._lifespan_task
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head[:-4].split(b'\r\n')
+                method, target, version = request_line.decode('latin-1').split(' ', 2)
+                headers = []
+                for line in header_lines:
+                    name, _, value = line.partition(b':')
+                    headers.append((name.strip().lower(), value.strip()))
+                header_map = dict(headers)
+                body = await reader.readexactly(int(header_map.get(b'content-length', b'0')))
+                path, _, query = target.partition('?')
+                http_version = version.split('/', 1)[-1]
+                keep_alive = (header_map.get(b'connection', b'').lower() != b'close'
+                              and http_version == '1.1')
+
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': http_version,
+                    'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode('latin-1'),
+                    'query_string': query.encode('latin-1'), 'root_path': '', 'headers': headers,
+                    'server': (self.host, self.port), 'client': writer.get_extra_info('peername'),
+                }
+                received = False
+
+                async def receive():
+                    nonlocal received
+                    if received:
+                        return {'type': 'http.disconnect'}
+                    received = True
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        status = HTTPStatus(message['status'])
+                        lines = [f'HTTP/1.1 {status.value} {status.phrase}'.encode()]
+                        lines += [name + b': ' + value for name, value in message.get('headers', [])]
+                        lines.append(b'connection: ' + (b'keep-alive' if keep_alive else b'close'))
+                        writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+                    elif message['type'] == 'http.response.body':
+                        writer.write(message.get('body', b''))
+                        await writer.drain()
+
+                await self.app(scope, receive, send)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+
+def start_in_thread(app=None, host='127.0.0.1', port=0):
+    """Run the built-in server on a background event loop; returns (server, stop)"""
+    app = app or AsyncDiagnosticsApp()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(AsyncHTTPServer(app, host, port).start())
+    thread = threading.Thread(target=loop.run_forever, name='async-server', daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        app.close()
+
+    return server, stop
+
+
+def serve(host='0.0.0.0', port=5000):
+    """Serve the async app, under uvicorn when it is installed"""
+    app = AsyncDiagnosticsApp()
+    if uvicorn is not None:
+        uvicorn.run(app, host=host, port=port, log_level='warning')
+        return
+
+    async def main():
+        server = await AsyncHTTPServer(app, host, port).start()
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+
+
+async def _load(port, path, total, concurrency, timeout):
+    """Fire total GET requests with at most concurrency in flight"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode()
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+                writer.write(request)
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), timeout)
+                writer.close()
+                if not response.startswith(b'HTTP/1.1 200') and not response.startswith(b'HTTP/1.0 200'):
+                    errors += 1
+                    return
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def benchmark_mode(mode, path, total, concurrency, timeout=30):
+    """Requests/s, latency percentiles and peak threads of one serving mode"""
+    from werkzeug.serving import make_server
+
+    if mode == 'threaded':
+        # One access log line per request would dominate the measurement
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, server_main.app, threaded=True)
+        server.socket.listen(1024)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_port
+        stop = server.shutdown
+    else:
+        server, stop = start_in_thread()
+        port = server.port
+
+    peak_threads = threading.active_count()
+    sampling = threading.Event()
+
+    def sample():
+        nonlocal peak_threads
+        while not sampling.wait(0.01):
+            peak_threads = max(peak_threads, threading.active_count())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        duration, latencies, errors = asyncio.run(_load(port, path, total, concurrency, timeout))
+    finally:
+        sampling.set()
+        sampler.join()
+        stop()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        'mode': mode,
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors,
+        'duration': round(duration, 3),
+        'requests_per_second': round(len(latencies) / duration, 1) if duration else 0.0,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'peak_threads': peak_threads,
+    }
+
+
+def run_serving_benchmark(path='/api/v1/connectivity?host=127.0.0.1', total=500, concurrency=200):
+    """Compare the threaded Flask server with the async app on the same route"""
+    print("=" * 60)
+    print("🏎️ SERVING BENCHMARK - threaded vs async")
+    print("=" * 60)
+    print(f"\n🎯 {total} x GET {path}, {concurrency} in flight")
+
+    results = []
+    for mode in ('threaded', 'async'):
+        result = benchmark_mode(mode, path, total, concurrency)
+        results.append(result)
+        print(f"   • {mode:<8} {result['requests_per_second']:>8} req/s | p50 {result['p50_ms']} ms | "
+              f"p99 {result['p99_ms']} ms | errors {result['errors']} | peak threads {result['peak_threads']}")
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Async Diagnostics Server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Benchmark the threaded and async modes instead of serving')
+    parser.add_argument('--path', default='/api/v1/connectivity?host=127.0.0.1',
+                        help='Route requested by the benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='Benchmark requests')
+    parser.add_argument('--concurrency', type=int, default=200, help='Benchmark requests in flight')
+    args = parser.parse_args()
+
+    server_main.bootstrap_database()
+    if args.benchmark:
+        run_serving_benchmark(args.path, args.requests, args.concurrency)
+        return
+
+    print(f"⚡ Async diagnostics server on {args.host}:{args.port} "
+          f"({'uvicorn' if uvicorn is not None else 'built-in server'})")
+    serve(args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
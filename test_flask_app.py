@@ -5,7 +5,12 @@ from unittest.mock import patch, MagicMock
 import subprocess
 
 # Import the Flask app
-from server_main import app
+from server_main import app, create_app
+from route_map import collect_routes, build_openapi, build_url_seeds, view_fingerprint
+import server_async
+from server_async import AsyncDiagnosticsApp, start_in_thread
+from admission import AdmissionController, ConcurrencyGate, RouteLimits, PRIORITIES
+from diagnostic_jobs import JobQueue, MemoryJobStore, SQLiteJobStore, LEASE_SECONDS
 
 
 class TestFlaskApp:
@@ -13,13 +18,10 @@ class TestFlaskApp:
 
     def setup_method(self):
         """Set up test client"""
-        self.app = app
-        self.app.config['TESTING'] = True
-        self.client = self.app.test_client()
-
         # Create temporary database for testing
         self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
-        self.app.config['DATABASE'] = self.db_path
+        self.app = create_app({'TESTING': True, 'USERS_DB': self.db_path})
+        self.client = self.app.test_client()
 
     def teardown_method(self):
         """Clean up after tests"""
@@ -164,10 +166,15 @@ class TestFlaskAppSecurityHeaders:
 
     def setup_method(self):
         """Set up test client"""
-        self.app = app
-        self.app.config['TESTING'] = True
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        self.app = create_app({'TESTING': True, 'USERS_DB': self.db_path})
         self.client = self.app.test_client()
 
+    def teardown_method(self):
+        """Clean up after tests"""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
     def test_routes_dont_leak_sensitive_info(self):
         """Test that routes don't accidentally leak sensitive information"""
         routes_to_test = [
@@ -202,5 +209,456 @@ class TestFlaskAppSecurityHeaders:
         assert b'sk-1234567890abcdef' in response.data
 
 
+class TestRouteMap:
+    """Test route map export used to seed DAST"""
+
+    def test_collect_routes_finds_query_params(self):
+        """Test that every view's query parameters are discovered"""
+        routes = {route['rule']: route for route in collect_routes(app)}
+
+        params = {rule: [p['name'] for p in route['query_params']] for rule, route in routes.items()}
+        assert params['/api/v1/profile'] == ['id']
+        assert params['/api/v1/connectivity'] == ['host']
+        assert params['/tools/query'] == ['q']
+        assert params['/util/crypto'] == ['password']
+        assert params['/'] == []
+        assert '/static/<path:filename>' not in routes
+
+    def test_openapi_and_url_seeds(self):
+        """Test OpenAPI document and concrete seed URLs"""
+        routes = collect_routes(app)
+        spec = build_openapi(routes, 'http://localhost:5000')
+        urls = build_url_seeds(routes, 'http://localhost:5000/')
+
+        operation = spec['paths']['/api/v1/connectivity']['get']
+        assert operation['parameters'][0]['name'] == 'host'
+        assert operation['parameters'][0]['schema']['example'] == 'localhost'
+        assert 'http://localhost:5000/util/crypto?password=default' in urls
+        assert 'http://localhost:5000/tools/query?q=test' in urls
+
+    def test_view_fingerprint_follows_source_and_helpers(self, tmp_path, monkeypatch):
+        """Test that handler fingerprints change with the view or a helper it calls"""
+        versions = {
+            'views_base': ('1', '1'),
+            'views_same': ('1', '1'),
+            'views_helper': ('2', '1'),
+            'views_view': ('1', '2'),
+        }
+        for name, (helper_value, view_value) in versions.items():
+            (tmp_path / f'{name}.py').write_text(
+                f'def helper():\n    return {helper_value}\n\n\n'
+                f'def view():\n    return helper() + {view_value}\n'
+            )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        fingerprints = {name: view_fingerprint(__import__(name).view) for name in versions}
+
+        assert fingerprints['views_same'] == fingerprints['views_base']
+        assert fingerprints['views_helper'] != fingerprints['views_base']
+        assert fingerprints['views_view'] != fingerprints['views_base']
+        assert all(route['fingerprint'] for route in collect_routes(app))
+
+
+def call_asgi(asgi_app, path, query=b''):
+    """Drive one HTTP request through an ASGI app; returns (status, body)"""
+    import asyncio
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': []}
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+class TestAsyncServer:
+    """Test the ASGI serving mode"""
+
+    def setup_method(self):
+        self.asgi = AsyncDiagnosticsApp()
+
+    def teardown_method(self):
+        self.asgi.close()
+
+    @patch('server_main.connect_db')
+    def test_profile_read_is_awaited_in_pool(self, mock_connect):
+        """Test that the async profile view renders the same page as Flask"""
+        mock_connect.return_value.execute.return_value.fetchone.return_value = {
+            'id': 1, 'username': 'admin', 'email': 'admin@corp.internal'
+        }
+
+        status, body = call_asgi(self.asgi, '/api/v1/profile', b'id=1')
+
+        assert status == 200
+        assert b'User Profile' in body
+        assert b'admin@corp.internal' in body
+
+    def test_connectivity_runs_as_async_subprocess(self, monkeypatch):
+        """Test output capture, failing commands and the timeout"""
+        import server_main
+        monkeypatch.setattr(server_main, 'connectivity_command', lambda host: f'echo Reply from {host}')
+        _, ok = call_asgi(self.asgi, '/api/v1/connectivity', b'host=127.0.0.1')
+
+        monkeypatch.setattr(server_main, 'connectivity_command', lambda host: 'exit 2')
+        _, failed = call_asgi(self.asgi, '/api/v1/connectivity', b'host=x')
+
+        monkeypatch.setattr(server_main, 'connectivity_command', lambda host: 'sleep 10')
+        monkeypatch.setattr(server_async, 'CONNECTIVITY_TIMEOUT', 0.1)
+        _, slow = call_asgi(self.asgi, '/api/v1/connectivity', b'host=x')
+
+        assert b'Reply from 127.0.0.1' in ok
+        assert b'Diagnostic Error' in failed and b'exit status 2' in failed
+        assert b'Connection timed out' in slow
+
+    def test_builtin_server_falls_back_to_flask_views(self):
+        """Test keep-alive HTTP serving and the WSGI fallback for sync routes"""
+        import http.client
+        server, stop = start_in_thread(self.asgi)
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+            conn.request('GET', '/')
+            dashboard = conn.getresponse()
+            dashboard_body = dashboard.read()
+            conn.request('GET', '/util/crypto?password=test123')
+            crypto = conn.getresponse()
+            crypto_body = crypto.read()
+            conn.close()
+        finally:
+            stop()
+
+        assert dashboard.status == 200
+        assert b'CorpNet Diagnostics' in dashboard_body
+        assert b'cc03e747a6afbbcbf8be7668acfebee5' in crypto_body
+
+
+    def test_fast_path_applies_admission_limits(self, tmp_path, monkeypatch):
+        """Test that saturating the async connectivity route queues, rejects and rate limits"""
+        import asyncio
+        import server_main
+        monkeypatch.setattr(server_main, 'connectivity_command', lambda host: f'sleep 0.5; echo Reply from {host}')
+        gated = AsyncDiagnosticsApp(create_app({
+            'TESTING': True, 'USERS_DB': str(tmp_path / 'gated.db'),
+            'ADMISSION_LIMITS': {'/api/v1/connectivity': RouteLimits(concurrency=1, max_queue=1, queue_timeout=0.2)},
+        }))
+        limited = AsyncDiagnosticsApp(create_app({
+            'TESTING': True, 'USERS_DB': str(tmp_path / 'limited.db'),
+            'ADMISSION_LIMITS': {'/api/v1/connectivity': RouteLimits(concurrency=8, rate=0.01, burst=1)},
+        }))
+
+        async def request(asgi_app):
+            sent = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                sent.append(message)
+
+            await asgi_app({'type': 'http', 'method': 'GET', 'path': '/api/v1/connectivity',
+                            'query_string': b'host=x', 'headers': []}, receive, send)
+            return sent[0]['status'], dict(sent[0]['headers'])
+
+        async def scenario():
+            burst = await asyncio.gather(*(request(gated) for _ in range(4)))
+            after = await request(gated)
+            rated = [await request(limited), await request(limited)]
+            return burst, after, rated
+
+        try:
+            burst, after, rated = asyncio.run(scenario())
+        finally:
+            gated.close()
+            limited.close()
+
+        assert sorted(status for status, _ in burst) == [200, 503, 503, 503]
+        assert all(headers[b'retry-after'] == b'1' for status, headers in burst if status == 503)
+        assert after[0] == 200
+        assert [status for status, _ in rated] == [200, 429]
+        stats = gated.wsgi_app.extensions['admission'].stats()['/api/v1/connectivity']
+        assert (stats['in_flight'], stats['queued'], stats['rejected']) == (0, 0, 3)
+
+
+class TestAdmission:
+    """Test per-route concurrency and rate limits"""
+
+    def make_app(self, limits, clock=None):
+        import threading
+        from flask import Flask
+        limited = Flask(__name__)
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+        @limited.route('/')
+        def index():
+            return 'ok'
+
+        @limited.route('/slow')
+        def slow():
+            self.started.release()
+            self.release.wait(5)
+            return 'done'
+
+        kwargs = {'clock': clock} if clock else {}
+        controller = AdmissionController(limited, limits=limits, **kwargs)
+        return limited, controller
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        """Test that the token bucket rejects past the burst and refills"""
+        now = [0.0]
+        limited, controller = self.make_app(
+            {'/slow': RouteLimits(concurrency=10, rate=1, burst=2)}, clock=lambda: now[0]
+        )
+        self.release.set()
+        client = limited.test_client()
+
+        statuses = [client.get('/slow').status_code for _ in range(3)]
+        rejected = client.get('/slow')
+        now[0] += 1.0
+        refilled = client.get('/slow')
+
+        assert statuses == [200, 200, 429]
+        assert rejected.headers['Retry-After'] == '1'
+        assert refilled.status_code == 200
+        assert controller.stats()['/slow']['rate_limited'] == 2
+        assert controller.stats()['/slow']['in_flight'] == 0
+
+    def test_full_queue_sheds_fast_while_cheap_routes_stay_fast(self):
+        """Test 503 on a saturated route and that unlisted routes never wait"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        limited, controller = self.make_app(
+            {'/slow': RouteLimits(concurrency=1, max_queue=1, queue_timeout=5)}
+        )
+
+        with ThreadPoolExecutor(2) as pool:
+            running = pool.submit(limited.test_client().get, '/slow')
+            assert self.started.acquire(timeout=5)
+            queued = pool.submit(limited.test_client().get, '/slow')
+            while controller.stats()['/slow']['queued'] < 1:
+                time.sleep(0.01)
+
+            start = time.perf_counter()
+            shed = limited.test_client().get('/slow')
+            index = limited.test_client().get('/')
+            elapsed = time.perf_counter() - start
+            self.release.set()
+
+            assert shed.status_code == 503
+            assert 'Retry-After' in shed.headers
+            assert index.data == b'ok'
+            assert elapsed < 1
+            assert running.result().status_code == 200
+            assert queued.result().status_code == 200
+
+        assert controller.stats()['/slow'] == {'in_flight': 0, 'queued': 0, 'rejected': 1, 'rate_limited': 0}
+
+    def test_priority_orders_queue_and_displaces_low(self):
+        """Test that freed slots go to higher priorities and full queues evict low ones"""
+        import threading
+        import time
+        gate = ConcurrencyGate(limit=1, max_queue=2, queue_timeout=5)
+        assert gate.acquire()
+        order, results = [], {}
+
+        def wait(name, priority):
+            results[name] = gate.acquire(PRIORITIES[priority])
+            if results[name]:
+                order.append(name)
+                gate.release()
+
+        threads = []
+        for name, priority in (('low', 'low'), ('normal', 'normal'), ('high', 'high')):
+            thread = threading.Thread(target=wait, args=(name, priority))
+            thread.start()
+            threads.append(thread)
+            while gate.queued + gate.rejected < len(threads):
+                time.sleep(0.01)
+        gate.release()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == {'low': False, 'normal': True, 'high': True}
+        assert order == ['high', 'normal']
+        assert gate.in_flight == 0
+
+    def test_diagnostics_server_limits_expensive_routes(self):
+        """Test that server_main registers limits for connectivity and crypto only"""
+        controller = app.extensions['admission']
+
+        assert set(controller.stats()) == {'/api/v1/connectivity', '/util/crypto'}
+        assert controller.limits['/api/v1/connectivity'].concurrency >= 8
+
+
+class TestDiagnosticJobs:
+    """Test the background job queue and its routes"""
+
+    def wait_for(self, client, location):
+        import time
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            job = client.get(location).get_json()
+            if job['status'] in ('succeeded', 'failed'):
+                return job
+            time.sleep(0.02)
+        raise AssertionError(f"job still {job['status']}")
+
+    @patch('server_main.subprocess.check_output')
+    def test_submit_poll_and_stream_connectivity_job(self, mock_subprocess):
+        """Test that a multi-host job runs in the background and streams its output"""
+        mock_subprocess.side_effect = lambda command, **kwargs: f'Reply for {command}'.encode()
+        client = app.test_client()
+
+        submitted = client.post('/api/v1/jobs', json={'kind': 'connectivity',
+                                                      'params': {'hosts': 'alpha, beta'}})
+        job = self.wait_for(client, submitted.headers['Location'])
+        streamed = client.get(submitted.get_json()['stream'])
+        tail = client.get(f"{submitted.headers['Location']}?offset=1").get_json()
+
+        assert submitted.status_code == 202
+        assert job['status'] == 'succeeded'
+        assert job['result']['hosts']['beta'] == 'Reply for ping -n 1 beta'
+        assert streamed.data.decode() == '== alpha ==\nReply for ping -n 1 alpha\n== beta ==\nReply for ping -n 1 beta\n'
+        assert tail['output'] == ['== beta ==\nReply for ping -n 1 beta\n'] and tail['next_offset'] == 2
+
+    def test_invalid_jobs_fail_or_are_refused(self):
+        """Test unknown kinds, handler errors, missing jobs and a full queue"""
+        from flask import Flask
+        client = app.test_client()
+
+        unknown = client.post('/api/v1/jobs', json={'kind': 'rm'})
+        bad = client.post('/api/v1/jobs', json={'kind': 'hash', 'params': {'algorithms': ['crc32']}})
+        failed = self.wait_for(client, bad.headers['Location'])
+        missing = client.get('/api/v1/jobs/0123')
+
+        limited = Flask(__name__)
+        queue = JobQueue(MemoryJobStore(), workers=0, max_pending=1)
+        queue.register('hash', lambda params, emit: None)
+        queue.init_app(limited)
+        first = limited.test_client().post('/api/v1/jobs', json={'kind': 'hash'})
+        refused = limited.test_client().post('/api/v1/jobs', json={'kind': 'hash'})
+
+        assert unknown.status_code == 400
+        assert failed['status'] == 'failed' and 'crc32' in failed['error']
+        assert missing.status_code == 404
+        assert first.status_code == 202
+        assert refused.status_code == 503 and refused.headers['Retry-After'] == '1'
+
+    def test_sqlite_store_survives_restart_and_expires_results(self, tmp_path):
+        """Test durable results, recovery of interrupted jobs and the TTL"""
+        import time
+        db_path = str(tmp_path / 'jobs.db')
+        queue = JobQueue(SQLiteJobStore(db_path), workers=0, ttl=60)
+        queue.register('hash', lambda params, emit: emit('hashed') or {'n': params['n']})
+        done = queue.submit('hash', {'n': 1})
+        interrupted = queue.submit('hash', {'n': 2})
+        assert queue.run_one()
+        queue.store.claim()
+        queue.store.append_output(interrupted['id'], 'partial')
+        queue.close()
+
+        store = SQLiteJobStore(db_path)
+        assert store.get(done['id'])['result'] == {'n': 1}
+        assert store.read_output(done['id']) == ['hashed']
+        # The interrupted job is only taken over once its lease has run out
+        assert store.recover() == 0
+        assert store.recover(time.time() + LEASE_SECONDS + 1) == 1
+        assert store.get(interrupted['id'])['status'] == 'queued'
+        assert store.read_output(interrupted['id']) == []
+        assert store.purge_expired(time.time() + 61) == 1
+        assert store.get(done['id']) is None
+        store.close()
+
+    def test_shared_store_keeps_other_processes_jobs(self, tmp_path):
+        """Test that a second queue on the same database leaves leased jobs alone"""
+        import time
+        db_path = str(tmp_path / 'jobs.db')
+        first = SQLiteJobStore(db_path)
+        second = SQLiteJobStore(db_path)
+        job = first.add('hash', {})
+        first.claim(lease=60)
+
+        started = JobQueue(second, workers=0)
+        started.start()
+        assert second.get(job['id'])['status'] == 'running'
+        assert second.get(job['id'])['owner'] == first.owner
+
+        expiry = second.get(job['id'])['lease_expires']
+        time.sleep(0.01)
+        assert first.renew(lease=60) == 1 and second.renew(lease=60) == 0
+        assert second.get(job['id'])['lease_expires'] > expiry
+
+        # The owner dies: once its lease runs out the job is queued again for the survivor
+        assert second.recover(time.time() + 61) == 1
+        assert second.claim()['id'] == job['id']
+        first.finish(job['id'], 'succeeded', result={'stale': True})
+        assert second.get(job['id'])['status'] == 'running'
+        first.close()
+        second.close()
+
+
+class TestAppFactory:
+    """Test create_app and lazy initialization"""
+
+    def test_import_builds_nothing(self, tmp_path):
+        """Test that importing server_main creates no app, database or job queue"""
+        import sys
+        import json
+        probe = ('import json, sys, server_main; '
+                 'print(json.dumps([server_main._app is None, "diagnostic_jobs" in sys.modules, '
+                 '"connectivity_history" in sys.modules]))')
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=str(tmp_path), capture_output=True, text=True,
+                                   env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__))))
+
+        assert json.loads(completed.stdout) == [True, False, False]
+        assert list(tmp_path.iterdir()) == []
+
+    def test_schema_is_created_once_per_database(self, tmp_path, monkeypatch):
+        """Test lazy schema creation, the version check and recreation of a deleted database"""
+        import sqlite3
+        import server_main
+        db_path = str(tmp_path / 'users.db')
+        calls = []
+        create_schema = server_main.create_schema
+        monkeypatch.setattr(server_main, 'create_schema', lambda conn: calls.append(1) or create_schema(conn))
+        client = create_app({'USERS_DB': db_path}).test_client()
+
+        assert client.get('/').status_code == 200 and not os.path.exists(db_path)
+        first = client.get('/api/v1/profile?id=1')
+        client.get('/api/v1/profile?id=2')
+        # Another process starting on the same database finds it at the current version
+        server_main._schema_ready.discard(db_path)
+        client.get('/api/v1/profile?id=1')
+        created_once = len(calls)
+        os.unlink(db_path)
+        recreated = client.get('/api/v1/profile?id=1')
+
+        assert b'admin@corp.internal' in first.data
+        assert created_once == 1
+        assert b'admin@corp.internal' in recreated.data and len(calls) == 2
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute('PRAGMA user_version').fetchone()[0] == server_main.SCHEMA_VERSION
+
+    def test_apps_keep_separate_config(self, tmp_path):
+        """Test that two apps serve their own databases and limits"""
+        import sqlite3
+        from admission import RouteLimits
+        dbs = []
+        for name in ('a', 'b'):
+            db_path = str(tmp_path / f'{name}.db')
+            with sqlite3.connect(db_path) as conn:
+                conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, password TEXT, email TEXT)')
+                conn.execute("INSERT INTO users VALUES (1, ?, 'x', ?)", (name, f'{name}@corp.internal'))
+            dbs.append(db_path)
+        first = create_app({'USERS_DB': dbs[0]})
+        second = create_app({'USERS_DB': dbs[1], 'ADMISSION_LIMITS': {'/': RouteLimits(concurrency=1, rate=1)}})
+
+        assert b'a@corp.internal' in first.test_client().get('/api/v1/profile?id=1').data
+        assert b'b@corp.internal' in second.test_client().get('/api/v1/profile?id=1').data
+        assert [second.test_client().get('/').status_code for _ in range(2)] == [200, 429]
+        assert first.test_client().get('/').status_code == 200
+
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,243 @@
+"""
+User Registry
+Indexed schema, bulk import and keyset-paginated lookups for the users
+table served by server_main.py
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import sqlite3
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        password TEXT NOT NULL,
+        email TEXT
+    )
+'''
+
+# Same names as the indexes bootstrap_database creates
+INDEXES = {
+    'idx_users_username': 'CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)',
+    'idx_users_email': 'CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)',
+}
+
+# Rows with an id update the existing account (directory sync); rows
+# without one are appended
+UPSERT = '''
+    INSERT INTO users (id, username, password, email) VALUES (?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        username = excluded.username, password = excluded.password, email = excluded.email
+'''
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Page cache used while importing (negative: KiB), big enough to build the
+# indexes of a few million accounts without spilling to temp files
+IMPORT_CACHE_KIB = 256 * 1024
+
+# Below this many existing rows, dropping and rebuilding the indexes costs
+# less than maintaining them row by row during the import
+REBUILD_INDEX_MAX_ROWS = 1_000_000
+
+PAGE_SIZE = 100
+
+
+def default_db_path():
+    """The database server_main.py serves (USERS_DB overrides it)"""
+    return os.environ.get('USERS_DB', 'users.db')
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or default_db_path())
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def ensure_schema(conn):
+    """Create the users table and its lookup indexes if missing"""
+    conn.execute(SCHEMA)
+    for statement in INDEXES.values():
+        conn.execute(statement)
+    conn.commit()
+
+
+def _row(record, number):
+    try:
+        # csv.DictReader fills the fields of a short row with None
+        for field in ('username', 'password'):
+            if record.get(field) in (None, ''):
+                raise KeyError(field)
+        user_id = record.get('id')
+        return (
+            int(user_id) if user_id not in (None, '') else None,
+            record['username'],
+            record['password'],
+            record.get('email') or None,
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Record {number}: invalid user record ({e})") from e
+
+
+def iter_csv_users(f):
+    """(id, username, password, email) tuples from a CSV file with a header row"""
+    for number, record in enumerate(csv.DictReader(f), 1):
+        yield _row(record, number)
+
+
+def iter_ndjson_users(f):
+    """(id, username, password, email) tuples from newline-delimited JSON"""
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            yield _row(json.loads(line), number)
+
+
+def detect_format(path):
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def bulk_import(source, db_path=None, fmt=None, rebuild_indexes=None):
+    """
+    Stream accounts from a CSV or NDJSON file into the users table
+
+    The whole import is one transaction fed to a single executemany, so
+    either every row lands or none does. Unless rebuild_indexes says
+    otherwise, the lookup indexes are dropped and rebuilt in that same
+    transaction when the table is small enough for a rebuild to be cheaper
+    than maintaining them per row.
+
+    Args:
+        source: Path or text file object
+        db_path: Database to import into (defaults to USERS_DB / users.db)
+        fmt: 'csv' or 'ndjson' (detected from the file name by default)
+        rebuild_indexes: Force (True) or prevent (False) the index rebuild
+
+    Returns a dict with the number of rows written and the duration.
+    """
+    if fmt is None:
+        fmt = detect_format(source if isinstance(source, str) else getattr(source, 'name', ''))
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {IMPORT_FORMATS}")
+    reader = iter_csv_users if fmt == 'csv' else iter_ndjson_users
+
+    start = time.perf_counter()
+    conn = connect(db_path)
+    f = open(source, 'r', encoding='utf-8', newline='') if isinstance(source, str) else source
+    try:
+        ensure_schema(conn)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA cache_size=-{IMPORT_CACHE_KIB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if rebuild_indexes is None:
+            existing = conn.execute('SELECT MAX(rowid) FROM users').fetchone()[0] or 0
+            rebuild_indexes = existing <= REBUILD_INDEX_MAX_ROWS
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if rebuild_indexes:
+                for name in INDEXES:
+                    conn.execute(f'DROP INDEX IF EXISTS {name}')
+            rows = conn.executemany(UPSERT, reader(f)).rowcount
+            if rebuild_indexes:
+                for statement in INDEXES.values():
+                    conn.execute(statement)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        # Refresh the planner statistics for the new table size
+        conn.execute('PRAGMA optimize')
+    finally:
+        if f is not source:
+            f.close()
+        conn.close()
+
+    return {'rows': rows, 'duration': round(time.perf_counter() - start, 3), 'rebuilt_indexes': rebuild_indexes}
+
+
+def find_by_username(conn, username):
+    """Account with this username, or None (served by idx_users_username)"""
+    return conn.execute(
+        'SELECT id, username, email FROM users WHERE username = ? ORDER BY id LIMIT 1', (username,)
+    ).fetchone()
+
+
+def find_by_email(conn, email):
+    """Account with this email, or None (served by idx_users_email)"""
+    return conn.execute(
+        'SELECT id, username, email FROM users WHERE email = ? ORDER BY id LIMIT 1', (email,)
+    ).fetchone()
+
+
+def page_users(conn, after=None, limit=PAGE_SIZE, order_by='id'):
+    """
+    One page of accounts with keyset pagination
+
+    Each page seeks straight to the position after the previous one
+    instead of skipping OFFSET rows, so deep pages cost the same as the
+    first.
+
+    Args:
+        after: Cursor returned with the previous page (None for the first)
+        limit: Accounts per page
+        order_by: 'id' or 'username'
+
+    Returns (rows, cursor) where cursor is None after the last page.
+    """
+    if order_by == 'id':
+        rows = conn.execute(
+            'SELECT id, username, email FROM users WHERE id > ? ORDER BY id LIMIT ?',
+            (after if after is not None else -1, limit)
+        ).fetchall()
+        cursor = rows[-1]['id'] if len(rows) == limit else None
+    elif order_by == 'username':
+        # The username index stores the rowid, so (username, id) is its order
+        if after is None:
+            rows = conn.execute(
+                'SELECT id, username, email FROM users ORDER BY username, id LIMIT ?', (limit,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT id, username, email FROM users WHERE (username, id) > (?, ?) '
+                'ORDER BY username, id LIMIT ?', (after[0], after[1], limit)
+            ).fetchall()
+        cursor = (rows[-1]['username'], rows[-1]['id']) if len(rows) == limit else None
+    else:
+        raise ValueError("order_by must be 'id' or 'username'")
+    return rows, cursor
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='User Registry Bulk Import')
+    parser.add_argument('source', help="CSV (with a header row) or NDJSON file, '-' for stdin")
+    parser.add_argument('--db', default=None, help='Database path (default: USERS_DB or users.db)')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, default=None,
+                        help='Input format (default: from the file extension)')
+    parser.add_argument('--rebuild-indexes', action=argparse.BooleanOptionalAction, default=None,
+                        help='Drop and rebuild the lookup indexes around the import (default: by table size)')
+    args = parser.parse_args()
+
+    source = args.source
+    if source == '-':
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+
+    print(f"📥 Importing users into {args.db or default_db_path()}")
+    try:
+        result = bulk_import(source, db_path=args.db, fmt=args.format or (None if args.source != '-' else 'csv'),
+                             rebuild_indexes=args.rebuild_indexes)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"❌ Import failed, nothing was written: {e}")
+        sys.exit(1)
+    rate = result['rows'] / result['duration'] if result['duration'] else 0
+    print(f"✅ {result['rows']} users imported in {result['duration']:.2f}s ({rate:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
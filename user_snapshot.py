@@ -0,0 +1,129 @@
+"""
+User Snapshot
+Read-optimized in-memory copy of the users table for hot profile lookups,
+reloaded in the background and swapped in atomically when the database changes
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+# Seconds between change checks
+REFRESH_INTERVAL = 1.0
+
+
+class UserRecord:
+    """One account as served by the profile view (the password is not kept)"""
+
+    __slots__ = ('id', 'username', 'email')
+
+    def __init__(self, user_id, username, email):
+        self.id = user_id
+        self.username = username
+        self.email = email
+
+    def __getitem__(self, key):
+        # Lets views index records like the sqlite3.Row they replace
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+class UserSnapshot:
+    """
+    All accounts of a users database held in a dict keyed by id
+
+    Readers only do a dict lookup on the current mapping: they never touch
+    disk or take SQLite locks. A daemon thread watches the database with
+    PRAGMA data_version (commits by any other connection, WAL included) and
+    the file's inode and mtime (the file replaced or rewritten), loads a
+    complete new mapping and swaps it in with a single assignment.
+    """
+
+    def __init__(self, db_path, refresh_interval=REFRESH_INTERVAL, auto_refresh=True):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.generation = 0
+        self.loaded_at = None
+        self._records = {}
+        self._watch_conn = None
+        self._version = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+        if auto_refresh:
+            self._thread = threading.Thread(target=self._watch, name='user-snapshot', daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, user_id):
+        """The account with this id (int or numeric string), or None"""
+        try:
+            return self._records.get(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _current_version(self):
+        file_version = self._file_version()
+        if file_version is None:
+            # sqlite3.connect would create an empty database in its place
+            raise sqlite3.OperationalError(f"unable to open database file: {self.db_path}")
+        if self._watch_conn is None or (self._version and self._version[0] != file_version):
+            # A replaced file needs a new connection to see its content
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+            self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return file_version, self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _load(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return {
+                user_id: UserRecord(user_id, username, email)
+                for user_id, username, email in conn.execute('SELECT id, username, email FROM users')
+            }
+        finally:
+            conn.close()
+
+    def refresh(self, force=False):
+        """Reload if the database changed since the last load; returns True if it did"""
+        with self._refresh_lock:
+            version = self._current_version()
+            if not force and version == self._version:
+                return False
+            records = self._load()
+            # Readers see either the old mapping or the new one, never a mix
+            self._records = records
+            self._version = version
+            self.generation += 1
+            self.loaded_at = time.time()
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except sqlite3.Error:
+                # Locked or mid-replace: keep serving the last snapshot and retry
+                continue
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._refresh_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None